@@ -10,18 +10,166 @@ import sys
 import gzip
 import json
 import re
+import hashlib
+import logging
 
 from maya import mel, cmds
 import maya.OpenMaya as om
 import maya.OpenMayaMPx as omp
 
-from default import AzureBatchRenderJob, AzureBatchRenderAssets
+from default import AzureBatchRenderJob, AzureBatchRenderAssets, TASK_SPLITS, TASK_ORDERS, DISPATCH_MODES, \
+    RENDER_MODES
+from txcache import TxCache
 
 try:
     str_type = unicode
 except NameError:
     str_type = str
 
+ASS_EXTENSIONS = ('.ass', '.ass.gz')
+ASS_CACHE_FILE = 'ass_dependencies.json'
+TX_CACHE_DIR = 'tx_cache'
+ASS_PATH = re.compile(br'^\s*(?:filename|dso)\s+"([^"]+)"')
+# Geometry arrays can be written on a single very long line, so lines
+# are read in pieces of at most this many bytes.
+ASS_READ_LIMIT = 64 * 1024
+FRAME_PATTERN = re.compile(r'#+')
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for data in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def parse_ass(ass_file):
+    """Find the file paths set on the nodes of an Arnold scene source file,
+    such as the textures of image nodes and the files of nested procedurals.
+    The file is streamed, so memory use doesn't grow with the size of the file.
+
+    :param str ass_file: The path to the .ass or gzipped .ass.gz file.
+    :returns: A list of the paths as written in the file.
+    """
+    paths = []
+    opener = gzip.open if ass_file.lower().endswith('.gz') else open
+    with opener(ass_file, 'rb') as handle:
+        for line in iter(lambda: handle.readline(ASS_READ_LIMIT), b''):
+            if b'filename' not in line and b'dso' not in line:
+                continue
+            match = ASS_PATH.match(line)
+            if match:
+                path = match.group(1).decode('utf-8', 'replace')
+                if path not in paths:
+                    paths.append(path)
+    return paths
+
+
+def expand_frames(path, frames, offset=0):
+    """Expand a '#' frame pattern path to the existing files of the given frames.
+
+    :param str path: The path, with a '#' per digit of the padded frame number.
+    :param list frames: The frames to expand.
+    :param int offset: The offset added to each frame number.
+    """
+    files = []
+    for frame in frames:
+        frame_path = FRAME_PATTERN.sub(lambda m: str(frame + offset).zfill(len(m.group())), path)
+        if frame_path not in files and os.path.isfile(frame_path):
+            files.append(frame_path)
+    return files
+
+
+class AssDependencyCache(object):
+    """The paths referenced by each parsed .ass file by the hash of the file,
+    so that files that haven't changed don't need to be parsed again. Files
+    are only hashed again if their size or modification time has changed.
+    """
+
+    def __init__(self, cache_file):
+        """Load the cache.
+
+        :param str cache_file: The path to the cache JSON file.
+        """
+        self._log = logging.getLogger('AzureBatchMaya')
+        self.path = cache_file
+        self.files = {}
+        self.dependencies = {}
+        self.modified = False
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r') as cache:
+                    data = json.load(cache)
+                self.files = data['files']
+                self.dependencies = data['dependencies']
+            except (EnvironmentError, ValueError, KeyError) as exp:
+                self._log.warning("Failed to load .ass dependency cache: {}".format(exp))
+
+    def get(self, ass_file):
+        """Get the paths referenced by an .ass file, parsing the file if it
+        hasn't been parsed before.
+        """
+        stat = os.stat(ass_file)
+        key = os.path.normcase(os.path.abspath(ass_file))
+        entry = self.files.get(key)
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime]:
+            file_hash = entry[2]
+        else:
+            file_hash = _file_hash(ass_file)
+            self.files[key] = [stat.st_size, stat.st_mtime, file_hash]
+            self.modified = True
+        if file_hash not in self.dependencies:
+            self.dependencies[file_hash] = parse_ass(ass_file)
+            self.modified = True
+        return self.dependencies[file_hash]
+
+    def save(self):
+        if not self.modified:
+            return
+        try:
+            with open(self.path, 'w') as cache:
+                json.dump({'files': self.files, 'dependencies': self.dependencies}, cache)
+            self.modified = False
+        except EnvironmentError as exp:
+            self._log.warning("Failed to save .ass dependency cache: {}".format(exp))
+
+
+def scan_ass_files(ass_files, cache):
+    """Find the files referenced by .ass files, and by any .ass files that
+    they reference in turn. Relative paths are resolved against the directory
+    of the .ass file where the file exists.
+
+    :param list ass_files: The paths to the .ass files.
+    :param cache: The parsed .ass file cache.
+    :type cache: :class:`.AssDependencyCache`
+    :returns: A list of the referenced paths.
+    """
+    log = logging.getLogger('AzureBatchMaya')
+    found = []
+    scanned = set()
+    to_scan = list(ass_files)
+    while to_scan:
+        ass_file = to_scan.pop(0)
+        key = os.path.normcase(os.path.abspath(ass_file))
+        if key in scanned or not os.path.isfile(ass_file):
+            continue
+        scanned.add(key)
+        try:
+            references = cache.get(ass_file)
+        except Exception as exp:
+            log.warning("Failed to read .ass file {}: {}".format(ass_file, exp))
+            continue
+        for path in references:
+            local_path = os.path.normpath(os.path.join(os.path.dirname(ass_file), path))
+            if not os.path.isabs(path) and os.path.exists(local_path):
+                path = local_path
+            if path not in found:
+                found.append(path)
+            if path.lower().endswith(ASS_EXTENSIONS):
+                to_scan.append(path)
+    return found
+
 
 class ArnoldRenderJob(AzureBatchRenderJob):
 
@@ -51,6 +199,16 @@ class ArnoldRenderJob(AzureBatchRenderJob):
         self.start = self.display_int("Start frame:   ", self.start_frame, edit=True)
         self.end = self.display_int("End frame:   ", self.end_frame, edit=True)
         self.step = self.display_int("Frame step:   ", self.frame_step, edit=True)
+        self.frames = self.display_string("Frames:   ", "", edit=True)
+        self.chunk = self.display_int("Frames per task:   ", 0, edit=True)
+        self.packing = self.display_int("Tasks per node:   ", 1, edit=True)
+        self.split = self.display_menu("Split tasks by:   ", [t[0] for t in TASK_SPLITS], 1)
+        self.order = self.display_menu("Task order:   ", [t[0] for t in TASK_ORDERS], 1)
+        self.dispatch = self.display_menu("Dispatch:   ", [d[0] for d in DISPATCH_MODES], 1)
+        self.render_mode = self.display_menu("Render with:   ", [m[0] for m in RENDER_MODES], 1)
+        self.cache = self.display_check("Reuse cached frames:   ", False)
+        self.convert_tx = self.display_check("Convert textures to .tx:   ", False)
+        self.display_tiles()
         self.additional_flags_field = self.display_string("Additional flags:   ", self.additional_flags, edit=True)
 
         try:
@@ -99,6 +257,7 @@ class ArnoldRenderJob(AzureBatchRenderJob):
         params['frameEnd'] = cmds.intField(self.end, query=True, value=True)
         params['frameStep'] = cmds.intField(self.step, query=True, value=True)
         params['renderer'] = self._renderer
+        self.set_task_frames(params)
         params['logLevel'] = int(cmds.optionMenu(self.logging, query=True, select=True)) - 1
 
         #additionalFlags has to default to " " rather than an empty string, in order to be accepted by the template
@@ -113,6 +272,7 @@ class ArnoldRenderAssets(AzureBatchRenderAssets):
 
     assets = []
     render_engine = 'arnold'
+    tiled_textures = False
     replace_pattern = re.compile(r'#+')
     file_nodes = {
         'aiStandIn': ['dso'],
@@ -142,20 +302,99 @@ class ArnoldRenderAssets(AzureBatchRenderAssets):
         else:
             return path
 
-    def renderer_assets(self):
+    def get_frames(self):
+        """The frames of the scene render range, used when the frames to be
+        rendered aren't known, like when listing the assets of the scene.
+        """
+        if mel.eval("getAttr defaultRenderGlobals.animation"):
+            start = int(mel.eval("getAttr defaultRenderGlobals.startFrame"))
+            end = int(mel.eval("getAttr defaultRenderGlobals.endFrame"))
+        else:
+            start = end = int(cmds.currentTime(query=True))
+        step = max(1, int(mel.eval("getAttr defaultRenderGlobals.byFrameStep")))
+        return list(range(start, end + 1, step))
+
+    def standin_files(self, node, path, frames):
+        """The files of a stand-in for the frames to be rendered. Stand-ins
+        using a frame sequence are expanded to the files of those frames,
+        rather than uploading the whole sequence.
+        """
+        if '#' not in path or not cmds.getAttr(node + '.useFrameExtension'):
+            return [path]
+        offset = int(round(cmds.getAttr(node + '.frameOffset') or 0))
+        return expand_frames(path, frames, offset) or [path]
+
+    def renderer_assets(self, frames=None):
+        """The asset paths of the Arnold nodes of the scene.
+
+        :param list frames: The frames to be rendered, to which frame sequence
+         stand-ins are expanded. By default the frames of the render range.
+        """
         self.assets = []
         collected = []
+        ass_files = []
+        if frames is None:
+            frames = self.get_frames()
         for node_type, attributes in self.file_nodes.items():
             nodes = cmds.ls(type=node_type)
             for node in nodes:
                 for attr in attributes:
                     path = cmds.getAttr(node + '.' + attr)
-                    if path:
+                    if not path:
+                        continue
+                    if node_type == 'aiStandIn':
+                        paths = self.standin_files(node, path, frames)
+                        ass_files.extend(p for p in paths if p.lower().endswith(ASS_EXTENSIONS))
+                        collected.extend(paths)
+                    else:
                         collected.append(path)
+        if ass_files:
+            cache = AssDependencyCache(os.path.join(
+                cmds.internalVar(userPrefDir=True), 'AzureBatchData', ASS_CACHE_FILE))
+            collected.extend(scan_ass_files(ass_files, cache))
+            cache.save()
         for path in collected:
             self.assets.append(self.check_path(path))
         return self.assets
-    
+
+    def find_maketx(self):
+        """Find the maketx executable installed with MtoA, unless set
+        by the MAKETX environment variable or found on the PATH.
+        """
+        if os.environ.get('MAKETX'):
+            return os.environ['MAKETX']
+        name = 'maketx.exe' if sys.platform.startswith('win') else 'maketx'
+        for path in os.environ.get('PATH', '').split(os.pathsep):
+            if os.path.isfile(os.path.join(path.strip('"'), name)):
+                return os.path.join(path.strip('"'), name)
+        try:
+            plugin_path = cmds.pluginInfo('mtoa', query=True, path=True)
+        except RuntimeError:
+            plugin_path = None
+        if plugin_path:
+            maketx = os.path.join(os.path.dirname(os.path.dirname(plugin_path)), 'bin', name)
+            if os.path.isfile(maketx):
+                return maketx
+        return None
+
+    def convert_textures(self, paths):
+        """Convert the textures to tiled, mip-mapped .tx files, reusing the
+        files converted by previous jobs. The renders then use the .tx file
+        uploaded next to each texture.
+        """
+        self.tiled_textures = False
+        if not paths:
+            return {}
+        maketx = self.find_maketx()
+        if not maketx:
+            logging.getLogger('AzureBatchMaya').warning(
+                "Couldn't find maketx, textures won't be converted to .tx.")
+            return {}
+        cache = TxCache(os.path.join(cmds.internalVar(userPrefDir=True), 'AzureBatchData', TX_CACHE_DIR))
+        converted = cache.convert(paths, maketx)
+        self.tiled_textures = bool(converted)
+        return converted
+
     def setup_script(self, script_handle, pathmap, searchpaths):
         search_path = ';'.join(searchpaths).encode('utf-8')
         procedural_searchpath = str("setAttr -type \"string\" defaultArnoldRenderOptions.procedural_searchpath \"{}\";\n").format(search_path)
@@ -164,6 +403,8 @@ class ArnoldRenderAssets(AzureBatchRenderAssets):
         script_handle.write(procedural_searchpath)
         script_handle.write(plugin_searchpath)
         script_handle.write(texture_searchpath)
+        if self.tiled_textures:
+            script_handle.write("setAttr defaultArnoldRenderOptions.use_existing_tiled_textures 1;\n")
         
         # This kind of explicit asset re-direct is kinda ugly - so far
         # it only seems to be needed on aiImage nodes, which appear to
@@ -14,6 +14,27 @@ try:
 except NameError:
     pass
 
+TASK_SPLITS = [
+    ("Frame", 'frame'),
+    ("Render layer", 'layer'),
+    ("Layer and camera", 'camera')
+]
+
+DISPATCH_MODES = [
+    ("Task per chunk", 'tasks'),
+    ("Frame queue", 'queue')
+]
+
+TASK_ORDERS = [
+    ("Sequential", 'sequential'),
+    ("Preview first", 'progressive')
+]
+
+RENDER_MODES = [
+    ("Maya", 'maya'),
+    ("Standalone", 'standalone')
+]
+
 
 class AzureBatchRenderJob(object):
 
@@ -54,6 +75,113 @@ class AzureBatchRenderJob(object):
     def frame_step(self):
         return int(mel.eval("getAttr defaultRenderGlobals.byFrameStep"))
 
+    def get_frame_expression(self):
+        """An optional expression of the frames to render, such as
+        '1-10,25,40-100x5,!50'. If set, it is used in place of the start
+        frame, end frame and frame step.
+        """
+        if not hasattr(self, 'frames'):
+            return ""
+        return str(cmds.textField(self.frames, query=True, text=True)).strip()
+
+    def get_frames_per_task(self):
+        """The number of frames to be rendered by each task. If 0, the
+        number will be chosen on submission based on previous renders.
+        """
+        return max(0, cmds.intField(self.chunk, query=True, value=True))
+
+    def get_tasks_per_node(self):
+        """The number of tasks to run concurrently on each node of a new
+        pool, splitting its cores evenly between them. If 0, the number will
+        be chosen on submission from the throughput of previous renders.
+        """
+        if not hasattr(self, 'packing'):
+            return 1
+        return max(0, cmds.intField(self.packing, query=True, value=True))
+
+    def get_task_split(self):
+        """Whether each chunk of frames is rendered by a single task, or
+        split into a task per render layer, or per render layer and camera.
+        """
+        selected = cmds.optionMenu(self.split, query=True, select=True)
+        return TASK_SPLITS[selected - 1][1]
+
+    def get_dispatch(self):
+        """Whether each chunk of frames is rendered by its own task, or the
+        frames are queued for render workers that each keep a Maya session
+        running on a node.
+        """
+        if not hasattr(self, 'dispatch'):
+            return DISPATCH_MODES[0][1]
+        selected = cmds.optionMenu(self.dispatch, query=True, select=True)
+        return DISPATCH_MODES[selected - 1][1]
+
+    def get_render_mode(self):
+        """Whether frames are rendered in Maya, or exported to the scene
+        format of the renderer and rendered with its standalone renderer.
+        Only supported by renderers that display the render mode setting.
+        """
+        if not hasattr(self, 'render_mode'):
+            return RENDER_MODES[0][1]
+        selected = cmds.optionMenu(self.render_mode, query=True, select=True)
+        return RENDER_MODES[selected - 1][1]
+
+    def get_task_order(self):
+        """Whether tasks are rendered in frame order, or ordered so that an
+        even sample of frames across the job is rendered first.
+        """
+        if not hasattr(self, 'order'):
+            return TASK_ORDERS[0][1]
+        selected = cmds.optionMenu(self.order, query=True, select=True)
+        return TASK_ORDERS[selected - 1][1]
+
+    def get_tiles(self):
+        """The number of (columns, rows) of tiles each frame is split into,
+        to be rendered by separate tasks. Tiled rendering is only supported
+        by renderers that display the tile settings.
+        """
+        if not hasattr(self, 'tile_columns'):
+            return 1, 1
+        columns = cmds.intField(self.tile_columns, query=True, value=True)
+        rows = cmds.intField(self.tile_rows, query=True, value=True)
+        return max(1, columns), max(1, rows)
+
+    def get_distributed_nodes(self):
+        """The number of nodes each frame is rendered across with distributed
+        rendering, or 1 if frames are rendered on a single node. Only supported
+        by renderers that display the distributed rendering setting.
+        """
+        if not hasattr(self, 'distributed'):
+            return 1
+        return max(1, cmds.intField(self.distributed, query=True, value=True))
+
+    def get_use_cache(self):
+        """Whether to reuse the outputs of frames rendered by previous jobs
+        whose render inputs haven't changed.
+        """
+        if not hasattr(self, 'cache'):
+            return False
+        return cmds.checkBox(self.cache, query=True, value=True)
+
+    def get_convert_textures(self):
+        """Whether to convert the textures to tiled, mip-mapped .tx files
+        before uploading. Only supported by renderers that display the
+        texture conversion setting.
+        """
+        if not hasattr(self, 'convert_tx'):
+            return False
+        return cmds.checkBox(self.convert_tx, query=True, value=True)
+
+    def set_task_frames(self, params):
+        """Add the template parameters for rendering a chunk of frames
+        per task, so each task renders frames from its first frame to its
+        first frame + taskFrameSpan (clamped to the job end frame).
+        """
+        frames_per_task = max(1, self.get_frames_per_task())
+        params['taskFrameStep'] = params['frameStep'] * frames_per_task
+        params['taskFrameSpan'] = params['frameStep'] * (frames_per_task - 1)
+        return params
+
     def get_title(self):
         if self.scene_name == "":
             return "Untitled"
@@ -78,6 +206,14 @@ class AzureBatchRenderJob(object):
         else:
             return cmds.text(label=value, align='left')
 
+    def display_check(self, label, value):
+        cmds.text(label=label, align='right')
+        return cmds.checkBox(label="", value=value)
+
+    def display_tiles(self):
+        self.tile_columns = self.display_int("Tile columns:   ", 1, edit=True)
+        self.tile_rows = self.display_int("Tile rows:   ", 1, edit=True)
+
     def display_menu(self, label, options, selected):
         cmds.text(label=label, align='right')
         menu = cmds.optionMenu()
@@ -178,8 +314,17 @@ class AzureBatchRenderAssets(object):
     assets = []
     render_engine = ""
 
-    def renderer_assets(self):
+    def renderer_assets(self, frames=None):
+        """The asset paths of the renderer's nodes in the scene, for the given
+        frames to be rendered, or the frames of the render range if None.
+        """
         return self.assets
 
+    def convert_textures(self, paths):
+        """Convert the texture assets to the renderer's optimized texture
+        format, returning a dict of the converted files of each texture.
+        """
+        return {}
+
     def setup_script(self, script_handle, pathmap, searchpaths):
         pass
@@ -12,7 +12,7 @@ import json
 
 from maya import cmds, mel
 
-from default import AzureBatchRenderJob, AzureBatchRenderAssets
+from default import AzureBatchRenderJob, AzureBatchRenderAssets, TASK_SPLITS, TASK_ORDERS, DISPATCH_MODES
 
 try:
     str = unicode
@@ -44,6 +44,13 @@ class AzureBatchMayaJob(AzureBatchRenderJob):
         self.start = self.display_int("Start frame:   ", self.start_frame, edit=True)
         self.end = self.display_int("End frame:   ", self.end_frame, edit=True)
         self.step = self.display_int("Frame step:   ", self.frame_step, edit=True)
+        self.frames = self.display_string("Frames:   ", "", edit=True)
+        self.chunk = self.display_int("Frames per task:   ", 0, edit=True)
+        self.packing = self.display_int("Tasks per node:   ", 1, edit=True)
+        self.split = self.display_menu("Split tasks by:   ", [t[0] for t in TASK_SPLITS], 1)
+        self.order = self.display_menu("Task order:   ", [t[0] for t in TASK_ORDERS], 1)
+        self.dispatch = self.display_menu("Dispatch:   ", [d[0] for d in DISPATCH_MODES], 1)
+        self.cache = self.display_check("Reuse cached frames:   ", False)
 
     def get_title(self):
         return str(cmds.textField(self.job_name, query=True, text=True))
@@ -81,6 +88,7 @@ class AzureBatchMayaJob(AzureBatchRenderJob):
         params["frameEnd"] = cmds.intField(self.end, query=True, value=True)
         params["frameStep"] = cmds.intField(self.step, query=True, value=True)
         params["renderer"] = self._renderer
+        self.set_task_frames(params)
         return params
 
 
@@ -89,5 +97,5 @@ class MayaRenderAssets(AzureBatchRenderAssets):
     assets = []
     render_engine = "mayaSoftware"
 
-    def renderer_assets(self):
+    def renderer_assets(self, frames=None):
         return self.assets
\ No newline at end of file
@@ -15,7 +15,8 @@ import gzip
 import glob
 import tempfile
 
-from default import AzureBatchRenderJob, AzureBatchRenderAssets
+from default import AzureBatchRenderJob, AzureBatchRenderAssets, TASK_SPLITS, TASK_ORDERS, DISPATCH_MODES, \
+    RENDER_MODES
 
 try:
     str = unicode
@@ -49,6 +50,16 @@ class VrayRenderJob(AzureBatchRenderJob):
         self.start = self.display_int("Start frame:   ", self.start_frame, edit=True)
         self.end = self.display_int("End frame:   ", self.end_frame, edit=True)
         self.step = self.display_int("Frame step:   ", self.frame_step, edit=True)
+        self.frames = self.display_string("Frames:   ", "", edit=True)
+        self.chunk = self.display_int("Frames per task:   ", 0, edit=True)
+        self.packing = self.display_int("Tasks per node:   ", 1, edit=True)
+        self.split = self.display_menu("Split tasks by:   ", [t[0] for t in TASK_SPLITS], 1)
+        self.order = self.display_menu("Task order:   ", [t[0] for t in TASK_ORDERS], 1)
+        self.dispatch = self.display_menu("Dispatch:   ", [d[0] for d in DISPATCH_MODES], 1)
+        self.render_mode = self.display_menu("Render with:   ", [m[0] for m in RENDER_MODES], 1)
+        self.cache = self.display_check("Reuse cached frames:   ", False)
+        self.display_tiles()
+        self.distributed = self.display_int("Nodes per frame:   ", 1, edit=True)
 
     def get_title(self):
         return str(cmds.textField(self.job_name, query=True, text=True))
@@ -86,6 +97,7 @@ class VrayRenderJob(AzureBatchRenderJob):
         params['frameEnd'] = cmds.intField(self.end, query=True, value=True)
         params['frameStep'] = cmds.intField(self.step, query=True, value=True)
         params['renderer'] = self._renderer
+        self.set_task_frames(params)
         return params
     
     def final_setup(self, job_data, asset_data):
@@ -126,7 +138,7 @@ class VrayRenderAssets(AzureBatchRenderAssets):
         else:
             return path
 
-    def renderer_assets(self):
+    def renderer_assets(self, frames=None):
         self.assets = []
         collected = []
 
@@ -16,7 +16,7 @@ import pkgutil
 import inspect
 import importlib
 import re
-from Queue import Queue
+from Queue import Queue, Empty
 
 from azure.batch_extensions import _file_utils as fileutils
 
@@ -26,6 +26,7 @@ from azurebatchmayaapi import MayaCallbacks as callback
 import azurebatchutils as utils
 from azurebatchutils import ProgressBar
 from exception import CancellationException, FileUploadException
+import scenescan
 
 from ui_assets import AssetsUI
 from default import AzureBatchRenderAssets
@@ -34,12 +35,124 @@ from default import AzureBatchRenderAssets
 SYS_SEARCHPATHS = []
 USR_SEARCHPATHS = []
 BYTES = 1024
+UPLOAD_POLICIES = ['largest_first', 'discovery']
+# The scripts that may be run by the tasks of a job, by the key of their URL
+# in the uploaded job assets.
+JOB_SCRIPTS = {
+    'merge_script': 'merge_tiles.py',
+    'worker_script': 'render_worker.py',
+    'kick_script': 'arnold_kick.py',
+    'vray_script': 'vray_standalone.py',
+    'utils_script': 'task_utils.py'
+}
+FRAME_MARKER = "[AzureBatch] Starting frame"
 try:
     str = unicode
 except NameError:
     pass
 
 
+def schedule_uploads(assets, critical=None, policy='largest_first'):
+    """Determine the order in which assets will be uploaded.
+    Any critical assets (e.g. the scene file and the pre-render scripts) are
+    split out into a reserved lane so that they are never queued behind bulk
+    data. The remaining assets are ordered according to the upload policy:
+    'largest_first' (longest-processing-time-first) starts the biggest files
+    as early as possible so the smaller files fill in around them, while
+    'discovery' retains the order in which the assets were found in the scene.
+
+    :param list assets: The assets to be uploaded.
+    :param list critical: Assets to be uploaded in the reserved lane.
+    :param str policy: The ordering policy for the remaining assets.
+    :returns: A tuple of two lists - the reserved lane assets and the
+     ordered bulk assets.
+    """
+    if policy not in UPLOAD_POLICIES:
+        raise ValueError("Unsupported upload policy: {}".format(policy))
+    critical_paths = set(a.path for a in critical or [])
+    reserved = [a for a in assets if a.path in critical_paths]
+    bulk = [a for a in assets if a.path not in critical_paths]
+    if policy == 'largest_first':
+        bulk.sort(key=lambda a: a.size, reverse=True)
+    return reserved, bulk
+
+
+def _path_parts(path):
+    """Split a local or remote directory path into its components,
+    irrespective of separator style.
+    """
+    return [p for p in path.replace('\\', '/').split('/') if p]
+
+
+def compile_path_map(pathmap, os_flavor, min_depth=2):
+    """Compile a path map of local directories to remote directories into the
+    minimal set of dirmap rules. As dirmap rules apply to everything below the
+    mapped directory, any mapping that is implied by a mapping of one of its
+    parent directories is redundant and is dropped. Sibling directories that
+    map consistently are collapsed into a single rule for their common parent,
+    as long as that parent is at least `min_depth` directories deep - we never
+    want to remap an entire drive or root directory.
+    Mappings that are not consistent with their parent (e.g. shortened paths)
+    are always retained.
+
+    :param dict pathmap: The local directory paths mapped to a function that
+     returns the remote path for a given OS flavor.
+    :param os_flavor: The OS flavor of the render nodes.
+    :returns: A list of (local, remote) tuples, most specific path first.
+    """
+    rules = {}
+    for local, remote in pathmap.items():
+        style = '\\' if '\\' in local else '/'
+        parts = tuple(_path_parts(local))
+        if parts:
+            rules[(style, parts)] = (local, tuple(_path_parts(remote(os_flavor))))
+
+    def implied(key, rule):
+        # Whether a rule is already covered by the rule for its closest parent
+        style, parts = key
+        for depth in range(len(parts) - 1, 0, -1):
+            parent = rules.get((style, parts[:depth]))
+            if parent:
+                return parent[1] + parts[depth:] == rule[1]
+        return False
+
+    collapsed = True
+    while collapsed:
+        collapsed = False
+        for key in sorted(rules, key=lambda k: len(k[1])):
+            if implied(key, rules[key]):
+                del rules[key]
+
+        below = {}
+        siblings = {}
+        for key, (local, remote) in rules.items():
+            style, parts = key
+            for depth in range(min_depth, len(parts)):
+                below.setdefault((style, parts[:depth]), []).append(key)
+            if len(parts) > min_depth and remote and remote[-1] == parts[-1]:
+                siblings.setdefault((style, parts[:-1], remote[:-1]), []).append(key)
+
+        for (style, parent, remote), children in sorted(siblings.items(), key=lambda s: -len(s[0][1])):
+            children = [c for c in children if c in rules]
+            if len(children) < 2 or (style, parent) in rules:
+                continue
+            # Only collapse if everything that would now be redirected by the
+            # parent rule is consistent with it.
+            descendants = [k for k in below[(style, parent)] if k in rules]
+            if any(rules[k][1] != remote + k[1][len(parent):] for k in descendants):
+                continue
+            local = rules[children[0]][0].rstrip('\\/')
+            local = local[:max(local.rfind('/'), local.rfind('\\'))]
+            for key in descendants:
+                del rules[key]
+            rules[(style, parent)] = (local, remote)
+            collapsed = True
+
+    compiled = sorted(rules.values(), key=lambda r: (-len(_path_parts(r[0])), r[0]))
+    sep = '\\\\' if os_flavor == utils.OperatingSystem.windows else '/'
+    return [(local, sep.join(remote)) for local, remote in compiled]
+
+
 class AzureBatchAssets(object):
     """Handler for asset file functionality."""
     
@@ -59,14 +172,24 @@ class AzureBatchAssets(object):
         self._upload_threads = None
         self._temp_dir = utils.create_temp_dir()
 
+        self.upload_policy = UPLOAD_POLICIES[0]
+
         self.batch = None
         self.modules = self._collect_modules()
-        self.ui = AssetsUI(self, frame)
+        self.ui = self._create_ui(frame)
         self.frame = frame
     
     def __del__(self):
         shutil.rmtree(self._temp_dir)
 
+    def _create_ui(self, frame):
+        """Create the assets tab of the plug-in UI.
+
+        :param frame: The shared plug-in UI frame.
+        :type frame: :class:`.AzureBatchUI`
+        """
+        return AssetsUI(self, frame)
+
     def _callback_refresh(self, *args):
         """Called by Maya when a new scene file is loaded, so we reset
         the asset and submission pages of the UI, as the file references
@@ -149,26 +272,36 @@ class AzureBatchAssets(object):
         """
         self.frame.select_tab(self._tab_index)
 
-    def _collect_assets(self):
+    def _collect_assets(self, frames=None):
         """Called on upload. If the asset tab has not yet been loaded before
         job submission is attempted, then the asset references have not yet
         been populated, so gathers the assets if they need it, otherwise return
         the current list of asset references.
+        :param list frames: The frames of the job being submitted, for which
+         the renderer assets are collected instead of the scene render range.
         """
         if not self.ui.ready:
             self.ui.prepare()
-        return self._assets.collect()
+        if frames is None:
+            return self._assets.collect()
+        return self._assets.collect(self.renderer.renderer_assets(frames))
 
-    def _create_remote_workspace(self, os_flavor):
+    def _create_remote_workspace(self, os_flavor, directory=None):
         """Create a custom workspace file to set as the remote rendering project.
+        All the file rules are retrieved with a single workspace query, rather
+        than querying and expanding each rule individually.
         :param str os_flavor: The chosen operating system of the render nodes, used
          to determine the formatting of the path remapping.
+        :param str directory: The directory to write the file to, if not the
+         temp directory.
         """
-        proj_file = os.path.join(self._temp_dir, "workspace.mel")
+        proj_file = os.path.join(directory or self._temp_dir, "workspace.mel")
+        root_dir = utils.get_root_dir()
+        file_rules = maya.workspace(query=True, fileRule=True) or []
         with open(proj_file, 'w') as handle:
-            for rule in maya.workspace(fileRuleList=True):
-                project_dir = maya.workspace(fileRuleEntry=rule)
-                remote_path = utils.get_remote_directory(maya.workspace(en=project_dir), os_flavor)
+            for rule, project_dir in zip(file_rules[0::2], file_rules[1::2]):
+                project_dir = os.path.join(root_dir, os.path.expandvars(project_dir))
+                remote_path = utils.get_remote_directory(project_dir, os_flavor)
                 if os_flavor == utils.OperatingSystem.windows:
                     full_remote_path = "X:\\\\" + remote_path
                 else:
@@ -177,10 +310,12 @@ class AzureBatchAssets(object):
                 handle.write(mapped_dir.encode('utf-8'))
         return Asset(proj_file, [], self.batch, self._log)
 
-    def _create_path_map(self, plugins, os_flavor):
+    def _create_path_map(self, plugins, os_flavor, directory=None):
         """Create the pre-render mel script to redirect all the asset reference
         directories for this render. Called on job submission, and the resulting
         file is uploaded as an asset to the current file group.
+        The path map is first compiled down to the minimal set of dirmap rules,
+        as the script is evaluated before every frame on every node.
         Also returns a formatted list of cloud destination directories as
         search paths that can be used according to renderer.
 
@@ -188,12 +323,21 @@ class AzureBatchAssets(object):
          also be enabled on the server.
         :param str os_flavor: The chosen operating system of the render nodes, used
          to determine the formatting of the path remapping.
+        :param str directory: The directory to write the file to, if not the
+         temp directory.
         """
-        map_file = os.path.join(self._temp_dir, "asset_map.mel")
+        map_file = os.path.join(directory or self._temp_dir, "asset_map.mel")
         pathmap = dict(self._assets.pathmaps)
         for asset in self._assets.refs:
             pathmap.update(asset.pathmap)
+        remote_root = "X:\\\\" if os_flavor == utils.OperatingSystem.windows else "/X/"
         cloud_paths = []
+        for remote in pathmap.values():
+            cloud_paths.append(remote_root + remote(os_flavor))
+        cloud_paths = sorted(set(cloud_paths))
+        dirmap_rules = compile_path_map(pathmap, os_flavor)
+        self._log.debug("Compiled {} path mappings into {} dirmap rules.".format(
+            len(pathmap), len(dirmap_rules)))
         with open(map_file, 'w') as handle:
             handle.write("global proc renderPrep()\n")
             handle.write("{\n")
@@ -201,36 +345,65 @@ class AzureBatchAssets(object):
                 for plugin in plugins:
                     handle.write("loadPlugin \"{}\";\n".format(plugin.encode('utf-8')))
             handle.write("dirmap -en true;\n")
-            for local, remote in pathmap.items():
-                if os_flavor == utils.OperatingSystem.windows:
-                    full_remote_path = "X:\\\\" + remote(os_flavor)
-                else:
-                    full_remote_path = "/X/" + remote(os_flavor)
+            for local, remote in dirmap_rules:
                 parsed_local = local.replace('\\', '\\\\')
-                cloud_paths.append(full_remote_path)
-                map_cmd = "dirmap -m \"{}\" \"{}\";\n".format(parsed_local, full_remote_path)
+                map_cmd = "dirmap -m \"{}\" \"{}\";\n".format(parsed_local, remote_root + remote)
                 handle.write(map_cmd.encode('utf-8'))
             self.renderer.setup_script(handle, pathmap, cloud_paths)
+            handle.write("}\n")
+            handle.write("global proc renderPrepFrame()\n")
+            handle.write("{\n")
+            handle.write("print(\"{} \" + `currentTime -q` + \"\\n\");\n".format(FRAME_MARKER))
             handle.write("}")
+        self._log.debug("Pre-render script size: {}".format(
+            self._format_size(float(os.path.getsize(map_file)))))
         return Asset(map_file, [], self.batch, self._log), ';'.join(cloud_paths)
 
-    def _upload_all(self, to_upload, progress, total_to_upload, project):
-        """Upload all selected assets in configured number of threads."""
+    def _upload_all(self, to_upload, progress, total_to_upload, project, critical=None):
+        """Upload all selected assets in configured number of threads.
+        Rather than uploading in fixed batches (where one large file holds up
+        the rest of its batch), each thread pulls the next asset from a shared
+        queue as soon as it is free. The first thread is reserved for any critical
+        assets before it joins the others on the bulk queue.
+
+        :param list critical: Small job-critical assets, like the scene file and
+         pre-render scripts, to be uploaded in the reserved lane.
+        """
         total_uploaded = 0.0
-        uploads_running = []
         progress_queue = Queue()
-        threads = self._upload_threads
-        self._log.debug("Uploading assets in {} threads.".format(threads))
-        for i in range(0, len(to_upload), threads):
-            for index, asset in enumerate(to_upload[i:i + threads]):
-                self._log.debug("Starting thread for asset: {}".format(asset.path))
-                upload = threading.Thread(
-                    target=asset.upload, args=(index, progress, progress_queue, project))
-                upload.start()
-                uploads_running.append(upload)
-            self._log.debug("Batch of asset uploads pending: {}".format(threading.active_count()))
+        reserved, bulk = schedule_uploads(to_upload, critical, self.upload_policy)
+        reserved_queue = Queue()
+        bulk_queue = Queue()
+        for index, asset in enumerate(reserved):
+            reserved_queue.put((index, asset))
+        for index, asset in enumerate(bulk):
+            bulk_queue.put((index + len(reserved), asset))
+
+        def upload_from(queues):
+            for queue in queues:
+                while True:
+                    try:
+                        index, asset = queue.get_nowait()
+                    except Empty:
+                        break
+                    self._log.debug("Starting upload of asset: {}".format(asset.path))
+                    asset.upload(index, progress, progress_queue, project)
+
+        threads = max(1, min(self._upload_threads, len(to_upload)))
+        self._log.debug("Uploading assets in {} threads with policy '{}'.".format(
+            threads, self.upload_policy))
+        uploads_running = []
+        for lane in range(threads):
+            queues = [reserved_queue, bulk_queue] if lane == 0 else [bulk_queue]
+            upload = threading.Thread(target=upload_from, args=(queues,))
+            upload.start()
+            uploads_running.append(upload)
+        try:
             while any(t for t in uploads_running if t.is_alive()) or not progress_queue.empty():
-                uploaded = progress_queue.get()
+                try:
+                    uploaded = progress_queue.get(True, 0.5)
+                except Empty:
+                    continue
                 if isinstance(uploaded, Exception):
                     raise uploaded
                 elif callable(uploaded):
@@ -239,6 +412,14 @@ class AzureBatchAssets(object):
                     total_uploaded = total_uploaded + uploaded
                     self.ui.upload_status("Synced {0} of {1}".format(self._format_size(total_uploaded), self._format_size(total_to_upload)))
                 progress_queue.task_done()
+        finally:
+            # Make sure no further uploads are started if we're bailing out early.
+            for queue in [reserved_queue, bulk_queue]:
+                while not queue.empty():
+                    try:
+                        queue.get_nowait()
+                    except Empty:
+                        break
 
     def _format_size(self, nbytes):
         """Format the data size in bytes to nicely display
@@ -275,16 +456,16 @@ class AzureBatchAssets(object):
         self._set_searchpaths()
         self._assets = Assets(self.batch)
 
-    def generate_sas_token(self, file_group):
+    def generate_sas_token(self, file_group, permission='rl'):
         """Generate SAS token for file group container with read and list
-        permissions.
+        permissions by default.
         TODO: Move this into BatchExtensions file utils.
         """
         container_name = fileutils.get_container_name(file_group)
         container_url = fileutils.generate_container_sas_token(
             container_name,
             self.batch.file.get_storage_client(),
-            permission='rl')
+            permission=permission)
         return container_url
         
     def set_assets(self):
@@ -293,7 +474,7 @@ class AzureBatchAssets(object):
         """
         self._configure_renderer()
         self._assets.gather()
-        self._assets.extend(self.renderer.renderer_assets())
+        self._assets.extend(self.renderer.renderer_assets(), renderer=True)
 
     def get_project(self):
         """Get the current project name in order to use this as the asset file
@@ -332,7 +513,8 @@ class AzureBatchAssets(object):
                     self._assets.add_asset(
                         os.path.join(root, filename), self.ui, column_layout, scroll_layout)
 
-    def upload(self, job_set=None, progress_bar=None, job_id=None, load_plugins=None, os_flavor=None):
+    def upload(self, job_set=None, progress_bar=None, job_id=None, load_plugins=None, os_flavor=None,
+               uploaded=None, convert_textures=False, frames=None, scripts=None):
         """Upload all the selected assets. Can be initiated as a standalone process
         from the assets tab, or as part of job submission.
         :param job_set: A list of job assets, like the scene file. This is only populated
@@ -345,6 +527,16 @@ class AzureBatchAssets(object):
          loading on the server. Only populated if part of a job submission.
         :param os_flavor: The OS flavor of the rendering pool. Only set as part of the job
          submission process.
+        :param set uploaded: The paths of the assets already uploaded by earlier jobs of
+         a batch submission, which are skipped. The paths uploaded are added to the set.
+        :param bool convert_textures: Whether to convert the textures with the renderer
+         and upload the converted file next to each texture. Only set as part of the
+         job submission process.
+        :param list frames: The frames of the job, for which frame sequence assets
+         of the renderer are uploaded. Only set as part of the job submission process.
+        :param list scripts: The keys in JOB_SCRIPTS of the scripts run by the tasks
+         of the job, which are uploaded with the job files and returned with their URLs.
+         Only set as part of the job submission process.
         """
         asset_data = {}
         try:
@@ -354,17 +546,36 @@ class AzureBatchAssets(object):
                 self.ui.upload_button.start()
                 self.ui.upload_status("Checking assets...")
 
-            asset_refs = self._collect_assets()
+            asset_refs = self._collect_assets(frames)
+            critical_refs = []
             self._log.debug("Finished collecting, preparing for upload.")
             if job_set:
                 self._log.debug("Preparing job specific assets")
                 job_assets = [Asset(j, None, self.batch, self._log) for j in job_set]
-                path_map, search_paths = self._create_path_map(load_plugins, os_flavor)
+                # Job files are written per job, so they aren't replaced by a later job
+                job_dir = os.path.join(self._temp_dir, job_id)
+                if not os.path.isdir(job_dir):
+                    os.makedirs(job_dir)
+                if convert_textures:
+                    progress_bar.status('Converting textures...')
+                converted = self.renderer.convert_textures(
+                    [a.path for a in asset_refs] if convert_textures else [])
+                converted_assets = [Asset(c, [], self.batch, self._log, utils.get_storage_file_path(t))
+                                    for t, c in converted.items()]
+                path_map, search_paths = self._create_path_map(load_plugins, os_flavor, job_dir)
                 thumb_script = Asset(os.path.join(os.environ['AZUREBATCH_TOOLS'], 'generate_thumbnails.py'),
                                      [], self.batch, self._log)
-                workspace = self._create_remote_workspace(os_flavor)
+                task_scripts = {key: Asset(os.path.join(os.environ['AZUREBATCH_TOOLS'], JOB_SCRIPTS[key]),
+                                           [], self.batch, self._log) for key in scripts or []}
+                workspace = self._create_remote_workspace(os_flavor, job_dir)
+                asset_data['manifest'] = [(a.storage_path, a.size, str(a.lastmodified)) for a in asset_refs]
+                asset_refs.extend(converted_assets)
+                if uploaded is not None:
+                    asset_refs = [a for a in asset_refs if a.path not in uploaded]
                 asset_refs.extend(job_assets)
-                asset_refs.extend([path_map, thumb_script, workspace])
+                job_scripts = [path_map, thumb_script, workspace] + list(task_scripts.values())
+                asset_refs.extend(job_scripts)
+                critical_refs = job_assets + job_scripts
                 asset_data['search_paths'] = search_paths
 
             progress_bar.is_cancelled()
@@ -377,11 +588,15 @@ class AzureBatchAssets(object):
             self.ui.upload_status("Syncing {0}...".format(self._format_size(payload)))
             maya.refresh()
             asset_data['project'] = self.ui.get_project()
-            self._upload_all(asset_refs, progress_bar, payload, asset_data['project'])
+            self._upload_all(asset_refs, progress_bar, payload, asset_data['project'], critical_refs)
+            if uploaded is not None:
+                uploaded.update(a.path for a in asset_refs)
             if job_set:
                 asset_data['path_map'] = path_map.get_url(asset_data['project'])
                 asset_data['thumb_script'] = thumb_script.get_url(asset_data['project'])
                 asset_data['workspace'] = workspace.get_url(asset_data['project'])
+                for key, script in task_scripts.items():
+                    asset_data[key] = script.get_url(asset_data['project'])
                 return asset_data, progress_bar
             else:
                 return None
@@ -414,6 +629,7 @@ class Assets(object):
         self._log = logging.getLogger('AzureBatchMaya')
         self.batch = batch
         self.refs = []
+        self.renderer_refs = []
         self.pathmaps = {}
   
     def _search_path(self, ref_path):
@@ -504,6 +720,31 @@ class Assets(object):
         self._log.debug("Found {0} references.".format(len(assets)))
         return assets
 
+    def _get_unloaded_references(self):
+        """Find the files used by unloaded Maya ASCII references, including
+        their nested references, by parsing the referenced scenes. The nodes
+        of unloaded references aren't in the scene to be found by
+        _get_textures and _get_caches.
+        """
+        assets = []
+        ref_nodes = maya.get_list(references=True)
+        unloaded = [maya.reference(r, filename=True, withoutCopyNumber=True)
+                    for r in ref_nodes if maya.reference(r, isLoaded=True) is False]
+        for ref_path in set([r for r in unloaded if r and scenescan.can_scan(r)]):
+            try:
+                dependencies = scenescan.scan_scene(ref_path, maya.workspace(query=True, fullName=True))
+            except (IOError, OSError) as exp:
+                self._log.warning("Failed to scan reference {0}: {1}".format(ref_path, exp))
+                continue
+            paths = dependencies['textures'] + dependencies['caches'] + dependencies['references']
+            for filepath in paths:
+                for _path in self._search_path(filepath):
+                    asset = Asset(_path, assets, self.batch, self._log)
+                    if not asset.is_duplicate(assets):
+                        assets.append(asset)
+        self._log.debug("Found {0} files used by unloaded references.".format(len(assets)))
+        return assets
+
     def _get_bifrost_caches(self, assets):
         start = maya.start_frame()
         end = maya.end_frame()
@@ -561,10 +802,12 @@ class Assets(object):
         refreshing the asset tab.
         """
         self.refs = []
+        self.renderer_refs = []
         self.pathmaps = {}
         self.refs.extend(self._get_textures())
         self.refs.extend(self._get_caches())
         self.refs.extend(self._get_references())
+        self.refs.extend(self._get_unloaded_references())
 
     def add_asset(self, file, ui, column_layout, scroll_layout):
         """Add an additional single file to the asset list."""
@@ -574,8 +817,11 @@ class Assets(object):
             asset.display(ui, column_layout, scroll_layout)
             self.refs.append(asset)
 
-    def extend(self, more_assets):
-        """Add additional assets to the current collection."""
+    def extend(self, more_assets, renderer=False):
+        """Add additional assets to the current collection.
+        :param bool renderer: Whether these are the assets of the renderer, which
+         are replaced by the renderer assets of the submitted frames on collection.
+        """
         assets = []
         for f in more_assets:
             try:
@@ -588,13 +834,30 @@ class Assets(object):
                 self._log.debug("Failed to extend assets: {0}".format(exp))
                 continue
         self.refs.extend(assets)
+        if renderer:
+            self.renderer_refs = assets
 
-    def collect(self):
+    def collect(self, renderer_assets=None):
         """Compile a list of the asset references that have been selected
         to include with the current job.
+        :param list renderer_assets: The renderer asset paths for the frames of
+         the job, replacing the renderer assets found for the render range of the
+         scene. Assets excluded from the asset tab remain excluded.
         """
         self._log.info("Collecting assets...")
         userfiles = [f for f in self.refs if f.included()]
+        if renderer_assets is not None:
+            userfiles = [f for f in userfiles if f not in self.renderer_refs]
+            skipped = userfiles + [f for f in self.renderer_refs if not f.included()]
+            for f in renderer_assets:
+                try:
+                    for _path in self._search_path(f):
+                        asset = Asset(_path, userfiles, self.batch, self._log)
+                        if asset.exists and not asset.is_duplicate(skipped):
+                            userfiles.append(asset)
+                            skipped.append(asset)
+                except Exception as exp:
+                    self._log.debug("Failed to collect renderer asset: {0}".format(exp))
         self._log.debug("Using {0} external assets.".format(len(userfiles)))
         return userfiles
 
@@ -604,7 +867,12 @@ class Asset(object):
     display listing and upload of the file.
     """
 
-    def __init__(self, filepath, parent, batch, log=None):
+    def __init__(self, filepath, parent, batch, log=None, storage_path=None):
+        """
+        :param str storage_path: The virtual directory to store the file in,
+         if not the directory of its own path. Files stored elsewhere, like
+         the converted files of a texture, aren't added to the path map.
+        """
         self.batch = batch
         if not os.path.isabs(filepath):
             filepath = os.path.join(utils.get_root_dir(), filepath)
@@ -618,7 +886,10 @@ class Asset(object):
         self.size = float(os.path.getsize(self.path)) if self.exists else 0
         self.display_text = None
         self.log = log
-        if self.exists:
+        if self.exists and storage_path:
+            self.pathmap = {}
+            self.storage_path = storage_path
+        elif self.exists:
             self.pathmap = {os.path.dirname(self.path): utils.get_remote_file_path(self.path)}
             self.storage_path = utils.get_storage_file_path(self.path)
         else:
@@ -44,6 +44,14 @@ class MayaAPI(object):
             LOG.debug("MayaAPI exception in 'get_attr': {0}".format(exp).strip())
             return ""
 
+    @staticmethod
+    def keyframe(*args, **kwargs):
+        try:
+            return cmds.keyframe(*args, **kwargs)
+        except Exception as exp:
+            LOG.debug("MayaAPI exception in 'keyframe': {0}".format(exp).strip())
+            return []
+
     @staticmethod
     def file(**kwargs):
         try:
@@ -52,6 +60,10 @@ class MayaAPI(object):
             LOG.debug("MayaAPI exception in 'file': {0}".format(exp).strip())
             return ""
 
+    @staticmethod
+    def open_file(scene_file):
+        return cmds.file(scene_file, open=True, force=True, prompt=False)
+
     @staticmethod
     def reference(*args, **kwargs):
         try:
@@ -87,9 +99,22 @@ class MayaAPI(object):
     def file_select(**kwargs):
         return cmds.fileDialog2(dialogStyle=2, **kwargs)
 
+    @staticmethod
+    def batch_mode():
+        """Whether Maya is running without a UI, e.g. in mayapy, where
+        dialogs can't be displayed.
+        """
+        try:
+            return cmds.about(batch=True)
+        except Exception as exp:
+            LOG.debug("MayaAPI exception in 'batch_mode': {0}".format(exp).strip())
+            return False
+
     @staticmethod
     def error(message):
         LOG.warning(message)
+        if MayaAPI.batch_mode():
+            return "OK"
         return cmds.confirmDialog(title="Error",
                                   message=message,
                                   messageAlign="left",
@@ -99,6 +124,8 @@ class MayaAPI(object):
     @staticmethod
     def warning(message):
         LOG.warning(message)
+        if MayaAPI.batch_mode():
+            return "OK"
         return cmds.confirmDialog(title="Warning",
                                   message=message,
                                   messageAlign="left",
@@ -108,6 +135,8 @@ class MayaAPI(object):
     @staticmethod
     def info(message):
         LOG.info(message)
+        if MayaAPI.batch_mode():
+            return "OK"
         return cmds.confirmDialog(title="",
                                   message=message,
                                   messageAlign="left",
@@ -117,6 +146,10 @@ class MayaAPI(object):
     @staticmethod
     def confirm(message, options):
         LOG.info(message)
+        if MayaAPI.batch_mode():
+            # Unattended, so go ahead with the first option
+            LOG.info("Running without a UI, selected '{0}'".format(options[0]))
+            return options[0]
         return cmds.confirmDialog(title="",
                                   message=message,
                                   messageAlign="left",
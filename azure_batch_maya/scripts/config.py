@@ -84,6 +84,38 @@ class AzureBatchConfig(object):
         #old method with dummy listPool etc calls slowed down opening,
         #so maybe do this in background after UI has been fully loaded
 
+    def initialize_headless(self, call):
+        """Authenticate using the cached configuration, without the
+        configuration UI. Signing in requires the user to enter a device
+        code, so the plug-in must already have been signed in to a Batch
+        account using the UI.
+
+        :param func call: The shared REST API call wrapper.
+        """
+        self._ini_file = "azure_batch.ini"
+        self._user_agent = "batchmaya/{}".format(os.environ.get('AZUREBATCH_VERSION'))
+        self._cfg = ConfigParser.ConfigParser()
+        self._call = call
+        self.aad_environment_provider = AADEnvironmentProvider()
+
+        self._cfg.read(self.path)
+        self._read_config_file()
+        if not self.can_init_from_config:
+            raise ValueError("No Batch account configuration found in {}. Sign in using "
+                             "the plug-in UI first.".format(self.path))
+        if self.need_to_refresh_auth_tokens([self.batch_auth_token, self.mgmt_auth_token]):
+            if not self.refresh_auth_tokens(self.batch_auth_token, self.mgmt_auth_token):
+                raise ValueError("The cached sign-in has expired. Sign in again using "
+                                 "the plug-in UI.")
+        self.mgmtCredentials = AADTokenCredentials(self.mgmt_auth_token,
+            cloud_environment=self.aad_environment_provider.getEnvironmentForId(self.aad_environment_id),
+            tenant=self.aad_tenant_name)
+        self.batchCredentials = AADTokenCredentials(self.batch_auth_token,
+            cloud_environment=self.aad_environment_provider.getEnvironmentForId(self.aad_environment_id),
+            tenant=self.aad_tenant_name)
+        self.init_from_config()
+        self.auth = True
+
     def __getattr__(self, attr):
         #return None rather than throw AttributeError so we don't have to init everything
         return self.__dict__.get(attr, None)
@@ -417,7 +449,9 @@ class AzureBatchConfig(object):
         """
         level = int(log_level)
         logger = logging.getLogger('AzureBatchMaya')
-        if len(logger.handlers) == 0:
+        # Other handlers, like the JSON output of headless submission, may
+        # already be attached, so only skip the log file if it's been added.
+        if not any(isinstance(h, logging.FileHandler) for h in logger.handlers):
             file_format = logging.Formatter(
                 "%(asctime)-15s [%(levelname)s] %(module)s: %(message)s")
             logfile = os.path.normpath(os.path.join(self._data_dir, "azure_batch.log"))
@@ -48,9 +48,17 @@ class AzureBatchEnvironment(object):
         self.licenses = OrderedDict()
         self._get_plugin_licenses()
         self.skus = self._load_skus()
-        self.ui = EnvironmentUI(self, frame, MARKETPLACE_IMAGES.keys(), self.skus, self.licenses)
+        self.ui = self._create_ui(frame)
         self.refresh()
 
+    def _create_ui(self, frame):
+        """Create the environment tab of the plug-in UI.
+
+        :param frame: The shared plug-in UI frame.
+        :type frame: :class:`.AzureBatchUI`
+        """
+        return EnvironmentUI(self, frame, MARKETPLACE_IMAGES.keys(), self.skus, self.licenses)
+
     def _load_skus(self):
         """Populate the list of available hardware SKUs."""
         sku_path = os.path.join(os.environ['AZUREBATCH_TOOLS'], 'skus.json')
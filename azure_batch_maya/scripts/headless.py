@@ -0,0 +1,539 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+from __future__ import unicode_literals
+
+import io
+import os
+import sys
+import json
+import logging
+import threading
+import traceback
+
+from default import AzureBatchRenderJob, TASK_SPLITS, TASK_ORDERS, DISPATCH_MODES, RENDER_MODES
+from config import AzureBatchConfig
+from submission import AzureBatchSubmission
+from assets import AzureBatchAssets
+from pools import AzureBatchPools
+from environment import AzureBatchEnvironment
+from shared import AzureBatchSettings
+from ui_submission import SubmissionUI
+from ui_environment import PoolImageMode
+from poolImageProvider import MARKETPLACE_IMAGES
+import shotlist
+import tasks
+
+
+EXIT_SUCCESS = 0
+EXIT_SUBMIT_FAILED = 1
+EXIT_INVALID_CONFIG = 2
+
+POOL_TYPES = {
+    'auto': SubmissionUI.AUTO_POOL,
+    'existing': SubmissionUI.EXISTING_POOL,
+    'new': SubmissionUI.NEW_POOL
+}
+
+
+class JsonOutput(object):
+    """Writes the events of a headless submission as lines of JSON, which
+    may be written from any thread.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, event, **values):
+        """Write an event.
+
+        :param str event: The type of event, e.g. 'progress' or 'job'.
+        """
+        values['event'] = event
+        line = json.dumps(values, sort_keys=True)
+        with self._lock:
+            self._stream.write(line + '\n')
+            self._stream.flush()
+
+
+class JsonLogHandler(logging.Handler):
+    """Writes the plug-in log messages as 'log' events."""
+
+    def __init__(self, output):
+        super(JsonLogHandler, self).__init__(logging.INFO)
+        self._output = output
+
+    def emit(self, record):
+        try:
+            self._output.write('log', level=record.levelname, message=record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+
+class JsonProgress(object):
+    """Reports submission progress as 'progress' events, in place of
+    :class:`.ProgressBar`. A headless submission can't be cancelled.
+    """
+
+    def __init__(self, output):
+        self.done = False
+        self._output = output
+        self._status = ""
+        self._value = 0
+        self._max = 0
+
+    def end(self):
+        self.done = True
+
+    def is_cancelled(self):
+        pass
+
+    def step(self):
+        self._value += 1
+        self._output.write('progress', status=self._status, value=self._value, max=self._max)
+
+    def status(self, status):
+        self._status = str(status)
+        self._output.write('progress', status=self._status, value=self._value, max=self._max)
+
+    def max(self, max_value):
+        self._value = 0
+        self._max = int(max_value)
+
+
+class HeadlessButton(object):
+    """Stands in for a :class:`.ProcButton`."""
+
+    def start(self):
+        pass
+
+    def update(self, update):
+        pass
+
+    def finish(self):
+        pass
+
+    def enable(self, enabled):
+        pass
+
+
+class HeadlessFrame(object):
+    """Stands in for the plug-in UI frame, holding the job configuration
+    for the headless tabs.
+    """
+
+    def __init__(self, job_settings):
+        """
+        :param dict job_settings: The loaded job configuration.
+        """
+        self.job_settings = job_settings
+
+    def select_tab(self, index):
+        pass
+
+    def selected_tab(self):
+        return None
+
+    def is_logged_in(self):
+        pass
+
+
+class HeadlessSubmissionUI(object):
+    """Stands in for the 'Submit' tab, with the pool selected by the
+    'pool' section of the job configuration.
+    """
+
+    def __init__(self, base, frame):
+        self.base = base
+        self.frame = frame
+        self.render_module = None
+        self.pool_settings = frame.job_settings.get('pool', {})
+        if self.pool_settings.get('type', 'auto') not in POOL_TYPES:
+            raise ValueError("Pool type must be one of: {}".format(', '.join(sorted(POOL_TYPES))))
+        if self.pool_settings.get('type') == 'existing' and not self.pool_settings.get('id'):
+            raise ValueError("The ID of the existing pool must be set.")
+
+    def is_logged_in(self):
+        pass
+
+    def submit_enabled(self, enable):
+        pass
+
+    def submit_status(self, status):
+        self.base._log.debug("Submission status: {}".format(status))
+
+    def get_pool(self):
+        pool_type = POOL_TYPES[self.pool_settings.get('type', 'auto')]
+        if pool_type == SubmissionUI.EXISTING_POOL:
+            return {pool_type: self.pool_settings['id']}
+        return {pool_type: (int(self.pool_settings.get('dedicated', 1)),
+                            int(self.pool_settings.get('lowPriority', 0)))}
+
+    def get_task_container_image(self):
+        if self.pool_settings.get('type') == 'existing':
+            return self.pool_settings.get('containerImage')
+        return self.base.env_manager.get_task_container_image()
+
+
+class HeadlessAssetsUI(object):
+    """Stands in for the 'Assets' tab, with the asset project set by the
+    job configuration.
+    """
+
+    def __init__(self, base, frame):
+        self.base = base
+        self.frame = frame
+        self.ready = False
+        self.upload_button = HeadlessButton()
+
+    def refresh(self):
+        self.ready = False
+
+    def prepare(self):
+        if not self.ready:
+            self.base.set_assets()
+            self.ready = True
+
+    def get_project(self):
+        return self.frame.job_settings.get('project') or self.base.get_project()
+
+    def upload_status(self, status):
+        pass
+
+    def disable(self, enabled):
+        pass
+
+
+class HeadlessPoolsUI(object):
+    """Stands in for the 'Pools' tab."""
+
+    def __init__(self, base, frame):
+        self.base = base
+
+    def refresh(self):
+        pass
+
+
+class HeadlessEnvironmentUI(object):
+    """Stands in for the 'Env' tab, with the image and environment
+    variables set by the 'environment' section of the job configuration.
+    Only the Batch provided images are supported for new pools.
+    """
+
+    def __init__(self, base, frame, images, skus, licenses):
+        self.base = base
+        self.env_settings = frame.job_settings.get('environment', {})
+        self.image = self.env_settings.get('image', 'Centos 73')
+        if self.image not in images:
+            raise ValueError("Image must be one of: {}".format(', '.join(sorted(images))))
+
+    def refresh(self):
+        pass
+
+    def select_image(self, image):
+        pass
+
+    def select_sku(self, sku):
+        pass
+
+    def get_image_type(self):
+        return PoolImageMode.MARKETPLACE_IMAGE
+
+    def get_selected_marketplace_image(self):
+        return self.image
+
+    def get_node_sku_id(self):
+        return self.base.get_marketplace_image()['node_sku_id']
+
+    def get_task_container_image(self):
+        return None
+
+    def get_pool_container_images(self):
+        return []
+
+    def get_container_image_reference(self):
+        return None
+
+    def get_env_vars(self):
+        return dict(self.env_settings.get('variables', {}))
+
+
+class HeadlessRenderJob(object):
+    """Job settings of a render module read from the 'render' section of
+    the job configuration, rather than from the submission tab. Mixed in
+    ahead of the render module of the scene renderer, so the settings the
+    module supports are those it would display.
+    """
+
+    job_settings = {}
+
+    def display(self, layout):
+        self.settings()
+
+    def delete(self):
+        pass
+
+    def disable(self, enable):
+        pass
+
+    def display_empty(self):
+        pass
+
+    def display_int(self, label, value, edit=True):
+        pass
+
+    def display_string(self, label, value, edit=True):
+        pass
+
+    def display_check(self, label, value):
+        pass
+
+    def display_menu(self, label, options, selected):
+        pass
+
+    def display_button(self, label, cmd):
+        pass
+
+    def display_file(self, label, value, cmd):
+        pass
+
+    def display_options(self, label, options):
+        pass
+
+    def _choice(self, name, choices):
+        values = [c[1] for c in choices]
+        value = self.job_settings.get(name, values[0])
+        if value not in values:
+            raise ValueError("Setting '{}' must be one of: {}".format(name, ', '.join(values)))
+        return value
+
+    def get_title(self):
+        return AzureBatchRenderJob.get_title(self)
+
+    def get_jobdata(self):
+        if self.scene_name == '':
+            raise ValueError("Scene has not been saved to disk.")
+        return self.scene_name, [self.scene_name]
+
+    def get_params(self):
+        params = {}
+        params['frameStart'] = self.start_frame
+        params['frameEnd'] = self.end_frame
+        params['frameStep'] = self.frame_step
+        params['renderer'] = self._renderer
+        self.set_task_frames(params)
+        params.update(self.job_settings.get('parameters', {}))
+        return params
+
+    def get_frame_expression(self):
+        if not hasattr(self, 'frames'):
+            return ""
+        return str(self.job_settings.get('frames', "")).strip()
+
+    def get_frames_per_task(self):
+        return max(0, int(self.job_settings.get('framesPerTask', 0)))
+
+    def get_tasks_per_node(self):
+        if not hasattr(self, 'packing'):
+            return 1
+        return max(0, int(self.job_settings.get('tasksPerNode', 1)))
+
+    def get_task_split(self):
+        return self._choice('taskSplit', TASK_SPLITS)
+
+    def get_dispatch(self):
+        if not hasattr(self, 'dispatch'):
+            return DISPATCH_MODES[0][1]
+        return self._choice('dispatch', DISPATCH_MODES)
+
+    def get_render_mode(self):
+        if not hasattr(self, 'render_mode'):
+            return RENDER_MODES[0][1]
+        return self._choice('renderMode', RENDER_MODES)
+
+    def get_task_order(self):
+        if not hasattr(self, 'order'):
+            return TASK_ORDERS[0][1]
+        return self._choice('taskOrder', TASK_ORDERS)
+
+    def get_tiles(self):
+        if not hasattr(self, 'tile_columns'):
+            return 1, 1
+        columns, rows = self.job_settings.get('tiles', (1, 1))
+        return max(1, int(columns)), max(1, int(rows))
+
+    def get_distributed_nodes(self):
+        if not hasattr(self, 'distributed'):
+            return 1
+        return max(1, int(self.job_settings.get('distributedNodes', 1)))
+
+    def get_use_cache(self):
+        if not hasattr(self, 'cache'):
+            return False
+        return bool(self.job_settings.get('reuseCache', False))
+
+    def get_convert_textures(self):
+        if not hasattr(self, 'convert_tx'):
+            return False
+        return bool(self.job_settings.get('convertTextures', False))
+
+
+def headless_renderer(renderer, job_settings):
+    """Create a render module of the same renderer, with its job settings
+    read from the job configuration.
+
+    :param renderer: The render module of the scene renderer.
+    :type renderer: :class:`.AzureBatchRenderJob`
+    :param dict job_settings: The 'render' section of the job configuration.
+    """
+    render_type = type(renderer)
+    headless_type = type(str('Headless' + render_type.__name__), (HeadlessRenderJob, render_type), {})
+    headless = headless_type()
+    headless.job_settings = job_settings
+    return headless
+
+
+class HeadlessSubmission(AzureBatchSubmission):
+
+    def _create_ui(self, frame):
+        return HeadlessSubmissionUI(self, frame)
+
+    def _configure_renderer(self):
+        super(HeadlessSubmission, self)._configure_renderer()
+        self.renderer = headless_renderer(self.renderer, self.frame.job_settings.get('render', {}))
+
+
+class HeadlessAssets(AzureBatchAssets):
+
+    def _create_ui(self, frame):
+        return HeadlessAssetsUI(self, frame)
+
+
+class HeadlessPools(AzureBatchPools):
+
+    def _create_ui(self, frame):
+        return HeadlessPoolsUI(self, frame)
+
+
+class HeadlessEnvironment(AzureBatchEnvironment):
+
+    def _create_ui(self, frame):
+        return HeadlessEnvironmentUI(self, frame, MARKETPLACE_IMAGES.keys(), self.skus, self.licenses)
+
+    @property
+    def vm_sku(self):
+        return self.ui.env_settings.get('vmSize') or self._session.vm_sku
+    @vm_sku.setter
+    def vm_sku(self, value):
+        self._session.vm_sku = value
+
+
+class HeadlessSettings(AzureBatchSettings):
+    """The plug-in handlers, authenticated from the cached configuration
+    and configured from the job configuration rather than the plug-in UI.
+    """
+
+    def __init__(self, job_settings):
+        """
+        :param dict job_settings: The loaded job configuration.
+        """
+        self.config = AzureBatchConfig()
+        self._log = logging.getLogger('AzureBatchMaya')
+        self.frame = HeadlessFrame(job_settings)
+        self.config.initialize_headless(self.call)
+
+        self.submission = HeadlessSubmission(self.tab_index['SUBMIT'], self.frame, self.call)
+        self.assets = HeadlessAssets(self.tab_index['ASSETS'], self.frame, self.call)
+        self.pools = HeadlessPools(self.tab_index['POOLS'], self.frame, self.call)
+        self.env = HeadlessEnvironment(self.tab_index['ENV'], self.frame, self.call)
+
+        self.env.configure(self.config, self.submission, self.assets)
+        self.assets.configure(self.config, self.submission, self.env)
+        self.pools.configure(self.config, self.env)
+        self.submission.start(self.config, self.assets, self.pools, self.env)
+
+
+def load_job_settings(config_file):
+    """Load a job configuration, and the shots it lists to be submitted.
+    The scenes are listed either in 'scenes', as scene paths or dicts with
+    the 'scene', 'frames' and 'overrides' of each shot, or in a shot list
+    file set by 'shotList'. Relative paths are relative to the directory of
+    the job configuration.
+
+    :param str config_file: The path to the job configuration JSON file,
+     or '-' to read it from stdin.
+    :returns: A tuple of the job configuration and the list of shots.
+    """
+    if config_file == '-':
+        job_settings = json.load(sys.stdin)
+        config_dir = os.getcwd()
+    else:
+        with io.open(config_file, 'r', encoding='utf-8-sig') as handle:
+            job_settings = json.load(handle)
+        config_dir = os.path.dirname(os.path.abspath(config_file))
+    if not isinstance(job_settings, dict):
+        raise ValueError("The job configuration must be a JSON object.")
+
+    if job_settings.get('shotList'):
+        shots = shotlist.load_shot_list(os.path.join(config_dir, job_settings['shotList']))
+    else:
+        shots = []
+        for index, scene in enumerate(job_settings.get('scenes', []), 1):
+            shot = {'scene': scene} if not isinstance(scene, dict) else dict(scene)
+            if not shot.get('scene'):
+                raise ValueError("Scene {}: no scene file set.".format(index))
+            shot['scene'] = os.path.normpath(os.path.join(config_dir, shot['scene']))
+            if not os.path.isfile(shot['scene']):
+                raise ValueError("Scene {}: scene file '{}' not found.".format(index, shot['scene']))
+            if shot.get('frames'):
+                tasks.parse_frames(shot['frames'])
+            shot.setdefault('frames', None)
+            shot.setdefault('overrides', {})
+            shots.append(shot)
+    if not shots:
+        raise ValueError("No scenes found in the job configuration.")
+    return job_settings, shots
+
+
+def main(argv):
+    """Submit the jobs of a job configuration, writing the progress and
+    results to stdout as lines of JSON.
+
+    :param list argv: The command line arguments, of which the first is the
+     path to the job configuration.
+    :returns: The exit code: 0 if every job was submitted, 1 if any failed to
+     submit, or 2 if the job configuration or sign-in is not valid.
+    """
+    output = JsonOutput(sys.stdout)
+    log = logging.getLogger('AzureBatchMaya')
+    log.addHandler(JsonLogHandler(output))
+    if len(argv) != 1:
+        output.write('error', message="Usage: mayapy submit_jobs.py <job configuration JSON file>")
+        return EXIT_INVALID_CONFIG
+    try:
+        job_settings, shots = load_job_settings(argv[0])
+        session = HeadlessSettings(job_settings)
+    except Exception as exp:
+        log.debug(traceback.format_exc())
+        output.write('error', message=str(exp))
+        return EXIT_INVALID_CONFIG
+
+    name = job_settings.get('name') or os.path.splitext(os.path.basename(argv[0]))[0]
+    progress = JsonProgress(output)
+    try:
+        added, failed = session.submission.submit_batch(shots, name, progress)
+    except Exception as exp:
+        log.debug(traceback.format_exc())
+        output.write('error', message=str(exp))
+        return EXIT_SUBMIT_FAILED
+    finally:
+        progress.end()
+    for job in added:
+        output.write('job', id=job.id, name=job.display_name)
+    for scene, error in failed:
+        output.write('failed', scene=scene, message=error)
+    output.write('result', submitted=[j.id for j in added], failed=[f[0] for f in failed])
+    return EXIT_SUBMIT_FAILED if failed else EXIT_SUCCESS
@@ -14,12 +14,26 @@ import random
 import string
 import shutil
 import re
+import uuid
+import datetime
+
+try:
+    from urllib.parse import urlsplit, parse_qs, unquote
+except ImportError:
+    from urlparse import urlsplit, parse_qs
+    from urllib import unquote
 
 from azurebatchmayaapi import MayaAPI as maya
 from ui_jobhistory import JobHistoryUI
 
 import azure.batch as batch
 import azurebatchutils as utils
+import tasks
+
+
+# How long the regenerated storage access tokens of a rerun job are valid for
+SAS_EXPIRY = datetime.timedelta(days=7)
+SAS_URL = re.compile(r'https?://[^\s"\'\\]+')
 
 
 class AzureBatchJobHistory(object):
@@ -36,6 +50,7 @@ class AzureBatchJobHistory(object):
         self._log = logging.getLogger('AzureBatchMaya')
         self._call = call
         self._session = None
+        self._submission = None
         self._tab_index = index
         self.batch = None
         self.index = 0
@@ -46,6 +61,7 @@ class AzureBatchJobHistory(object):
       
         self.all_jobs = []
         self.jobs = []
+        self.task_states = {}
         self.selected_job = None
         self.ui = JobHistoryUI(self, frame)
 
@@ -100,7 +116,7 @@ class AzureBatchJobHistory(object):
         try:
             if not os.path.isfile(thumb_path):
                 self._log.info("Downloading task thumbnail: {}".format(thumbs[-1]))
-                self.storage.get_blob_to_path('fgrp-' + job.id, thumbs[-1], thumb_path)
+                self.storage.get_blob_to_path('fgrp-' + self._get_output_group(job), thumbs[-1], thumb_path)
                 self._log.info("    thumbnail download successful.\n")
         except Exception as exp:
             self._log.warning(exp)
@@ -110,6 +126,16 @@ class AzureBatchJobHistory(object):
         self.selected_job.set_thumbnail(thumb_path, self._get_image_height(thumb_path))
         maya.refresh()
 
+    def _get_output_group(self, job):
+        """Get the name of the file group that a job uploads its outputs to.
+        A job rerunning the failed tasks of another job uploads its outputs
+        to the file group of the original job.
+        """
+        for item in job.metadata or []:
+            if item.name == 'Outputs':
+                return item.value
+        return job.id
+
     def _set_num_jobs(self):
         """Calculate the paging progress label, including which page
         is currently displayed out of how many.
@@ -136,11 +162,12 @@ class AzureBatchJobHistory(object):
         self.ui.last_page = not self.max
         self.ui.first_page = not self.min
 
-    def configure(self, session):
+    def configure(self, session, submission):
         """Populate the Batch client for the current sessions of the job history tab.
         Called on successful authentication.
         """
         self._session = session
+        self._submission = submission
         self.batch = self._session.batch
         self.storage = self._session.storage
 
@@ -232,6 +259,23 @@ class AzureBatchJobHistory(object):
             self._log.warning("Failed to update job details {0}".format(exp))
             self.ui.refresh()
 
+    def _get_task_counts(self, job_id):
+        """Count the tasks of a job, using the job task counts where they're
+        available, or otherwise the state of each task, listing only the tasks
+        that have changed state since the job was last loaded.
+        :returns: The number of tasks, completed tasks and failed tasks.
+        """
+        states = self.task_states.setdefault(job_id, tasks.TaskStates())
+        if states.job_counts and hasattr(self.batch.job, 'get_task_counts'):
+            try:
+                return tasks.job_task_counts(self._call(self.batch.job.get_task_counts, job_id))
+            except ValueError as exp:
+                self._log.info("Job task counts unavailable, listing tasks instead: {}".format(exp))
+                states.job_counts = False
+        options = batch.models.TaskListOptions(filter=states.filter, select=tasks.TASK_STATE_SELECT)
+        states.update(self._call(self.batch.task.list, job_id, task_list_options=options))
+        return states.counts()
+
     def load_tasks(self):
         """Get a list of tasks associated with the job."""
         try:
@@ -245,18 +289,16 @@ class AzureBatchJobHistory(object):
             self.selected_job.set_tasks('unknown')
             return
         try:
-            tasks = list(self._call(self.batch.task.list, job.id))
-            completed_tasks = [t for t in tasks if t.state == batch.models.TaskState.completed]
-            errored_tasks = [t for t in completed_tasks if t.execution_info.exit_code != 0]
+            total, completed, _ = self._get_task_counts(job.id)
             state = job.state.value
-            if len(tasks) == 0:
+            if total == 0:
                 percentage = 0
                 state = "Pending"
             else:
-                percentage = (100 * len(completed_tasks)) / (len(tasks))
+                percentage = (100 * completed) / total
             self.selected_job.set_status(state)
             self.selected_job.set_progress(str(percentage)+'%')
-            self.selected_job.set_tasks(len(tasks))
+            self.selected_job.set_tasks(total)
             maya.refresh()
         except Exception as exp:
             self._log.warning("Failed to update job details {0}".format(exp))
@@ -277,7 +319,7 @@ class AzureBatchJobHistory(object):
             self.selected_job.set_thumbnail(thumb, 24)
             return
         try:
-            blobs = self.storage.list_blobs('fgrp-' + job.id, prefix="thumbs/") # TODO
+            blobs = self.storage.list_blobs('fgrp-' + self._get_output_group(job), prefix="thumbs/") # TODO
         except Exception as exp:
             self._log.warning(exp)
             blobs = []
@@ -310,4 +352,162 @@ class AzureBatchJobHistory(object):
             maya.execute(self.get_thumbnail)
             maya.refresh()
         except (IndexError, AttributeError) as exp:
-            self._log.warning("Selected job index does not match jobs list.")
\ No newline at end of file
+            self._log.warning("Selected job index does not match jobs list.")
+
+    def _renew_sas(self, url):
+        """Generate a new access token for a storage container or blob URL,
+        with the permissions of its current token. URLs without a token are
+        returned unchanged.
+        """
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        if 'sig' not in query:
+            return url
+        path = parts.path.lstrip('/').split('/', 1)
+        kwargs = {
+            'permission': query.get('sp', ['r'])[0],
+            'start': datetime.datetime.utcnow() - datetime.timedelta(minutes=15),
+            'expiry': datetime.datetime.utcnow() + SAS_EXPIRY}
+        if len(path) == 1:
+            token = self.storage.generate_container_shared_access_signature(path[0], **kwargs)
+        else:
+            token = self.storage.generate_blob_shared_access_signature(
+                path[0], unquote(path[1]), **kwargs)
+        return "{}://{}{}?{}".format(parts.scheme, parts.netloc, parts.path, token)
+
+    def _renew_urls(self, text):
+        """Renew the access tokens of the storage URLs in a command line or
+        setting, which expire some days after the job was submitted.
+        """
+        if not text:
+            return text
+        return SAS_URL.sub(lambda m: self._renew_sas(m.group(0)), text)
+
+    def _renew_task_urls(self, task):
+        """Renew the access tokens of the resource files and command line of
+        the job preparation or release task of a job.
+        """
+        if not task:
+            return task
+        task.command_line = self._renew_urls(task.command_line)
+        for resource in task.resource_files or []:
+            resource.blob_source = self._renew_urls(resource.blob_source)
+        return task
+
+    def _rerun_task(self, task, job_id, rerun_id, rerun_ids):
+        """Copy a task of a job to be rerun as a task of the rerun job.
+        The job preparation directory, which Linux tasks reference by job ID,
+        is changed to that of the rerun job, and the access tokens of the
+        storage URLs of the task are renewed.
+
+        :param task: The task to rerun.
+        :type task: :class:`CloudTask`
+        :param str job_id: The ID of the job of the task.
+        :param str rerun_id: The ID of the rerun job.
+        :param set rerun_ids: The IDs of all the tasks being rerun, to which
+         the dependencies of the task are limited.
+        :returns: A :class:`TaskAddParameter` of the rerun task.
+        """
+        def rerun_value(value):
+            if not value:
+                return value
+            return self._renew_urls(value.replace(
+                "/workitems/{}/".format(job_id), "/workitems/{}/".format(rerun_id)))
+
+        depends_on = None
+        if task.depends_on and task.depends_on.task_ids:
+            task_ids = [i for i in task.depends_on.task_ids if i in rerun_ids]
+            depends_on = batch.models.TaskDependencies(task_ids=task_ids) if task_ids else None
+        environment = None
+        if task.environment_settings:
+            environment = [batch.models.EnvironmentSetting(name=e.name, value=rerun_value(e.value))
+                           for e in task.environment_settings]
+        for resource in task.resource_files or []:
+            resource.blob_source = self._renew_urls(resource.blob_source)
+        for output in task.output_files or []:
+            if output.destination.container:
+                output.destination.container.container_url = self._renew_urls(
+                    output.destination.container.container_url)
+        return batch.models.TaskAddParameter(
+            id=task.id,
+            command_line=rerun_value(task.command_line),
+            display_name=task.display_name,
+            container_settings=task.container_settings,
+            exit_conditions=task.exit_conditions,
+            resource_files=task.resource_files,
+            output_files=task.output_files,
+            environment_settings=environment,
+            constraints=task.constraints,
+            user_identity=task.user_identity,
+            multi_instance_settings=task.multi_instance_settings,
+            depends_on=depends_on,
+            application_package_references=task.application_package_references)
+
+    def rerun_failed(self):
+        """Submit a new job to rerun the failed tasks of the selected job, and
+        any tasks that completed without rendering images for their frames.
+        The new job reuses the pool, job preparation task and task definitions
+        of the original job, so the uploaded assets, path map and template
+        parameters are reused without collecting or uploading anything.
+        Outputs are uploaded to the output file group of the original job.
+        The access tokens of the storage URLs of the job are renewed, as
+        they may have expired since the job was submitted.
+        """
+        try:
+            job = self._call(self.batch.job.get, self.selected_job_id())
+        except (IndexError, AttributeError):
+            self._log.warning("Selected job index does not match jobs list.")
+            return
+        try:
+            metadata = [m for m in job.metadata or [] if not m.name.startswith('az_batch')]
+            frame_step = int(next((m.value for m in metadata if m.name == 'FrameStep'), 1))
+            output_group = self._get_output_group(job)
+            job_tasks = list(self._call(self.batch.task.list, job.id))
+            try:
+                outputs = [b.name for b in self.storage.list_blobs('fgrp-' + output_group)]
+            except Exception as exp:
+                self._log.warning("Failed to list job outputs: {}".format(exp))
+                outputs = None
+            rendered_frames = tasks.output_frames(outputs) if outputs is not None else None
+            rerun = tasks.rerun_tasks(job_tasks, rendered_frames, frame_step)
+            if not rerun:
+                maya.info("Job {} has no failed or missing frames to rerun.".format(job.id))
+                return
+
+            rerun_id = "maya-render-{}".format(uuid.uuid4())
+            rerun_ids = set(t.id for t in rerun)
+            rerun_tasks = [self._rerun_task(t, job.id, rerun_id, rerun_ids) for t in rerun]
+
+            metadata = [m for m in metadata if m.name not in ['Outputs', 'RerunOf']]
+            metadata.append(batch.models.MetadataItem(name='Outputs', value=output_group))
+            metadata.append(batch.models.MetadataItem(name='RerunOf', value=job.id))
+            rerun_job = batch.models.JobAddParameter(
+                id=rerun_id,
+                pool_info=job.pool_info,
+                display_name="{} (rerun)".format(job.display_name),
+                job_preparation_task=self._renew_task_urls(job.job_preparation_task),
+                job_release_task=self._renew_task_urls(job.job_release_task),
+                common_environment_settings=job.common_environment_settings,
+                on_all_tasks_complete=batch.models.OnAllTasksComplete.no_action,
+                metadata=metadata,
+                uses_task_dependencies=job.uses_task_dependencies)
+            self._call(self.batch.job.add, rerun_job)
+            try:
+                # Tasks are added with the retries of job submission, which raises
+                # if any task fails to be added.
+                self._submission.add_tasks(rerun_id, rerun_tasks)
+                # The job can only be set to terminate once its tasks have been added
+                self._call(self.batch.job.patch, rerun_id, batch.models.JobPatchParameter(
+                    on_all_tasks_complete=job.on_all_tasks_complete))
+            except Exception:
+                # Don't leave a job behind that would never complete
+                try:
+                    self._call(self.batch.job.delete, rerun_id)
+                except Exception as exp:
+                    self._log.warning("Failed to delete rerun job {}: {}".format(rerun_id, exp))
+                raise
+            maya.info("Submitted job {} to rerun {} tasks of job {}.".format(
+                rerun_id, len(rerun_tasks), job.id))
+        except Exception as exp:
+            self._log.warning("Failed to rerun job {}: {}".format(job.id, exp))
+            maya.error("Failed to rerun job: {}".format(exp))
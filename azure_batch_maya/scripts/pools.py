@@ -38,7 +38,15 @@ class AzureBatchPools(object):
         self.selected_pool = None
         self.pools = []
 
-        self.ui = PoolsUI(self, frame)
+        self.ui = self._create_ui(frame)
+
+    def _create_ui(self, frame):
+        """Create the pools tab of the plug-in UI.
+
+        :param frame: The shared plug-in UI frame.
+        :type frame: :class:`.AzureBatchUI`
+        """
+        return PoolsUI(self, frame)
 
     def configure(self, session, env):
         """Populate the Batch client for the current sessions of the pools tab.
@@ -176,13 +184,19 @@ class AzureBatchPools(object):
         except AttributeError:
             raise ValueError('Selected pool is not valid.')
 
-    def create_pool(self, size, name):
+    def create_pool(self, size, name, tasks_per_node=1, inter_node=False):
         """Create and deploy a new pool.
         Called on job submission by submission.py.
         TODO: Support auto-scale formula.
+
+        :param int tasks_per_node: The number of tasks to run concurrently
+         on each node.
+        :param bool inter_node: Whether to enable communication between the
+         nodes, as needed by multi-instance tasks.
         """
         pool_config = self.environment.build_virtualmachineconfiguration()
-        self._log.info("Creating new pool '{}' with {} VMs.".format(name, size))
+        self._log.info("Creating new pool '{}' with {} VMs running {} tasks each.".format(
+            name, size, tasks_per_node))
         pool_id = 'Maya_Pool_{}'.format(uuid.uuid4())
         new_pool = models.PoolAddParameter(
             id=pool_id,
@@ -193,14 +207,20 @@ class AzureBatchPools(object):
             virtual_machine_configuration=pool_config,
             target_dedicated_nodes=int(size[0]),
             target_low_priority_nodes=int(size[1]),
-            max_tasks_per_node=1)
+            max_tasks_per_node=tasks_per_node,
+            enable_inter_node_communication=inter_node)
         self._call(self.batch.pool.add, new_pool)
         self._log.debug("Successfully created pool.")
         return {"poolId" : pool_id}
 
-    def create_auto_pool(self, size, job_name):
+    def create_auto_pool(self, size, job_name, tasks_per_node=1, inter_node=False):
         """Create a JSON auto pool specification.
         Called on job submission by submission.py.
+
+        :param int tasks_per_node: The number of tasks to run concurrently
+         on each node.
+        :param bool inter_node: Whether to enable communication between the
+         nodes, as needed by multi-instance tasks.
         """
         vm_config = self.environment.build_virtualmachineconfiguration()
         image_reference = vm_config.image_reference
@@ -227,7 +247,8 @@ class AzureBatchPools(object):
             'vmSize': self.environment.vm_sku,
             'displayName': "Auto Pool for {}".format(job_name),
             'virtualMachineConfiguration': pool_config,
-            'maxTasksPerNode': 1,
+            'maxTasksPerNode': tasks_per_node,
+            'enableInterNodeCommunication': inter_node,
             'applicationLicenses': self.environment.get_application_licenses(),
             'targetDedicatedNodes': int(size[0]),
             'targetLowPriorityNodes': int(size[1])}
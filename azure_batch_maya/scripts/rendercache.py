@@ -0,0 +1,153 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import re
+
+from azurebatchmayaapi import MayaAPI as maya
+import tasks
+
+
+CACHE_FILE = 'render_cache.json'
+TIME_CURVES = ['animCurveTL', 'animCurveTA', 'animCurveTT', 'animCurveTU']
+FRAME_PARAMS = ['frameStart', 'frameEnd', 'frameStep', 'taskFrameStep', 'taskFrameSpan']
+# Nodes whose saved state changes without changing the rendered images,
+# or that are captured per frame by evaluating the animation.
+IGNORED_NODES = ['time1', 'uiConfigurationScriptNode', 'sceneConfigurationScriptNode']
+NODE_BLOCK = re.compile(r'^(?:createNode (\w+)(?: .*?-n "([^"]+)")?|select -ne :(\w+);)')
+
+
+def _digest(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def scene_digest(scene_file):
+    """Hash the contents of a scene file, excluding the time-based animation
+    curves, which are instead evaluated for each frame. This means editing the
+    animation of some frames won't invalidate the cached outputs of the rest.
+    Only Maya ASCII scenes can be parsed, so for Maya Binary scenes the whole
+    file is hashed.
+
+    :param str scene_file: The path to the scene file.
+    """
+    digest = hashlib.sha1()
+    with open(scene_file, 'rb') as scene:
+        if not scene_file.lower().endswith('.ma'):
+            for data in iter(lambda: scene.read(1024 * 1024), b''):
+                digest.update(data)
+            return digest.hexdigest()
+        skip = False
+        for line in scene:
+            text = line.decode('utf-8', 'replace')
+            if not text[:1].isspace():
+                block = NODE_BLOCK.match(text)
+                if block:
+                    skip = block.group(1) in TIME_CURVES or \
+                        (block.group(2) or block.group(3)) in IGNORED_NODES
+                else:
+                    skip = False
+                # Comments and file info record when and where the file was saved
+                if text.startswith(('//', 'fileInfo')):
+                    continue
+            if not skip:
+                digest.update(line)
+    return digest.hexdigest()
+
+
+def animation_state(frames):
+    """Evaluate the time-based animation curves of the scene at each frame.
+
+    :param list frames: The frames to evaluate.
+    :returns: A list of hashes of the animation state, in the same order as
+     the frames.
+    """
+    curves = sorted(maya.get_list(type=TIME_CURVES) or [])
+    states = []
+    for frame in frames:
+        values = []
+        if curves:
+            values = maya.keyframe(curves, query=True, eval=True, time=(frame, frame)) or []
+        states.append(_digest(["{:.6g}".format(v) for v in values]))
+    return states
+
+
+def frame_fingerprints(scene_file, assets, settings, frames):
+    """Build a fingerprint of the inputs of each frame to be rendered.
+
+    :param str scene_file: The path to the scene file.
+    :param list assets: The (storage path, size, last modified) of each asset.
+    :param dict settings: The render settings of the job.
+    :param list frames: The frames to be rendered.
+    :returns: A dict of frame numbers to fingerprint.
+    """
+    inputs = _digest([scene_digest(scene_file), sorted(assets), settings])
+    states = animation_state(frames)
+    return {f: _digest([inputs, f, s]) for f, s in zip(frames, states)}
+
+
+class RenderCache(object):
+    """Local index of the frames rendered by previous jobs, by the
+    fingerprint of their render inputs.
+    """
+
+    def __init__(self, data_path):
+        """Load the render cache index.
+
+        :param str data_path: The plug-in data directory.
+        """
+        self._log = logging.getLogger('AzureBatchMaya')
+        self.path = os.path.join(data_path, CACHE_FILE)
+        self.index = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r') as cache:
+                    self.index = json.load(cache)
+            except (EnvironmentError, ValueError) as exp:
+                self._log.warning("Failed to load render cache: {}".format(exp))
+
+    def find_outputs(self, fingerprints, list_outputs):
+        """Find the outputs of earlier jobs that rendered frames with the
+        same fingerprint. A frame is only matched if its outputs still exist.
+
+        :param dict fingerprints: The fingerprint of each frame to be rendered.
+        :param func list_outputs: Lists the file names in an output file group.
+        :returns: A dict of frame numbers to a list of (file group, file name)
+         tuples of the outputs to reuse.
+        """
+        group_outputs = {}
+        cached = {}
+        for frame, fingerprint in fingerprints.items():
+            if fingerprint not in self.index:
+                continue
+            group, cached_frame = self.index[fingerprint]
+            if group not in group_outputs:
+                try:
+                    group_outputs[group] = tasks.frame_outputs(list_outputs(group)) or {}
+                except Exception as exp:
+                    self._log.warning("Failed to list outputs of {}: {}".format(group, exp))
+                    group_outputs[group] = {}
+            outputs = group_outputs[group].get(cached_frame)
+            if outputs:
+                cached[frame] = [(group, o) for o in outputs]
+        return cached
+
+    def record(self, output_group, fingerprints):
+        """Record the fingerprints of the frames to be output to a file group.
+
+        :param str output_group: The name of the output file group.
+        :param dict fingerprints: The fingerprint of each frame.
+        """
+        for frame, fingerprint in fingerprints.items():
+            self.index[fingerprint] = [output_group, frame]
+        try:
+            with open(self.path, 'w') as cache:
+                json.dump(self.index, cache)
+        except EnvironmentError as exp:
+            self._log.warning("Failed to save render cache: {}".format(exp))
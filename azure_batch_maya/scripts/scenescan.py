@@ -0,0 +1,253 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Find the external files used by a Maya ASCII scene without Maya, by
+parsing the scene file. This can be run as a script in its own process:
+
+    python scenescan.py <scene file> [<project directory>]
+
+which writes the dependencies of the scene to stdout as JSON.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import re
+import sys
+import json
+
+
+# String attributes holding the path of a file used by a node.
+TEXTURE_ATTRIBUTES = {
+    'file': ['ftn', 'fileTextureName'],
+    'psdFileTex': ['ftn', 'fileTextureName'],
+    'movie': ['ftn', 'fileTextureName'],
+    'imagePlane': ['imn', 'imageName'],
+    'audio': ['f', 'filename'],
+    'aiStandIn': ['dso'],
+    'aiPhotometricLight': ['aiFilename'],
+    'aiVolume': ['filename'],
+    'aiImage': ['filename'],
+    'VRayMesh': ['fn', 'fileName'],
+    'VRayScannedMtl': ['file'],
+    'VRayFastSSS2': ['prepassFileName'],
+    'VRayMeshMaterial': ['fileName', 'overrideFileName'],
+    'VRayMtlGLSL': ['fileName'],
+    'VRayMtlOSL': ['fileName'],
+    'VRaySimbiont': ['file'],
+    'VRayVRmatMtl': ['fileName'],
+}
+CACHE_ATTRIBUTES = {
+    'AlembicNode': ['fn', 'abc_File'],
+    'gpuCache': ['cfn', 'cacheFileName'],
+}
+# The cache path and cache name of a cacheFile node, as used by the plug-in
+# to gather caches in a Maya session.
+CACHE_FILE_ATTRIBUTES = (['cp', 'cachePath'], ['cn', 'cacheName'])
+SEQUENCE_ATTRIBUTES = ['ufe', 'useFrameExtension']
+TILING_ATTRIBUTES = ['uvt', 'uvTilingMode']
+SCANNED_ATTRIBUTES = set(a for attrs in list(TEXTURE_ATTRIBUTES.values()) + list(CACHE_ATTRIBUTES.values()) +
+                         list(CACHE_FILE_ATTRIBUTES) + [SEQUENCE_ATTRIBUTES, TILING_ATTRIBUTES] for a in attrs)
+
+SET_ATTR = re.compile(r'\s*setAttr\b[^"]*"\.(\w+)"')
+QUOTE = re.compile(r'\\.|"')
+TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)', re.DOTALL)
+ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+COPY_NUMBER = re.compile(r'\{\d+\}$')
+FRAME_NUMBER = re.compile(r'\d+(?=\D*$)')
+UDIM_TILE = re.compile(r'\d{4}(?=\D*$)')
+UV_TILE = re.compile(r'_u\d+_v\d+')
+
+
+def _unescape(value):
+    return ESCAPE.sub(lambda m: ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def _tokens(statement):
+    """Split a MEL statement into its arguments, with strings unquoted."""
+    tokens = []
+    for match in TOKEN.finditer(statement.rstrip().rstrip(';')):
+        if match.group(1) is not None:
+            tokens.append(_unescape(match.group(1)))
+        else:
+            tokens.append(match.group(2))
+    return tokens
+
+
+def _statements(scene):
+    """Iterate the MEL statements of a Maya ASCII scene that might hold a
+    file path, without buffering the (often very large) statements of mesh
+    and animation data.
+
+    :param scene: The scene file, opened in binary mode.
+    :returns: The tokens of each 'file' and 'createNode' statement, and of
+     each 'setAttr' statement of an attribute in SCANNED_ATTRIBUTES.
+    """
+    statement = None
+    in_string = False
+    for line in scene:
+        text = line.decode('utf-8', 'replace')
+        if statement is None:
+            if not text.strip() or text.lstrip().startswith('//'):
+                continue
+            command = text.lstrip().split(' ', 1)[0]
+            if command == 'setAttr':
+                attr = SET_ATTR.match(text)
+                statement = [] if attr and attr.group(1) in SCANNED_ATTRIBUTES else False
+            else:
+                statement = [] if command in ('file', 'createNode') else False
+        if statement is not False:
+            statement.append(text)
+        if in_string or '"' in text:
+            # Statements only end outside of string values
+            for match in QUOTE.finditer(text):
+                if match.group() == '"':
+                    in_string = not in_string
+        if not in_string and text.rstrip().endswith(';'):
+            if statement:
+                yield _tokens(''.join(statement))
+            statement = None
+
+
+def _pattern(path, sequence=False, tiling=0):
+    """Convert the frame and tile tokens of a file path to a glob pattern,
+    in the same way as the render modules do for paths found in the scene.
+    """
+    directory, name = os.path.split(path)
+    if '#' in name:
+        name = re.sub(r'#+', '[0-9]*', name)
+    elif sequence:
+        name = FRAME_NUMBER.sub('[0-9]*', name)
+    for token in ['<udim>', '<UDIM>']:
+        name = name.replace(token, '[0-9][0-9][0-9][0-9]')
+    for token in ['<tile>', '<uvtile>', '<UVTILE>']:
+        name = name.replace(token, '_u*_v*')
+    name = name.replace('<f>', '*')
+    if tiling == 3:
+        name = UDIM_TILE.sub('[0-9][0-9][0-9][0-9]', name)
+    elif tiling in (1, 2):
+        name = UV_TILE.sub('_u*_v*', name)
+    return os.path.join(directory, name) if directory else name
+
+
+def _project_dir(scene_file):
+    """Find the Maya project of a scene, as the nearest directory above the
+    scene with a workspace.mel file.
+    """
+    directory = os.path.dirname(os.path.abspath(scene_file))
+    while True:
+        if os.path.isfile(os.path.join(directory, 'workspace.mel')):
+            return directory
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _resolve(path, search_dirs):
+    """Resolve a path found in a scene to an absolute path, relative to the
+    project and scene directories. Unresolved paths are returned as written.
+    """
+    path = os.path.expandvars(COPY_NUMBER.sub('', path.strip()))
+    if os.path.isabs(path):
+        return os.path.normpath(path)
+    for directory in search_dirs:
+        candidate = os.path.normpath(os.path.join(directory, path))
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+
+def _read_scene(scene_file, search_dirs, found):
+    """Add the files used by a single scene to found, and return the paths
+    of the scenes it references.
+    """
+    node_type = None
+    node_values = {}
+    references = []
+
+    def add_node():
+        if node_type is None:
+            return
+        sequence = any(node_values.get(a) in ('1', 'yes', 'on', 'true') for a in SEQUENCE_ATTRIBUTES)
+        tiling = next((int(node_values[a]) for a in TILING_ATTRIBUTES
+                       if node_values.get(a, '').isdigit()), 0)
+        for attr in TEXTURE_ATTRIBUTES.get(node_type, []):
+            if node_values.get(attr):
+                found['textures'].add(_pattern(_resolve(node_values[attr], search_dirs), sequence, tiling))
+        for attr in CACHE_ATTRIBUTES.get(node_type, []):
+            if node_values.get(attr):
+                found['caches'].add(_resolve(node_values[attr], search_dirs))
+        if node_type == 'cacheFile':
+            path, name = [next((node_values[a] for a in attrs if node_values.get(a)), None)
+                          for attrs in CACHE_FILE_ATTRIBUTES]
+            if path and name:
+                found['caches'].add(os.path.join(_resolve(path, search_dirs), name) + '*')
+
+    with open(scene_file, 'rb') as scene:
+        for tokens in _statements(scene):
+            if tokens[0] == 'createNode':
+                add_node()
+                node_type = tokens[1] if len(tokens) > 1 else None
+                node_values = {}
+            elif tokens[0] == 'setAttr':
+                attr = next((t for t in tokens[1:] if t.startswith('.')), None)
+                if node_type and attr:
+                    node_values[attr.lstrip('.')] = tokens[-1]
+            elif tokens[0] == 'file' and any(f in tokens for f in ('-r', '-rdi', '-reference')) and len(tokens) > 1:
+                reference = _resolve(tokens[-1], search_dirs)
+                found['references'].add(reference)
+                references.append(reference)
+            elif tokens[0] in ('file', 'createNode'):
+                add_node()
+                node_type = None
+        add_node()
+    return references
+
+
+def scan_scene(scene_file, project_dir=None, recurse=True):
+    """Find the external files used by a Maya ASCII scene by parsing the
+    scene file, so it can be done without Maya. This finds the file paths of
+    texture, image plane, render proxy and cache nodes, and scene references,
+    and if recurse is set the files used by referenced Maya ASCII scenes.
+    Image sequences and UV tiles are returned as glob patterns. Referenced
+    Maya Binary scenes can't be parsed, so only their own path is returned.
+
+    :param str scene_file: The path to the Maya ASCII scene.
+    :param str project_dir: The Maya project directory that relative paths
+     are resolved against. By default the nearest directory above the scene
+     with a workspace.mel file.
+    :param bool recurse: Whether to scan referenced scenes.
+    :returns: A dict with the sorted lists of 'textures', 'caches' and
+     'references' paths.
+    """
+    found = {'textures': set(), 'caches': set(), 'references': set()}
+    to_scan = [os.path.abspath(scene_file)]
+    scanned = set()
+    while to_scan:
+        scene = to_scan.pop(0)
+        if os.path.normcase(scene) in scanned:
+            continue
+        scanned.add(os.path.normcase(scene))
+        search_dirs = [d for d in [project_dir or _project_dir(scene), os.path.dirname(scene)] if d]
+        references = _read_scene(scene, search_dirs, found)
+        if recurse:
+            to_scan.extend(r for r in references
+                           if r.lower().endswith('.ma') and os.path.isfile(r))
+    return dict((k, sorted(v)) for k, v in found.items())
+
+
+def can_scan(scene_file):
+    """Whether the scene is a Maya ASCII scene that can be scanned."""
+    return scene_file.lower().endswith('.ma') and os.path.isfile(scene_file)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        sys.stderr.write("Usage: python scenescan.py <scene file> [<project directory>]\n")
+        sys.exit(2)
+    dependencies = scan_scene(*sys.argv[1:])
+    sys.stdout.write(json.dumps(dependencies, indent=2) + '\n')
@@ -24,6 +24,7 @@ from azure.batch.models import BatchErrorException
 ACCEPTED_ERRORS = [
     "JobNotFound",
     "PoolNotFound",
+    "RequestBodyTooLarge",
 ]
 
 
@@ -96,7 +97,7 @@ class AzureBatchSettings(object):
             if self.config.auth:
                 self.frame.is_logged_in()
                 self.env.configure(self.config, self.submission, self.assets)
-                self.jobhistory.configure(self.config)
+                self.jobhistory.configure(self.config, self.submission)
                 self.assets.configure(self.config, self.submission, self.env)
                 self.pools.configure(self.config, self.env)
                 self.submission.start(self.config, self.assets, self.pools, self.env)
@@ -0,0 +1,70 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+from __future__ import unicode_literals
+
+import csv
+import io
+import os
+
+import tasks
+
+
+def _parse_value(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def load_shot_list(shot_file):
+    """Load a shot list for batch submission. Each line of the file lists
+    the scene file of a shot, optionally followed by the frames to render,
+    as a frame expression, and any job settings to override, as name=value
+    pairs. For example:
+
+        # scene, frames, settings
+        scenes/sh010.ma, 1-120
+        scenes/sh020.ma, 1001-1048x2, logLevel=2
+        "scenes/sh 030.mb"
+
+    Scene paths are relative to the directory of the shot list. Blank lines
+    and lines starting with '#' are ignored.
+
+    :param str shot_file: The path to the shot list CSV file.
+    :returns: A list of dicts with the 'scene', 'frames' and 'overrides' of
+     each shot, where frames is None if the scene frame range is to be used.
+    """
+    shot_dir = os.path.dirname(os.path.abspath(shot_file))
+    shots = []
+    with io.open(shot_file, 'r', encoding='utf-8-sig') as handle:
+        lines = [l for l in handle if l.strip() and not l.lstrip().startswith('#')]
+    rows = csv.reader([l.encode('utf-8') if str is bytes else l for l in lines],
+                      skipinitialspace=True)
+    for line, row in enumerate(rows, 1):
+        row = [c.decode('utf-8') if isinstance(c, bytes) else c for c in row]
+        row = [c.strip() for c in row]
+        scene = os.path.normpath(os.path.join(shot_dir, os.path.expanduser(row[0])))
+        if not os.path.isfile(scene):
+            raise ValueError("Shot {}: scene file '{}' not found.".format(line, scene))
+        frames = row[1] if len(row) > 1 and row[1] else None
+        if frames:
+            try:
+                tasks.parse_frames(frames)
+            except ValueError as exp:
+                raise ValueError("Shot {}: {}".format(line, exp))
+        overrides = {}
+        for setting in row[2:]:
+            if not setting:
+                continue
+            name, separator, value = setting.partition('=')
+            if not separator or not name.strip():
+                raise ValueError("Shot {}: setting '{}' is not of the form "
+                                 "name=value.".format(line, setting))
+            overrides[name.strip()] = _parse_value(value.strip())
+        shots.append({'scene': scene, 'frames': frames, 'overrides': overrides})
+    if not shots:
+        raise ValueError("No shots found in shot list '{}'.".format(shot_file))
+    return shots
@@ -13,18 +13,39 @@ import importlib
 import logging
 import json
 import uuid
+import time
+import threading
 import traceback
+from datetime import datetime, timedelta
+from Queue import Queue, Empty
 
 from azure.batch_extensions import models
+from azure.batch_extensions import _file_utils as fileutils
+from azure.batch_extensions import _pool_utils as poolutils
+from azure.batch_extensions import _template_utils as templateutils
 from azurebatchmayaapi import MayaAPI as maya
 from azurebatchmayaapi import MayaCallbacks as callback
 
 from ui_submission import SubmissionUI
 from exception import CancellationException, PoolException
 import azurebatchutils as utils
+import tasks
+import rendercache
+import shotlist
+from templates import TemplateRegistry, TEMPLATE_PATH_METADATA
 from default import AzureBatchRenderJob
 
 
+MAX_TASKS_PER_REQUEST = 100
+TASK_ADD_RETRIES = 3
+# How far back to look for previous jobs of a scene, for their render times
+PREVIOUS_JOB_AGE = timedelta(days=30)
+# Port of the V-Ray render servers for distributed rendering
+DR_PORT = 20207
+# The job asset of the script rendering the exported scenes of each render engine
+STANDALONE_SCRIPTS = {'arnold': 'kick_script', 'vray': 'vray_script'}
+
+
 class AzureBatchSubmission(object):
     """Handler for job submission functionality."""
 
@@ -39,9 +60,12 @@ class AzureBatchSubmission(object):
         self._log = logging.getLogger('AzureBatchMaya')
         self._call = call
         self._tab_index = index
+        self._previous_jobs = {}
+        self.templates = TemplateRegistry(os.environ['AZUREBATCH_TEMPLATES'])
+        self.templates.load_all()
 
         self.max_pool_size = 1000
-        self.ui = SubmissionUI(self, frame)
+        self.ui = self._create_ui(frame)
         self.modules = self._collect_modules()
         self.renderer = None
         self.frame = frame
@@ -50,6 +74,14 @@ class AzureBatchSubmission(object):
         self.env_manager = None
         self.batch = None
 
+    def _create_ui(self, frame):
+        """Create the submission tab of the plug-in UI.
+
+        :param frame: The shared plug-in UI frame.
+        :type frame: :class:`.AzureBatchUI`
+        """
+        return SubmissionUI(self, frame)
+
     def _collect_modules(self):
         """Collect the renderer-specific submission modules. This is where
         the renderer-specfic job processing is defined.
@@ -100,17 +132,20 @@ class AzureBatchSubmission(object):
         """Check whether at least one of the scene cameras is marked as renderable
         and that at least one layer is a render layer. If not, there will be no
         outputs so we raise an error.
+        Returns the renderable layers and cameras, so that the job can be split
+        into tasks per layer or camera.
         """
         cameras = maya.get_list(type="camera")
-        render_cams = [maya.get_attr(c + ".renderable") for c in cameras]
-        if not any(render_cams):
+        render_cams = [c for c in cameras if maya.get_attr(c + ".renderable")]
+        if not render_cams:
             raise ValueError("No render camera selected. Please select a render "
                              "camera and save the scene before submitting.")
         layers = maya.get_list(type="renderLayer")
-        render_layers = [maya.get_attr(l + ".renderable") for l in layers]
-        if not any(render_layers):
+        render_layers = [l for l in layers if maya.get_attr(l + ".renderable")]
+        if not render_layers:
             raise ValueError("No render layers enabled. Please enable a render "
                              "layer and save the scene before submitting.")
+        return render_layers, render_cams
 
     def _check_plugins(self):
         """Checks through all plug-ins that are currently in use (according to Maya)
@@ -162,18 +197,22 @@ class AzureBatchSubmission(object):
         if pool_spec.get(3):
             return self.env_manager.os_flavor()
 
-    def _configure_pool(self, job_name):
+    def _configure_pool(self, job_name, tasks_per_node=1):
         """Based on the selected pool option for the job, either deploy a new
         pool, create an auto-pool specification, or simply return the ID of the
         chosen existing pool.
 
         :param str job_name: The name of the job being submitted. Used for creating
          useful pool names.
+        :param int tasks_per_node: The number of tasks to run concurrently on
+         each node of a new pool.
         """
         pool_spec = self.ui.get_pool()
+        # Distributed rendering needs the nodes to communicate
+        inter_node = self.renderer.get_distributed_nodes() > 1
         if pool_spec.get(1):
             self._log.info("Using auto-pool.")
-            return self.pool_manager.create_auto_pool(pool_spec[1], job_name)
+            return self.pool_manager.create_auto_pool(pool_spec[1], job_name, tasks_per_node, inter_node)
         if pool_spec.get(2):
             self._log.info("Using existing pool.")
             pool_id = str(pool_spec[2])
@@ -182,11 +221,572 @@ class AzureBatchSubmission(object):
             return {'poolId' : pool_id}
         if pool_spec.get(3):
             self._log.info("Creating new pool.")
-            return self.pool_manager.create_pool(pool_spec[3], job_name)
+            return self.pool_manager.create_pool(pool_spec[3], job_name, tasks_per_node, inter_node)
 
     def _get_task_container_image(self):
         return self.ui.get_task_container_image()
 
+    def _get_pool_size(self, pool):
+        """Get the target number of nodes of the pool the job will run on.
+
+        :param dict pool: The pool info of the job.
+        """
+        if 'autoPoolSpecification' in pool:
+            spec = pool['autoPoolSpecification']['pool']
+            return spec['targetDedicatedNodes'] + spec['targetLowPriorityNodes']
+        pool = self._call(self.batch.pool.get, pool['poolId'])
+        return int(pool.target_dedicated_nodes or 0) + int(pool.target_low_priority_nodes or 0)
+
+    def _get_pool_packing(self, pool):
+        """Get the VM size of the pool the job will run on, and the number of
+        tasks it runs concurrently on each node.
+
+        :param dict pool: The pool info of the job.
+        :returns: A tuple of (VM size, tasks per node).
+        """
+        if 'autoPoolSpecification' in pool:
+            spec = pool['autoPoolSpecification']['pool']
+            return spec['vmSize'], spec['maxTasksPerNode']
+        pool = self._call(self.batch.pool.get, pool['poolId'])
+        return pool.vm_size, int(pool.max_tasks_per_node or 1)
+
+    def _check_distributed_pool(self, pool, nodes):
+        """Check that the pool the job will run on can run the multi-instance
+        tasks of a distributed render.
+
+        :param dict pool: The pool info of the job.
+        :param int nodes: The number of nodes each frame is rendered across.
+        :raises: :class:`.PoolException` if the pool can't run the tasks.
+        """
+        if self._get_pool_packing(pool)[1] != 1:
+            raise PoolException("Distributed rendering needs a pool running one task per node.")
+        if self._get_pool_size(pool) < nodes:
+            raise PoolException("Distributed rendering across {} nodes needs a pool "
+                                "of at least {} nodes.".format(nodes, nodes))
+        if 'poolId' in pool and not self._call(self.batch.pool.get, pool['poolId']).enable_inter_node_communication:
+            raise PoolException("Distributed rendering needs a pool with inter-node communication enabled.")
+
+    def _get_previous_jobs(self, scene_file):
+        """Retrieve the recent jobs that previously rendered the same scene file.
+        Only jobs created within PREVIOUS_JOB_AGE are listed, and the jobs of
+        each scene are only listed once per submission.
+
+        :param str scene_file: The local path of the scene file.
+        :returns: A list of (job, metadata dict) tuples, oldest first.
+        """
+        if scene_file in self._previous_jobs:
+            return self._previous_jobs[scene_file]
+        created = (datetime.utcnow() - PREVIOUS_JOB_AGE).strftime("%Y-%m-%dT%H:%M:%SZ")
+        options = models.JobListOptions(
+            filter="creationTime ge datetime'{}'".format(created),
+            select='id,metadata,creationTime')
+        previous_jobs = []
+        for job in self._call(self.batch.job.list, job_list_options=options):
+            metadata = {m.name: m.value for m in job.metadata or []}
+            if metadata.get('SceneFile') == scene_file:
+                previous_jobs.append((job, metadata))
+        previous_jobs.sort(key=lambda j: j[0].creation_time)
+        self._previous_jobs[scene_file] = previous_jobs
+        return previous_jobs
+
+    def _get_completed_tasks(self, job_id):
+        options = models.TaskListOptions(
+            filter="state eq 'completed'", select='displayName,executionInfo')
+        return self._call(self.batch.task.list, job_id, task_list_options=options)
+
+    def _get_frame_times(self, scene_file, max_jobs=3):
+        """Retrieve the per-frame render times of the most recent jobs that
+        rendered the same scene file.
+
+        :param str scene_file: The local path of the scene file.
+        :param int max_jobs: The maximum number of previous jobs to collect.
+        :returns: A dict of frame numbers to render time in seconds.
+        """
+        frame_times = {}
+        for job, metadata in self._get_previous_jobs(scene_file)[-max_jobs:]:
+            completed = self._get_completed_tasks(job.id)
+            frame_times.update(tasks.frame_times(completed, int(metadata.get('FrameStep', 1))))
+        return frame_times
+
+    def _get_tasks_per_node(self, scene_file):
+        """Get the number of tasks to run concurrently on each node of a new
+        pool. If set to be chosen automatically, this is the packing that had
+        the best throughput in previous jobs of the same scene on the selected
+        VM size, so running a job with each packing to be compared measures
+        which is best.
+
+        :param str scene_file: The local path of the scene file.
+        """
+        pool_spec = self.ui.get_pool()
+        if not pool_spec.get(1) and not pool_spec.get(3):
+            # An existing pool already has its packing
+            return 1
+        if self.renderer.get_distributed_nodes() > 1:
+            # A distributed render uses every core of its nodes
+            return 1
+        tasks_per_node = self.renderer.get_tasks_per_node()
+        if tasks_per_node:
+            return tasks_per_node
+        vm_size = self.env_manager.vm_sku
+        throughputs = {}
+        for job, metadata in self._get_previous_jobs(scene_file):
+            if metadata.get('VmSize') != vm_size:
+                continue
+            packing = int(metadata.get('TasksPerNode', 1))
+            throughput = tasks.node_throughput(self._get_completed_tasks(job.id),
+                                               int(metadata.get('FrameStep', 1)), packing)
+            if throughput:
+                throughputs.setdefault(packing, []).append(throughput)
+        if not throughputs:
+            self._log.info("No previous renders of this scene on {}, running one task per node.".format(vm_size))
+            return 1
+        for packing, measured in sorted(throughputs.items()):
+            self._log.info("{} tasks per node on {}: {:.1f} frames per node hour.".format(
+                packing, vm_size, sum(measured) / len(measured)))
+        return max(throughputs, key=lambda p: sum(throughputs[p]) / len(throughputs[p]))
+
+    def _get_tiles(self):
+        """Get the regions of each frame to be rendered by separate tasks,
+        if the renderer is set to split frames into tiles.
+
+        :returns: A list of (left, right, bottom, top) pixel boundaries, which
+         is empty if frames are not tiled.
+        """
+        columns, rows = self.renderer.get_tiles()
+        if columns * rows < 2:
+            return []
+        width = int(maya.get_attr("defaultResolution.width"))
+        height = int(maya.get_attr("defaultResolution.height"))
+        return tasks.tile_regions(width, height, columns, rows)
+
+    def _get_script_files(self, job_assets, asset, script):
+        """Get the resource files of a task that runs one of the job scripts,
+        which imports the helpers shared by the job scripts from task_utils.py.
+
+        :param dict job_assets: The uploaded job asset URLs.
+        :param str asset: The key of the URL of the script in the job assets.
+        :param str script: The file name of the script.
+        """
+        return [{'blobSource': job_assets[asset], 'filePath': script},
+                {'blobSource': job_assets['utils_script'], 'filePath': 'task_utils.py'}]
+
+    def _get_merge_task(self, os_flavor, maya_version, job_id, job_assets):
+        """Get the command line, resource files and environment of the tasks
+        that merge the tiles of each frame.
+        The tiles are downloaded from the job output file group when the task
+        runs, so the task is given a SAS URL of the output container.
+
+        :param os_flavor: The operating system of the pool.
+        :param str maya_version: The Maya version of the job template.
+        :param str job_id: The job ID, and name of the output file group.
+        :param dict job_assets: The uploaded job asset URLs.
+        """
+        if os_flavor == utils.OperatingSystem.windows:
+            command = "call \"%MAYA_{}%\\bin\\mayapy\" merge_tiles.py".format(maya_version)
+        else:
+            command = "python merge_tiles.py"
+        return {
+            'commandLine': command,
+            'resourceFiles': self._get_script_files(job_assets, 'merge_script', 'merge_tiles.py'),
+            'environmentSettings': [{'name': 'TILES_URL', 'value': self.asset_manager.generate_sas_token(job_id)}]
+        }
+
+    def _get_worker_task(self, os_flavor, maya_version, job_id, job_assets):
+        """Get the command line, resource files and environment of the render
+        worker tasks. Workers claim frames from the queue in the job output
+        file group, and upload the outputs of each frame as it completes, so
+        they are given a SAS URL of the output container with write access.
+        Workers split the cores of their node between them, as the tasks of
+        the other render modes do.
+
+        :param os_flavor: The operating system of the pool.
+        :param str maya_version: The Maya version of the job template.
+        :param str job_id: The job ID, and name of the output file group.
+        :param dict job_assets: The uploaded job asset URLs.
+        """
+        if os_flavor == utils.OperatingSystem.windows:
+            command = "subst X: \"%AZ_BATCH_JOB_PREP_WORKING_DIR%\\assets\" & " \
+                      "call \"%MAYA_{}%\\bin\\mayapy\" render_worker.py".format(maya_version)
+        else:
+            command = "sudo mkdir -m a=rwx -p \"/X\";" \
+                      "sudo mount --rbind $AZ_BATCH_JOB_PREP_WORKING_DIR/assets /X;" \
+                      "/usr/autodesk/maya{}/bin/mayapy render_worker.py;err=$?;" \
+                      "sudo umount \"/X\";exit $err".format(maya_version)
+        return {
+            'commandLine': command,
+            'resourceFiles': self._get_script_files(job_assets, 'worker_script', 'render_worker.py'),
+            'environmentSettings': [
+                {'name': 'QUEUE_URL', 'value': self.asset_manager.generate_sas_token(job_id, permission='rwdl')},
+                {'name': 'QUEUE_PREFIX', 'value': tasks.QUEUE_PATH + '/'},
+                {'name': 'SCENE_FILE', 'value': "[parameters('sceneFile')]"},
+                {'name': 'RENDERER', 'value': "[parameters('renderer')]"},
+                {'name': 'TASKS_PER_NODE', 'value': "[parameters('tasksPerNode')]"}]
+        }
+
+    def _get_standalone_tasks(self, os_flavor, maya_version, job_id, job_assets, nodes=1):
+        """Get the command lines, resource files and environment of the tasks
+        of a job rendered with the standalone renderer of the render engine.
+        The export tasks upload the exported scenes of their frames to the job
+        outputs, from where they are listed and downloaded by the render tasks,
+        so the render tasks are given a SAS URL of the output container with
+        read and list access.
+        For a distributed render, the render tasks are multi-instance tasks,
+        where the coordination command starts a V-Ray render server on every
+        node but the primary, which renders the frame with the servers.
+
+        :param os_flavor: The operating system of the pool.
+        :param str maya_version: The Maya version of the job template.
+        :param str job_id: The job ID, and name of the output file group.
+        :param dict job_assets: The uploaded job asset URLs.
+        :param int nodes: The number of nodes each frame is rendered across.
+        :returns: A tuple of the export task and render task.
+        """
+        windows = os_flavor == utils.OperatingSystem.windows
+        if self.renderer.render_engine == 'arnold':
+            script, asset = 'arnold_kick.py', 'kick_script'
+            environment = [
+                {'name': 'MTOA_PATH', 'value': "C:\\solidangle\\mtoadeploy\\{}".format(maya_version)
+                    if windows else "/opt/solidangle/mtoa/{}".format(maya_version)},
+                {'name': 'LOG_LEVEL', 'value': "[parameters('logLevel')]"}]
+        elif self.renderer.render_engine == 'vray':
+            script, asset = 'vray_standalone.py', 'vray_script'
+            environment = [
+                {'name': 'VRAY_PATH', 'value': "C:\\Program Files\\Autodesk\\Maya{}\\vray".format(maya_version)
+                    if windows else "/usr/autodesk/maya{}/vray".format(maya_version)}]
+        else:
+            raise ValueError("Standalone rendering is not supported for {}.".format(self.renderer.label))
+        if windows:
+            mayapy = "subst X: \"%AZ_BATCH_JOB_PREP_WORKING_DIR%\\assets\" & " \
+                     "call \"%MAYA_{}%\\bin\\mayapy\" ".format(maya_version)
+            export_command = mayapy + script + " export"
+            render_command = mayapy + script + " render & " \
+                "call \"%MAYA_{}%\\bin\\mayapy\" \"%AZ_BATCH_JOB_PREP_WORKING_DIR%\\thumbnail.py\" " \
+                "%^errorlevel% %FRAME_START% %FRAME_END% %FRAME_STEP%".format(maya_version)
+        else:
+            mount = "sudo mkdir -m a=rwx -p \"/X\";" \
+                    "sudo mount --rbind $AZ_BATCH_JOB_PREP_WORKING_DIR/assets /X;"
+            export_command = mount + "/usr/autodesk/maya{}/bin/mayapy {} export;err=$?;" \
+                "sudo umount \"/X\";exit $err".format(maya_version, script)
+            render_command = mount + "python {} render;err=$?;" \
+                "python $AZ_BATCH_JOB_PREP_WORKING_DIR/thumbnail.py $err $FRAME_START $FRAME_END $FRAME_STEP;" \
+                "sudo umount \"/X\";exit $err".format(script)
+        resource_files = self._get_script_files(job_assets, asset, script)
+        environment.append({'name': 'FRAME_STEP', 'value': "[parameters('frameStep')]"})
+        export_task = {
+            'commandLine': export_command,
+            'resourceFiles': resource_files,
+            'environmentSettings': environment + [
+                {'name': 'SCENE_FILE', 'value': "[parameters('sceneFile')]"}]
+        }
+        render_task = {
+            'commandLine': render_command,
+            'resourceFiles': resource_files,
+            'environmentSettings': environment + [
+                {'name': 'EXPORT_URL', 'value': self.asset_manager.generate_sas_token(job_id, permission='rl')},
+                {'name': 'EXPORT_PREFIX', 'value': tasks.EXPORT_PATH + '/'},
+                {'name': 'TASKS_PER_NODE', 'value': "[parameters('tasksPerNode')]"}]
+        }
+        if nodes > 1:
+            if windows:
+                coordination = "cmd /c if not \"%AZ_BATCH_IS_CURRENT_NODE_MASTER%\"==\"true\" " \
+                    "start \"\" /b \"%MAYA_{}%\\vray\\bin\\vray.exe\" -server -portNumber={}".format(
+                        maya_version, DR_PORT)
+            else:
+                coordination = "/bin/bash -c 'if [ \"$AZ_BATCH_IS_CURRENT_NODE_MASTER\" != \"true\" ]; then " \
+                    "nohup /usr/autodesk/maya{}/vray/bin/vray -server -portNumber={} " \
+                    ">$AZ_BATCH_TASK_WORKING_DIR/vray_server.log 2>&1 & fi'".format(maya_version, DR_PORT)
+            render_task['multiInstanceSettings'] = {
+                'numberOfInstances': nodes,
+                'coordinationCommandLine': coordination}
+            render_task['environmentSettings'].append({'name': 'DR_PORT', 'value': str(DR_PORT)})
+        return export_task, render_task
+
+    def _fill_frame_queue(self, job_id, frames):
+        """Add the frames to be rendered to the queue of the job, from which
+        they are claimed by the render workers.
+
+        :param str job_id: The job ID, and name of the output file group.
+        :param list frames: The frames to be rendered, in the order to render them.
+        """
+        container = 'fgrp-' + job_id
+        self.storage.create_container(container)
+        for name in tasks.frame_queue(frames):
+            self.storage.create_blob_from_bytes(container, name, b'')
+        self._log.info("Queued {} frames for render workers.".format(len(frames)))
+
+    def _get_frames(self, params, expression=None):
+        """Get the frames selected by the frame expression of the renderer,
+        if set, and update the job frame range to cover them.
+
+        :param dict params: The job template parameters.
+        :param str expression: A frame expression to use in place of that
+         of the renderer.
+        :returns: A sorted list of frames, or None if every frame of the job
+         frame range is to be rendered.
+        """
+        if not expression:
+            expression = self.renderer.get_frame_expression()
+        if not expression:
+            return None
+        frames = tasks.parse_frames(expression)
+        params['frameStart'] = frames[0]
+        params['frameEnd'] = frames[-1]
+        params['frameStep'] = tasks.frames_step(frames)
+        self.renderer.set_task_frames(params)
+        self._log.info("Rendering {} frames from expression '{}'.".format(len(frames), expression))
+        return frames
+
+    def _plan_tasks(self, scene_file, params, pool, outputs, frames=None):
+        """Split the frames of the job into the chunks of frames to be
+        rendered by each task. If the number of frames per task is set to
+        be chosen automatically, the chunks are sized from the render times
+        of previous jobs of the same scene.
+
+        :param str scene_file: The local path of the scene file.
+        :param dict params: The job template parameters.
+        :param dict pool: The pool info of the job.
+        :param list outputs: The (layer, camera, tile) combinations that will
+         each be rendered by a separate task for every chunk.
+        :param list frames: The frames to be rendered, if not every frame of the
+         job frame range (e.g. because the outputs of some frames were cached).
+        :returns: A list of (first frame, last frame) tuples in frame order, or
+         None if the job can render one frame per task in frame order with the
+         template parametric sweep.
+        """
+        all_frames = list(range(params['frameStart'], params['frameEnd'] + 1, max(params['frameStep'], 1)))
+        frames = all_frames if frames is None else frames
+        runs = tasks.frame_runs(frames, params['frameStep'])
+        frames_per_task = self.renderer.get_frames_per_task()
+        if frames_per_task == 0:
+            frame_times = self._get_frame_times(scene_file)
+            if frame_times:
+                # Every output of a chunk is rendered by a separate task
+                output_times = {f: t / len(outputs) for f, t in frame_times.items()}
+                node_count = -(-self._get_pool_size(pool) * params.get('tasksPerNode', 1) // len(outputs))
+                chunks = []
+                for run in runs:
+                    run_nodes = -(-node_count * len(run) // len(frames))
+                    chunks.extend(tasks.plan_chunks(run, output_times, run_nodes))
+                self._log.info("Planned {} tasks from the render times of {} frames.".format(
+                    len(chunks) * len(outputs), len(frame_times)))
+                return chunks
+            self._log.info("No previous renders of this scene, rendering one frame per task.")
+            frames_per_task = 1
+        if frames_per_task == 1 and len(outputs) == 1 and frames == all_frames and \
+                self.renderer.get_task_order() == tasks.ORDER_SEQUENTIAL:
+            return None
+        return [c for run in runs for c in tasks.fixed_chunks(run, frames_per_task)]
+
+    def _copy_cached_frames(self, render_cache, job_id, fingerprints):
+        """Copy the outputs of any frames that were rendered by earlier jobs
+        with the same inputs into the output file group of this job, so they
+        don't need to be rendered again.
+
+        :param render_cache: The local render cache index.
+        :type render_cache: :class:`.RenderCache`
+        :param str job_id: The job ID, and name of the output file group.
+        :param dict fingerprints: The fingerprint of each frame of the job.
+        :returns: The frames with cached outputs.
+        """
+        cached = render_cache.find_outputs(
+            fingerprints, lambda group: [b.name for b in self.storage.list_blobs('fgrp-' + group)])
+        if cached:
+            self.storage.create_container('fgrp-' + job_id)
+            for outputs in cached.values():
+                for group, name in outputs:
+                    self.storage.copy_blob('fgrp-' + job_id, name,
+                                           self.storage.make_blob_url('fgrp-' + group, name))
+            self._log.info("Reusing the outputs of {} cached frames.".format(len(cached)))
+        return sorted(cached)
+
+    def _expand_template(self, job, template, task_template=None):
+        """Replace the application template reference of the job with the
+        job properties defined by the template, using the cached template
+        rather than having the extensions client load it from file.
+        As in the expand_application_template function of the extensions,
+        the metadata and common environment settings of the job are added
+        after those of the template, a name defined by both raises a
+        ValueError, and the path of the template is added to the metadata.
+
+        :param dict job: The job parameters, including the template reference.
+        :param template: The application template of the job.
+        :type template: :class:`.ApplicationTemplate`
+        :param dict task_template: A copy of the template with a task
+         collection in place of its task factory.
+        """
+        template_info = job.pop('applicationTemplateInfo')
+        expanded = template.expand(template_info.get('parameters', {}), task_template)
+        for key in ['metadata', 'commonEnvironmentSettings']:
+            names = [i['name'] for i in expanded.get(key) or []]
+            conflicts = [i['name'] for i in job.get(key) or [] if i['name'] in names]
+            if conflicts:
+                raise ValueError("May not have multiple definitions for {} value(s) '{}'".format(
+                    key, ', '.join(conflicts)))
+            expanded[key] = (expanded.get(key) or []) + (job.get(key) or [])
+        expanded['metadata'].append({'name': TEMPLATE_PATH_METADATA, 'value': template_info['filePath']})
+        job.update(expanded)
+
+    def add_tasks(self, job_id, task_collection, progress=None, results=None):
+        """Add the tasks of a job in collections of the maximum request size.
+        Each of the configured number of threads pulls the next collection from
+        a shared queue as soon as it is free. If some tasks of a collection fail
+        to add with a server error, only those tasks are retried. A task that
+        already exists on retry was added by a request that failed to respond.
+
+        :param str job_id: The ID of the job.
+        :param list task_collection: The expanded tasks of the job.
+        :param progress: The submission progress bar, if reporting progress.
+         Progress can only be reported when called from the main thread.
+        :type progress: :class:`.ProgressBar`
+        :param results: A queue to put the result of each added task on, for
+         progress to be reported by the main thread when called from another.
+        :type results: :class:`Queue`
+        :returns: A :class:`TaskAddCollectionResult` of the added tasks.
+        """
+        collection_queue = Queue()
+        result_queue = Queue()
+        for index in range(0, len(task_collection), MAX_TASKS_PER_REQUEST):
+            collection_queue.put(task_collection[index:index + MAX_TASKS_PER_REQUEST])
+
+        def add_collection(collection):
+            for attempt in range(TASK_ADD_RETRIES + 1):
+                if attempt:
+                    time.sleep(2 ** attempt)
+                try:
+                    response = self._call(self.batch.task.add_collection, job_id, collection)
+                except Exception as exp:
+                    too_large = isinstance(exp, models.BatchErrorException) and \
+                        exp.error.code == 'RequestBodyTooLarge'
+                    if too_large and len(collection) > 1:
+                        half = len(collection) // 2
+                        add_collection(collection[:half])
+                        add_collection(collection[half:])
+                        return
+                    if attempt == TASK_ADD_RETRIES:
+                        raise
+                    continue
+                failed = set()
+                for result in response.value:
+                    if result.status == models.TaskAddStatus.success or \
+                            (attempt and result.error.code == 'TaskExists'):
+                        result_queue.put(result)
+                    elif result.status == models.TaskAddStatus.server_error:
+                        failed.add(result.task_id)
+                    else:
+                        raise ValueError("Failed to add task {}: {}".format(
+                            result.task_id, result.error.message.value))
+                collection = [t for t in collection if t.id in failed]
+                if not collection:
+                    return
+            raise ValueError("Failed to add {} tasks after {} retries.".format(
+                len(collection), TASK_ADD_RETRIES))
+
+        def add_from_queue():
+            while True:
+                try:
+                    collection = collection_queue.get_nowait()
+                except Empty:
+                    return
+                try:
+                    add_collection(collection)
+                except Exception as exp:
+                    result_queue.put(exp)
+                    return
+
+        threads = max(1, min(self.batch.threads, collection_queue.qsize()))
+        self._log.debug("Adding {} tasks in {} threads.".format(len(task_collection), threads))
+        if progress:
+            progress.status("Adding tasks...")
+            progress.max(len(task_collection))
+        adding = []
+        for _ in range(threads):
+            adding.append(threading.Thread(target=add_from_queue))
+            adding[-1].start()
+        added = []
+        try:
+            while any(t for t in adding if t.is_alive()) or not result_queue.empty():
+                try:
+                    result = result_queue.get(True, 0.5)
+                except Empty:
+                    continue
+                if isinstance(result, Exception):
+                    raise result
+                added.append(result)
+                if results:
+                    results.put(result)
+                if not progress:
+                    continue
+                progress.step()
+                if len(added) % MAX_TASKS_PER_REQUEST == 0 or len(added) == len(task_collection):
+                    self.ui.submit_status("Added {} of {} tasks".format(len(added), len(task_collection)))
+        finally:
+            # Make sure no further collections are added if we're bailing out early.
+            while not collection_queue.empty():
+                try:
+                    collection_queue.get_nowait()
+                except Empty:
+                    break
+        return models.TaskAddCollectionResult(value=added)
+
+    def _expand_job(self, job, pool_os):
+        """Expand the task factory of a job into its tasks, processing the job
+        and tasks as the extensions client does when adding a job, so that the
+        job can be added without its tasks. The job is set to take no action
+        when its tasks complete, as it would otherwise complete before its
+        tasks have been added.
+
+        :param job: The job to expand.
+        :type job: :class:`ExtendedJobParameter`
+        :param pool_os: The operating system of the pool of the job.
+        :type pool_os: :class:`.OperatingSystem`
+        :returns: A tuple of the expanded tasks, and the action to set the
+         job to take when its tasks complete once they have been added.
+        """
+        os_flavor = poolutils.PoolOperatingSystemFlavor.WINDOWS \
+            if pool_os == utils.OperatingSystem.windows else poolutils.PoolOperatingSystemFlavor.LINUX
+        file_utils = fileutils.FileUtils(self.batch.file.get_storage_client)
+        task_collection = templateutils.expand_task_factory(job, file_utils)
+        on_all_tasks_complete = job.on_all_tasks_complete
+        job.on_all_tasks_complete = models.OnAllTasksComplete.no_action
+        commands = [templateutils.process_task_package_references(task_collection, os_flavor)]
+        job_prep = templateutils.construct_setup_task(job.job_preparation_task, commands, os_flavor)
+        if job_prep:
+            job.job_preparation_task = models.JobPreparationTask(**job_prep)
+        templateutils.post_processing(job, file_utils, os_flavor)
+        templateutils.post_processing(task_collection, file_utils, os_flavor)
+        templateutils.process_job_for_output_files(job, task_collection, file_utils)
+        return task_collection, on_all_tasks_complete
+
+    def _add_job(self, job, task_collection, on_all_tasks_complete, progress=None, results=None):
+        """Add a job, followed by its tasks with our own task submission
+        stage. If the tasks fail to be added the job is deleted, rather than
+        leaving behind a job that would never complete.
+
+        :param job: The job to add, as expanded by :meth:`_expand_job`.
+        :type job: :class:`ExtendedJobParameter`
+        :param list task_collection: The expanded tasks of the job.
+        :param on_all_tasks_complete: The action for the job to take when its
+         tasks complete, set once the tasks have been added.
+        :param progress: The submission progress bar, if reporting progress.
+         Progress can only be reported when called from the main thread.
+        :type progress: :class:`.ProgressBar`
+        :param results: A queue to put the result of each added task on, for
+         progress to be reported by the main thread when called from another.
+        :type results: :class:`Queue`
+        """
+        self._call(self.batch.job.add, job)
+        try:
+            self.add_tasks(job.id, task_collection, progress, results)
+            if on_all_tasks_complete:
+                self._call(self.batch.job.patch, job.id, models.JobPatchParameter(
+                    on_all_tasks_complete=on_all_tasks_complete))
+        except Exception:
+            try:
+                self._call(self.batch.job.delete, job.id)
+            except Exception as exp:
+                self._log.warning("Failed to delete job {}: {}".format(job.id, exp))
+            raise
+
     def start(self, session, assets, pools, env):
         """Load submission tab after plug-in has been authenticated.
 
@@ -201,6 +801,7 @@ class AzureBatchSubmission(object):
         """
         self._log.debug("Starting AzureBatchSubmission...")
         self.batch = session.batch
+        self.storage = session.storage
         self.asset_manager = assets
         self.pool_manager = pools
         self.env_manager = env
@@ -232,6 +833,256 @@ class AzureBatchSubmission(object):
         pools = self.pool_manager.list_pools(lazy=True, requiredAppLicenses=required_app_licenses)
         return pools
 
+    def _prepare_job(self, progress, pool_os, container_image, maya_version, shot=None,
+                     pool=None, uploaded=None):
+        """Upload the assets of the current scene and build the job to render it.
+
+        :param progress: The submission progress bar.
+        :type progress: :class:`.ProgressBar`
+        :param pool_os: The operating system of the pool.
+        :param str container_image: The task container image, if any.
+        :param str maya_version: The Maya version of the job template.
+        :param dict shot: The frames and setting overrides of the scene, if
+         submitted as a shot of a batch.
+        :param dict pool: The pool info of the job, if already configured.
+        :param set uploaded: The paths of the assets uploaded for earlier
+         jobs of a batch.
+        :returns: A tuple of the job, the render cache and the fingerprints of
+         the frames to be recorded once the job is added, or None if every
+         frame was found in the render cache.
+        """
+        job_id = "maya-render-{}".format(uuid.uuid4())
+        batch_parameters = {'id': job_id}
+        batch_parameters['displayName'] = self.renderer.get_title()
+        batch_parameters['metadata'] =  [{"name": "JobType", "value": "Maya"}]
+        template_file = utils.build_template_filename(self.renderer.render_engine, maya_version, pool_os.value.lower(), container_image)
+        template = self.templates.get(template_file)
+        task_template = None
+
+        batch_parameters['applicationTemplateInfo'] = {'filePath': template_file}
+        application_params = {}
+        batch_parameters['applicationTemplateInfo']['parameters'] = application_params
+
+        render_layers, render_cams = self._check_outputs()
+        plugins = self._check_plugins()
+        application_params['outputs'] = job_id
+
+        distributed_nodes = self.renderer.get_distributed_nodes()
+        outputs = tasks.split_outputs(render_layers, render_cams, self.renderer.get_task_split())
+        tiles = self._get_tiles()
+        render_mode = self.renderer.get_render_mode()
+        dispatch = self.renderer.get_dispatch()
+        if distributed_nodes > 1:
+            # Distributed rendering renders the exported frames with V-Ray Standalone
+            render_mode = tasks.RENDER_STANDALONE
+        if render_mode == tasks.RENDER_STANDALONE and (
+                tiles or outputs != [(None, None)] or dispatch == tasks.DISPATCH_QUEUE):
+            raise ValueError("Standalone and distributed rendering export whole frames, so can't be combined "
+                             "with the frame queue, tiles or splitting tasks by layer or camera.")
+        if dispatch == tasks.DISPATCH_QUEUE and (tiles or outputs != [(None, None)]):
+            raise ValueError("Frame queue dispatch renders whole frames, so can't be "
+                             "combined with tiles or splitting tasks by layer or camera.")
+        # Only the scripts run by the tasks of the job are uploaded
+        scripts = []
+        if tiles:
+            scripts.append('merge_script')
+        if dispatch == tasks.DISPATCH_QUEUE:
+            scripts.append('worker_script')
+        if render_mode == tasks.RENDER_STANDALONE:
+            if self.renderer.render_engine not in STANDALONE_SCRIPTS:
+                raise ValueError("Standalone rendering is not supported for {}.".format(self.renderer.label))
+            scripts.append(STANDALONE_SCRIPTS[self.renderer.render_engine])
+        if scripts:
+            scripts.append('utils_script')
+
+        job_params = self.renderer.get_params()
+        if shot and shot.get('overrides'):
+            job_params.update(shot['overrides'])
+            self.renderer.set_task_frames(job_params)
+        frames = self._get_frames(job_params, shot and shot.get('frames'))
+        if frames is None:
+            job_frames = list(range(job_params['frameStart'], job_params['frameEnd'] + 1,
+                                    max(job_params['frameStep'], 1)))
+        else:
+            job_frames = frames
+
+        self.ui.submit_status("Checking assets...")
+        scene_file, renderer_data = self.renderer.get_jobdata()
+        application_params['sceneFile'] = utils.format_scene_path(scene_file, pool_os)
+        batch_parameters['metadata'].append({"name": "SceneFile", "value": scene_file})
+        job_assets, progress = self.asset_manager.upload(
+            renderer_data, progress, job_id, plugins, pool_os, uploaded=uploaded,
+            convert_textures=self.renderer.get_convert_textures(), frames=job_frames, scripts=scripts)
+
+        application_params['projectData'] = job_assets['project']
+        application_params['assetScript'] = job_assets['path_map']
+        application_params['thumbScript'] = job_assets['thumb_script']
+        application_params['workspace'] = job_assets['workspace']
+        application_params['storageURL'] = self.asset_manager.generate_sas_token(job_assets['project'])
+
+        if container_image:
+            application_params['taskContainerImageName'] = container_image
+
+        self._switch_tab()
+
+        self.ui.submit_status("Configuring job...")
+        progress.status("Configuring job...")
+        application_params.update(job_params)
+        batch_parameters['metadata'].append({"name": "FrameStep", "value": str(job_params['frameStep'])})
+
+        render_cache = None
+        fingerprints = {}
+        if self.renderer.get_use_cache():
+            self.ui.submit_status("Checking render cache...")
+            progress.status("Checking render cache...")
+            render_cache = rendercache.RenderCache(os.path.dirname(self.data_path))
+            if frames is None:
+                frames = job_frames
+            settings = {k: v for k, v in job_params.items() if k not in rendercache.FRAME_PARAMS}
+            settings.update(mayaVersion=maya_version, os=pool_os.value, containerImage=container_image)
+            fingerprints = rendercache.frame_fingerprints(
+                scene_file, job_assets['manifest'], settings, frames)
+            cached = self._copy_cached_frames(render_cache, job_id, fingerprints)
+            frames = [f for f in frames if f not in cached]
+            if not frames:
+                render_cache.record(job_id, fingerprints)
+                maya.info("All frames were found in the render cache. "
+                          "Outputs have been copied to file group {}".format(job_id))
+                return None
+
+        self.ui.submit_status("Setting pool...")
+        progress.status("Setting pool...")
+        if pool is None:
+            pool = self._configure_pool(self.renderer.get_title(), self._get_tasks_per_node(scene_file))
+        batch_parameters['poolInfo'] = pool
+        if distributed_nodes > 1:
+            self._check_distributed_pool(pool, distributed_nodes)
+        vm_size, tasks_per_node = self._get_pool_packing(pool)
+        job_params['tasksPerNode'] = application_params['tasksPerNode'] = tasks_per_node
+        batch_parameters['metadata'].append({"name": "VmSize", "value": str(vm_size)})
+        batch_parameters['metadata'].append({"name": "TasksPerNode", "value": str(tasks_per_node)})
+
+        if dispatch == tasks.DISPATCH_QUEUE:
+            if frames is None:
+                frames = job_frames
+            ordered = tasks.order_chunks([(f, f) for f in frames], self.renderer.get_task_order())
+            self._fill_frame_queue(job_id, [c[0] for c in ordered])
+            worker_count = max(1, min(len(frames), self._get_pool_size(pool) * tasks_per_node))
+            task_template = tasks.build_worker_collection(
+                template.template, worker_count, self._get_worker_task(pool_os, maya_version, job_id, job_assets))
+            chunks = None
+        elif distributed_nodes > 1:
+            # Each frame already uses several nodes, so is rendered by its own task
+            if frames is None:
+                frames = job_frames
+            chunks = [(f, f) for f in frames]
+        else:
+            chunks = self._plan_tasks(scene_file, job_params, pool,
+                                      [o + (t,) for o in outputs for t in tiles or [None]], frames)
+        if chunks:
+            chunks = tasks.order_chunks(chunks, self.renderer.get_task_order())
+            if render_mode == tasks.RENDER_STANDALONE:
+                export_task, render_task = self._get_standalone_tasks(
+                    pool_os, maya_version, job_id, job_assets, distributed_nodes)
+                task_template = tasks.build_export_collection(template.template, chunks, export_task, render_task)
+            else:
+                merge_task = None
+                if tiles:
+                    merge_task = self._get_merge_task(pool_os, maya_version, job_id, job_assets)
+                task_template = tasks.build_task_collection(
+                    template.template, chunks, outputs, tiles, merge_task)
+        batch_parameters['commonEnvironmentSettings'] = self.env_manager.get_environment_settings()
+
+        self.ui.submit_status("Final renderer configuration...")
+        self.renderer.final_setup(batch_parameters, job_assets)
+        self._expand_template(batch_parameters, template, task_template)
+
+        self._log.debug(json.dumps(batch_parameters))
+        return self.batch.job.jobparameter_from_json(batch_parameters), render_cache, fingerprints
+
+    def _open_scene(self, scene_file):
+        """Open a scene to be submitted, and reload the renderer settings,
+        asset references and application licenses of the scene.
+
+        :param str scene_file: The path to the scene file.
+        """
+        maya.open_file(scene_file)
+        # As would be called by Maya on loading the scene
+        self.asset_manager._callback_refresh()
+        self.env_manager.refresh()
+        self.refresh_renderer(self.ui.render_module)
+
+    def _add_jobs(self, jobs, pool_os, progress):
+        """Add the jobs of a batch submission in the configured number of
+        threads, each thread adding a job followed by its tasks with our own
+        task submission stage. Progress is reported by the calling thread as
+        each task is added, as the Maya UI can only be updated from the main
+        thread.
+
+        :param list jobs: The jobs to add.
+        :param pool_os: The operating system of the pool of the jobs.
+        :type pool_os: :class:`.OperatingSystem`
+        :param progress: The submission progress bar.
+        :type progress: :class:`.ProgressBar`
+        :returns: The jobs that were added.
+        """
+        job_queue = Queue()
+        result_queue = Queue()
+        total_tasks = 0
+        for job in jobs:
+            expanded = self._expand_job(job, pool_os)
+            total_tasks += len(expanded[0])
+            job_queue.put((job,) + expanded)
+
+        def add_from_queue():
+            while True:
+                try:
+                    job, task_collection, on_all_tasks_complete = job_queue.get_nowait()
+                except Empty:
+                    return
+                try:
+                    self._add_job(job, task_collection, on_all_tasks_complete, results=result_queue)
+                except Exception as exp:
+                    result_queue.put(exp)
+                    return
+                result_queue.put(job)
+
+        threads = max(1, min(self.batch.threads, len(jobs)))
+        self._log.debug("Adding {} jobs in {} threads.".format(len(jobs), threads))
+        progress.status("Adding jobs...")
+        progress.max(total_tasks)
+        adding = []
+        for _ in range(threads):
+            adding.append(threading.Thread(target=add_from_queue))
+            adding[-1].start()
+        added = []
+        added_tasks = 0
+        try:
+            while any(t for t in adding if t.is_alive()) or not result_queue.empty():
+                try:
+                    result = result_queue.get(True, 0.5)
+                except Empty:
+                    continue
+                if isinstance(result, Exception):
+                    raise result
+                if isinstance(result, models.TaskAddResult):
+                    added_tasks += 1
+                    progress.step()
+                    if added_tasks % MAX_TASKS_PER_REQUEST and added_tasks != total_tasks:
+                        continue
+                else:
+                    added.append(result)
+                self.ui.submit_status("Added {} of {} jobs, {} of {} tasks".format(
+                    len(added), len(jobs), added_tasks, total_tasks))
+        finally:
+            # Make sure no further jobs are added if we're bailing out early.
+            while not job_queue.empty():
+                try:
+                    job_queue.get_nowait()
+                except Empty:
+                    break
+        return added
+
     def submit(self, watch_job=False, download_dir=None):
         """Submit a new job.
 
@@ -241,9 +1092,9 @@ class AzureBatchSubmission(object):
          must be specified.
         """
         progress = None
+        self._previous_jobs = {}
         try:
             pool_os = self._get_os_flavor()
-            job_id = "maya-render-{}".format(uuid.uuid4())
             container_image = self._get_task_container_image()
             self.renderer.disable(False)
             progress = utils.ProgressBar(self._log)
@@ -253,57 +1104,18 @@ class AzureBatchSubmission(object):
             if mayaVersion != "2017" and mayaVersion != "2018":
                 raise Exception("Unrecognized mayaVersion \"{}\", 2017 and 2018 are supported".format(mayaVersion))
 
-            batch_parameters = {'id': job_id}
-            batch_parameters['displayName'] = self.renderer.get_title()
-            batch_parameters['metadata'] =  [{"name": "JobType", "value": "Maya"}]
-            template_file = utils.build_template_filename(self.renderer.render_engine, mayaVersion, pool_os.value.lower(), container_image)
-
-            batch_parameters['applicationTemplateInfo'] = {'filePath': template_file}
-            application_params = {}
-            batch_parameters['applicationTemplateInfo']['parameters'] = application_params
-
-            self._check_outputs()
-            plugins = self._check_plugins()
-            application_params['outputs'] = job_id
-
-            self.ui.submit_status("Checking assets...")
-            scene_file, renderer_data = self.renderer.get_jobdata()
-            application_params['sceneFile'] = utils.format_scene_path(scene_file, pool_os)
-            job_assets, progress = self.asset_manager.upload(
-                renderer_data, progress, job_id, plugins, pool_os)
-
-            application_params['projectData'] = job_assets['project']
-            application_params['assetScript'] = job_assets['path_map']
-            application_params['thumbScript'] = job_assets['thumb_script']
-            application_params['workspace'] = job_assets['workspace']
-            application_params['storageURL'] = self.asset_manager.generate_sas_token(job_assets['project'])
-
-            if container_image:
-                application_params['taskContainerImageName'] = container_image
-
-            self._switch_tab()
-
-            self.ui.submit_status("Configuring job...")
-            progress.status("Configuring job...")
-            job_params = self.renderer.get_params()
-            application_params.update(job_params)
-
-            self.ui.submit_status("Setting pool...")
-            progress.status("Setting pool...")
-            pool = self._configure_pool(self.renderer.get_title())
-            batch_parameters['poolInfo'] = pool
-            batch_parameters['commonEnvironmentSettings'] = self.env_manager.get_environment_settings()
-
-            self.ui.submit_status("Final renderer configuration...")
-            self.renderer.final_setup(batch_parameters, job_assets)
-            
-            self._log.debug(json.dumps(batch_parameters))
-            new_job = self.batch.job.jobparameter_from_json(batch_parameters)
+            prepared = self._prepare_job(progress, pool_os, container_image, mayaVersion)
+            if not prepared:
+                return
+            new_job, render_cache, fingerprints = prepared
             progress.is_cancelled()
             self.ui.submit_status("Submitting...")
             progress.status("Submitting...")
             self._log.debug("Submitting using {} threads.".format(self.batch.threads))
-            self._call(self.batch.job.add, new_job)
+            task_collection, on_all_tasks_complete = self._expand_job(new_job, pool_os)
+            self._add_job(new_job, task_collection, on_all_tasks_complete, progress)
+            if fingerprints:
+                render_cache.record(new_job.id, fingerprints)
             maya.info("Job submitted successfully")
 
             if watch_job:
@@ -320,3 +1132,114 @@ class AzureBatchSubmission(object):
                 progress.end()
             self._switch_tab()
             self.renderer.disable(True)
+
+    def submit_batch(self, shots, pool_name, progress, watch_job=False, download_dir=None):
+        """Submit a job for each of a batch of shots. Each scene is opened in
+        turn to collect its assets and settings, with the assets shared between
+        shots only uploaded once, and the jobs are then added together.
+        If a new persistent pool is selected, it is created once and shared by
+        every job.
+
+        :param list shots: The scene, frames and setting overrides of each
+         shot, as loaded by :func:`.shotlist.load_shot_list`.
+        :param str pool_name: The name of the batch, used for naming a new pool.
+        :param progress: The submission progress bar.
+        :type progress: :class:`.ProgressBar`
+        :param watch_job: Whether to launch a job watcher process for each
+         job once the jobs have been submitted.
+        :param download_dir: If launching the job watchers, a download
+         directory must be specified. The outputs of each job are downloaded
+         to a directory named after the display name of the job.
+        :returns: A tuple of the jobs that were added, and a list of (scene,
+         error message) tuples of the shots that failed to be submitted.
+        """
+        self._previous_jobs = {}
+        pool_os = self._get_os_flavor()
+        container_image = self._get_task_container_image()
+        mayaVersion = maya.about(version=True)
+        if mayaVersion != "2017" and mayaVersion != "2018":
+            raise Exception("Unrecognized mayaVersion \"{}\", 2017 and 2018 are supported".format(mayaVersion))
+
+        pool = None
+        uploaded = set()
+        prepared = []
+        failed = []
+        for index, shot in enumerate(shots):
+            progress.is_cancelled()
+            self.ui.submit_status("Opening shot {} of {}...".format(index + 1, len(shots)))
+            progress.status("Opening {}...".format(os.path.basename(shot['scene'])))
+            try:
+                self._open_scene(shot['scene'])
+                if not self.renderer.render_enabled():
+                    raise ValueError("The renderer of the scene is not supported.")
+                self.renderer.disable(False)
+                if pool is None and self.ui.get_pool().get(3):
+                    pool = self._configure_pool(pool_name, self._get_tasks_per_node(shot['scene']))
+                job = self._prepare_job(progress, pool_os, container_image, mayaVersion,
+                                        shot, pool, uploaded)
+            except CancellationException:
+                raise
+            except Exception as exp:
+                self._log.error("Failed to prepare shot {}: {}".format(shot['scene'], exp))
+                failed.append((shot['scene'], str(exp)))
+                continue
+            if job:
+                prepared.append(job)
+        progress.is_cancelled()
+
+        self.ui.submit_status("Submitting...")
+        added = self._add_jobs([j[0] for j in prepared], pool_os, progress)
+        for new_job, render_cache, fingerprints in prepared:
+            if fingerprints:
+                render_cache.record(new_job.id, fingerprints)
+            if watch_job:
+                utils.JobWatcher(new_job.id, self.data_path,
+                                 os.path.join(download_dir, new_job.display_name))
+        return added, failed
+
+    def submit_shots(self, shot_file, watch_job=False, download_dir=None):
+        """Submit a job for each shot of a shot list. The current scene is
+        reopened once the shots have been submitted.
+
+        :param str shot_file: The path to the shot list file.
+        :param watch_job: Whether to launch a job watcher process for each
+         job once the jobs have been submitted.
+        :param download_dir: If launching the job watchers, a download
+         directory must be specified.
+        """
+        progress = None
+        original_scene = maya.file(query=True, sceneName=True)
+        opened = False
+        try:
+            shots = shotlist.load_shot_list(shot_file)
+            if maya.file(query=True, modified=True):
+                options = ['Continue', 'Cancel']
+                answer = maya.confirm("Each scene of the shot list will be opened for submission, "
+                                      "discarding any unsaved changes to the current scene.", options)
+                if answer == options[-1]:
+                    raise CancellationException("Submission Aborted")
+            progress = utils.ProgressBar(self._log)
+            opened = True
+            added, failed = self.submit_batch(
+                shots, os.path.splitext(os.path.basename(shot_file))[0], progress, watch_job, download_dir)
+            if failed:
+                raise ValueError("{} of {} shots failed to submit: {}".format(
+                    len(failed), len(shots), ', '.join(f[0] for f in failed)))
+            maya.info("Submitted {} jobs successfully".format(len(added)))
+        except CancellationException:
+            maya.info("Job submission cancelled")
+        except Exception as exp:
+            self._log.error(str(exp))
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            self._log.debug(''.join(traceback.format_exception(exc_type, exc_value, exc_traceback)))
+            maya.error(str(exp))
+        finally:
+            if progress:
+                progress.end()
+            if opened and original_scene:
+                try:
+                    self._open_scene(original_scene)
+                except Exception as exp:
+                    self._log.warning("Failed to reopen {}: {}".format(original_scene, exp))
+            self._switch_tab()
+            self.renderer.disable(True)
@@ -0,0 +1,699 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+from __future__ import unicode_literals
+
+import bisect
+import copy
+import json
+import os
+import re
+from collections import OrderedDict, defaultdict, deque
+from datetime import timedelta
+
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
+
+
+TARGET_TASK_DURATION = 20 * 60
+TASK_NAME = re.compile(r'^Frames? (-?\d+)(?:-(-?\d+))?(?: \(.*\))?$')
+LOG_SUFFIX_VAR = 'RENDER_LOG_SUFFIX'
+SPLIT_FRAMES = 'frame'
+SPLIT_LAYERS = 'layer'
+SPLIT_CAMERAS = 'camera'
+DISPATCH_TASKS = 'tasks'
+DISPATCH_QUEUE = 'queue'
+ORDER_SEQUENTIAL = 'sequential'
+ORDER_PROGRESSIVE = 'progressive'
+RENDER_MAYA = 'maya'
+RENDER_STANDALONE = 'standalone'
+TILE_PATH = 'tiles'
+QUEUE_PATH = 'queue'
+EXPORT_PATH = 'exports'
+WORKER_PREFIX = 'worker'
+EXPORT_PREFIX = 'export'
+MERGE_PREFIX = "Merge "
+FRAME_NUMBER = re.compile(r'(\d+)\D*$')
+FRAME_RANGE = re.compile(r'^(!?)(-?\d+)(?:-(-?\d+)(?:x(\d+))?)?$')
+TASK_STATE_SELECT = 'id,state,stateTransitionTime,executionInfo'
+# Tasks changing state close together may be listed out of order, so each
+# update also lists the tasks that changed shortly before the last one found.
+STATE_OVERLAP = timedelta(minutes=1)
+
+
+def task_name(first_frame, last_frame, output=(None, None), tile=None):
+    """Format the display name of a task rendering the given frame range.
+    This is also how the frames of a task are identified when looking up
+    the render times of previous jobs.
+
+    :param tuple output: The render layer and camera rendered by the task, if
+     the job is split by layer or camera.
+    :param int tile: The index of the tile rendered by the task, if frames
+     are split into tiles.
+    """
+    if first_frame == last_frame:
+        name = "Frame {}".format(first_frame)
+    else:
+        name = "Frames {}-{}".format(first_frame, last_frame)
+    output = [o for o in output if o]
+    if tile is not None:
+        output.append("tile {}".format(tile))
+    if output:
+        name += " ({})".format(", ".join(output))
+    return name
+
+
+def split_outputs(layers, cameras, split):
+    """Get the combinations of render layer and camera to be rendered by
+    separate tasks for each chunk of frames.
+
+    :param list layers: The renderable layers in the scene.
+    :param list cameras: The renderable cameras in the scene.
+    :param str split: Whether tasks are split by frame only, by render layer,
+     or by render layer and camera.
+    :returns: A list of (layer, camera) tuples, where either may be None if the
+     task should render all of them.
+    """
+    if split == SPLIT_CAMERAS:
+        outputs = [(l, c) for l in layers for c in cameras]
+    elif split == SPLIT_LAYERS:
+        outputs = [(l, None) for l in layers]
+    else:
+        outputs = []
+    if len(outputs) < 2:
+        return [(None, None)]
+    return outputs
+
+
+def output_flags(output):
+    """Format the Maya command line flags to render a single layer and/or camera.
+
+    :param tuple output: The render layer and camera to render.
+    """
+    layer, camera = output
+    flags = []
+    if layer:
+        flags.append("-rl {}".format(layer))
+    if camera:
+        flags.append("-cam {}".format(camera))
+    return " ".join(flags)
+
+
+def tile_regions(width, height, columns, rows):
+    """Split the image into a grid of regions to be rendered by separate tasks.
+
+    :param int width: The image width in pixels.
+    :param int height: The image height in pixels.
+    :param int columns: The number of tiles across the image.
+    :param int rows: The number of tiles down the image.
+    :returns: A list of (left, right, bottom, top) pixel boundaries.
+    """
+    columns = max(1, min(columns, width))
+    rows = max(1, min(rows, height))
+    regions = []
+    for row in range(rows):
+        for column in range(columns):
+            regions.append((column * width // columns, (column + 1) * width // columns - 1,
+                            row * height // rows, (row + 1) * height // rows - 1))
+    return regions
+
+
+def region_flags(region):
+    """Format the Maya command line flag to render a region of the image.
+
+    :param tuple region: The (left, right, bottom, top) pixel boundaries.
+    """
+    return "-reg {} {} {} {}".format(*region)
+
+
+def parse_frames(expression):
+    """Expand a frame expression into the frames to be rendered. The
+    expression is a comma separated list of frames (e.g. '25'), ranges of
+    frames (e.g. '1-10'), and ranges with a step (e.g. '40-100x5'). Any of
+    these can be prefixed with '!' to exclude those frames.
+
+    :param str expression: The frame expression, e.g. '1-10,25,40-100x5,!50'.
+    :returns: A sorted list of frame numbers.
+    :raises: ValueError if the expression is invalid or selects no frames.
+    """
+    included, excluded = set(), set()
+    for item in expression.replace(' ', '').split(','):
+        match = FRAME_RANGE.match(item)
+        if not match:
+            raise ValueError("Invalid frame expression: '{}'".format(item))
+        first = int(match.group(2))
+        last = int(match.group(3)) if match.group(3) is not None else first
+        step = int(match.group(4) or 1)
+        if last < first or step < 1:
+            raise ValueError("Invalid frame range: '{}'".format(item))
+        frames = excluded if match.group(1) else included
+        frames.update(range(first, last + 1, step))
+    frames = sorted(included - excluded)
+    if not frames:
+        raise ValueError("Frame expression '{}' contains no frames.".format(expression))
+    return frames
+
+
+def frames_step(frames):
+    """Get the largest frame step that all the given frames fall on.
+
+    :param list frames: The sorted frames to be rendered.
+    """
+    step = 0
+    for previous, frame in zip(frames, frames[1:]):
+        step = gcd(step, frame - previous)
+    return step or 1
+
+
+def task_frames(display_name, frame_step=1):
+    """Get the list of frames rendered by a task from its display name.
+    Returns an empty list if the display name is not in a recognised format.
+
+    :param str display_name: The task display name.
+    :param int frame_step: The frame step of the job the task belongs to.
+    """
+    match = TASK_NAME.match(display_name or '')
+    if not match:
+        return []
+    first_frame = int(match.group(1))
+    last_frame = int(match.group(2)) if match.group(2) else first_frame
+    return list(range(first_frame, last_frame + 1, max(frame_step, 1)))
+
+
+def frame_times(tasks, frame_step=1):
+    """Calculate the render time in seconds of each frame from a list of completed
+    tasks. The run time of a task that rendered multiple frames is divided evenly
+    between its frames, and the times of tasks that rendered separate layers or
+    cameras of the same frame are added together. Failed tasks are ignored.
+
+    :param tasks: The completed tasks of a job, with execution info.
+    :param int frame_step: The frame step of the job the tasks belong to.
+    :returns: A dict of frame numbers to render time.
+    """
+    durations = defaultdict(float)
+    for task in tasks:
+        info = task.execution_info
+        if not info or info.exit_code != 0 or not info.start_time or not info.end_time:
+            continue
+        frames = task_frames(task.display_name, frame_step)
+        if not frames:
+            continue
+        duration = (info.end_time - info.start_time).total_seconds() / len(frames)
+        for frame in frames:
+            durations[frame] += duration
+    return dict(durations)
+
+
+def node_throughput(tasks, frame_step=1, tasks_per_node=1):
+    """Measure the number of frames a node rendered per hour, from the
+    completed tasks of a job that ran a number of tasks concurrently on each
+    node. Comparing this between jobs of the same scene shows which packing
+    of tasks makes the best use of a VM size.
+
+    :param tasks: The completed tasks of a job, with execution info.
+    :param int frame_step: The frame step of the job the tasks belong to.
+    :param int tasks_per_node: The number of tasks run concurrently per node.
+    :returns: The frames rendered per node hour, or None if no frames rendered.
+    """
+    durations = frame_times(tasks, frame_step)
+    if not durations or not sum(durations.values()):
+        return None
+    return tasks_per_node * len(durations) * 3600.0 / sum(durations.values())
+
+
+def estimate_frame_times(frames, known_times):
+    """Estimate the render time of each frame. Frames without a known render
+    time are interpolated from the nearest known frames either side.
+
+    :param list frames: The frames to be rendered.
+    :param dict known_times: The known render times of previously rendered frames.
+    :returns: A list of estimated render times, in the same order as the frames.
+    """
+    known_frames = sorted(known_times)
+    estimates = []
+    for frame in frames:
+        if frame in known_times:
+            estimates.append(known_times[frame])
+            continue
+        index = bisect.bisect(known_frames, frame)
+        if index == 0:
+            estimates.append(known_times[known_frames[0]])
+        elif index == len(known_frames):
+            estimates.append(known_times[known_frames[-1]])
+        else:
+            before, after = known_frames[index - 1], known_frames[index]
+            weight = float(frame - before) / (after - before)
+            estimates.append(known_times[before] + weight * (known_times[after] - known_times[before]))
+    return estimates
+
+
+def fixed_chunks(frames, frames_per_task):
+    """Split the frames into chunks of a fixed number of frames.
+
+    :returns: A list of (first frame, last frame) tuples.
+    """
+    chunks = [frames[i:i + frames_per_task] for i in range(0, len(frames), frames_per_task)]
+    return [(c[0], c[-1]) for c in chunks]
+
+
+def order_chunks(chunks, order):
+    """Order the chunks of frames in which their tasks will be added to the
+    job, and so roughly the order in which they will be scheduled. Progressive
+    order renders the first, last and middle chunks first, then repeatedly
+    halves the gaps between rendered chunks, so that an even sample of the
+    whole frame range completes early in the job.
+
+    :param list chunks: The (first frame, last frame) tuples in frame order.
+    :param str order: Either sequential or progressive.
+    :returns: A list of the chunks in the order to be rendered.
+    """
+    if order != ORDER_PROGRESSIVE or len(chunks) < 3:
+        return list(chunks)
+    ordered = [0, len(chunks) - 1]
+    intervals = deque([(0, len(chunks) - 1)])
+    while intervals:
+        low, high = intervals.popleft()
+        if high - low < 2:
+            continue
+        middle = (low + high) // 2
+        ordered.append(middle)
+        intervals.extend([(low, middle), (middle, high)])
+    return [chunks[i] for i in ordered]
+
+
+def plan_chunks(frames, known_times, node_count, target_duration=TARGET_TASK_DURATION):
+    """Split the frames into chunks of consecutive frames, such that each task
+    will take roughly the target duration to render according to the render
+    times of previous jobs. Heavier frame ranges will therefore be split into
+    smaller chunks than lighter ones. If this results in fewer tasks than there
+    are nodes in the pool, the longest chunks are split further so that all
+    the nodes will be used.
+
+    :param list frames: The frames to be rendered, in order.
+    :param dict known_times: The known render times of previously rendered frames.
+    :param int node_count: The number of nodes in the pool.
+    :param int target_duration: The target task duration in seconds.
+    :returns: A list of (first frame, last frame) tuples.
+    """
+    if not frames:
+        return []
+    estimates = estimate_frame_times(frames, known_times)
+    chunks = []
+    chunk, chunk_time = [], 0
+    for frame, estimate in zip(frames, estimates):
+        # Close the current chunk if adding this frame would take it further
+        # from the target duration than leaving it out.
+        if chunk and abs(chunk_time + estimate - target_duration) > abs(chunk_time - target_duration):
+            chunks.append(chunk)
+            chunk, chunk_time = [], 0
+        chunk.append((frame, estimate))
+        chunk_time += estimate
+    chunks.append(chunk)
+
+    def total(c):
+        return sum(e for _, e in c)
+
+    while len(chunks) < node_count:
+        longest = max(chunks, key=lambda c: (len(c) > 1, total(c)))
+        if len(longest) < 2:
+            break
+        # Split at the point that most evenly divides the render time.
+        split = min(range(1, len(longest)),
+                    key=lambda i: max(total(longest[:i]), total(longest[i:])))
+        index = chunks.index(longest)
+        chunks[index:index + 1] = [longest[:split], longest[split:]]
+    return [(c[0][0], c[-1][0]) for c in chunks]
+
+
+def frame_outputs(output_names):
+    """Group the images in the output file group of a job by frame, using
+    the last number in each image file name.
+
+    :param list output_names: The file names in the output file group.
+    :returns: A dict of frame numbers to image names, or None if there are
+     images without a frame number, so outputs can't be matched to frames.
+    """
+    frames = defaultdict(list)
+    for name in output_names:
+        if name.split('/', 1)[0] in ['thumbs', 'logs', TILE_PATH, QUEUE_PATH]:
+            continue
+        match = FRAME_NUMBER.search(os.path.splitext(name.rsplit('/', 1)[-1])[0])
+        if not match:
+            return None
+        frames[int(match.group(1))].append(name)
+    return dict(frames)
+
+
+def output_frames(output_names):
+    """Get the frames that have rendered images in the output file group of a job.
+
+    :param list output_names: The file names in the output file group.
+    :returns: A set of frame numbers, or None if outputs can't be matched to frames.
+    """
+    frames = frame_outputs(output_names)
+    return set(frames) if frames is not None else None
+
+
+def frame_runs(frames, frame_step=1):
+    """Split a list of frames into runs of consecutive frames.
+
+    :param list frames: The frames to be rendered, in order.
+    :param int frame_step: The frame step of the job.
+    :returns: A list of lists of frames.
+    """
+    runs = []
+    for frame in frames:
+        if runs and frame - runs[-1][-1] == max(frame_step, 1):
+            runs[-1].append(frame)
+        else:
+            runs.append([frame])
+    return runs
+
+
+def rerun_tasks(job_tasks, rendered_frames=None, frame_step=1):
+    """Select the tasks of a finished job to be rerun. These are the tasks that
+    failed or never ran, and the tasks that exited successfully but whose frames
+    have no images in the job outputs. Tasks that depend on a selected task,
+    like the merge task of a tiled frame, are rerun with it.
+
+    :param list job_tasks: The tasks of the job.
+    :param set rendered_frames: The frames with images in the job outputs,
+     or None if missing outputs should not be checked.
+    :param int frame_step: The frame step of the job.
+    :returns: A list of the tasks to rerun, in job order.
+    """
+    dependents = defaultdict(list)
+    for task in job_tasks:
+        for task_id in (task.depends_on.task_ids if task.depends_on else None) or []:
+            dependents[task_id].append(task.id)
+    rerun = set()
+    for task in job_tasks:
+        info = task.execution_info
+        if not info or info.exit_code != 0:
+            rerun.add(task.id)
+        elif rendered_frames is not None and task.id not in dependents:
+            # Tasks with dependents upload their outputs for the dependent tasks
+            name = task.display_name or ''
+            if name.startswith(MERGE_PREFIX):
+                name = name[len(MERGE_PREFIX):]
+            if not set(task_frames(name, frame_step)) <= rendered_frames:
+                rerun.add(task.id)
+    pending = list(rerun)
+    while pending:
+        for task_id in dependents[pending.pop()]:
+            if task_id not in rerun:
+                rerun.add(task_id)
+                pending.append(task_id)
+    return [t for t in job_tasks if t.id in rerun]
+
+
+def changed_since(since):
+    """Get the filter of a task listing for the tasks that have changed state
+    since a time, also listing those that changed shortly before it.
+    """
+    since = since - STATE_OVERLAP
+    if since.tzinfo is not None:
+        since = (since - since.utcoffset()).replace(tzinfo=None)
+    return "stateTransitionTime ge datetime'{}'".format(since.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+
+class TaskStates(object):
+    """The state of each task of a job, for counting the progress of the job
+    where the job task counts aren't available. After the first update, only
+    the tasks that have changed state since the last update are listed.
+    """
+
+    def __init__(self):
+        self.states = {}
+        self.since = None
+        # Whether the job task counts can be used instead
+        self.job_counts = True
+
+    @property
+    def filter(self):
+        """The filter of the task listing for the next update, or None to
+        list every task.
+        """
+        return changed_since(self.since) if self.since is not None else None
+
+    def update(self, job_tasks):
+        """Update the states from a task listing, selecting TASK_STATE_SELECT."""
+        for task in job_tasks:
+            info = task.execution_info
+            self.states[task.id] = (getattr(task.state, 'value', task.state), info.exit_code if info else None)
+            if self.since is None or task.state_transition_time > self.since:
+                self.since = task.state_transition_time
+
+    def counts(self):
+        """:returns: The number of tasks, completed tasks and failed tasks."""
+        completed = [s for s in self.states.values() if s[0] == 'completed']
+        return len(self.states), len(completed), len([s for s in completed if s[1] != 0])
+
+
+def job_task_counts(task_counts):
+    """Get the number of tasks, completed tasks and failed tasks from the
+    task counts of a job.
+    """
+    return (task_counts.active + task_counts.running + task_counts.completed,
+            task_counts.completed, task_counts.failed)
+
+
+def load_template(template_file):
+    """Load a job application template.
+
+    :param str template_file: The path to the template JSON file.
+    """
+    with open(template_file, 'r') as template:
+        return json.load(template, object_pairs_hook=OrderedDict)
+
+
+def _render_task(repeat_task, task_id, first_frame, last_frame, output, tile=None):
+    """Create a task from the repeat task to render a chunk of frames, and
+    optionally a single layer, camera or tile of those frames.
+
+    :param str repeat_task: The JSON of the template repeat task.
+    :param tuple tile: The index and (left, right, bottom, top) region of the tile.
+    """
+    task_json = repeat_task.replace("{0}", str(first_frame))
+    task_json = task_json.replace("[parameters('taskFrameSpan')]", str(last_frame - first_frame))
+    task = OrderedDict([('id', task_id)])
+    task.update(json.loads(task_json, object_pairs_hook=OrderedDict))
+    task['displayName'] = task_name(first_frame, last_frame, output, tile and tile[0])
+    flags = [output_flags(output)]
+    suffix = [o for o in output if o]
+    if tile:
+        flags.append(region_flags(tile[1]))
+        suffix.append("tile{}".format(tile[0]))
+    flags = " ".join(f for f in flags if f)
+    if flags:
+        task['commandLine'] = task['commandLine'].replace("[parameters('taskFlags')]", flags)
+        task.setdefault('environmentSettings', []).append(OrderedDict([
+            ('name', LOG_SUFFIX_VAR), ('value', re.sub(r'\W', '_', '_' + '_'.join(suffix)))]))
+    return task
+
+
+def _merge_task(repeat_task, task_id, first_frame, last_frame, output, tile_ids, merge_task):
+    """Create a task to stitch together the tiles of a chunk of frames once
+    all the tile tasks have completed. The tile images are uploaded to their
+    own path in the output file group, from where they are downloaded by the merge
+    task, and the merged images are uploaded in place of the rendered frames.
+
+    :param dict repeat_task: The template repeat task.
+    :param list tile_ids: The IDs of the tasks rendering the tiles.
+    :param dict merge_task: The command line, resource files and environment
+     settings of the merge task.
+    """
+    prefix = "{}/{}/".format(TILE_PATH, task_id)
+    task = OrderedDict([('id', task_id)])
+    task['displayName'] = MERGE_PREFIX + task_name(first_frame, last_frame, output)
+    for key in ['userIdentity', 'containerSettings']:
+        if key in repeat_task:
+            task[key] = copy.deepcopy(repeat_task[key])
+    task['commandLine'] = merge_task['commandLine']
+    task['resourceFiles'] = copy.deepcopy(merge_task.get('resourceFiles', []))
+    task['environmentSettings'] = copy.deepcopy(merge_task.get('environmentSettings', []))
+    task['environmentSettings'].append(OrderedDict([('name', 'TILES_PREFIX'), ('value', prefix)]))
+    task['environmentSettings'].append(OrderedDict([('name', 'TILE_COUNT'), ('value', str(len(tile_ids)))]))
+    task['dependsOn'] = OrderedDict([('taskIds', tile_ids)])
+    task['outputFiles'] = [copy.deepcopy(o) for o in repeat_task['outputFiles']
+                           if o['filePattern'].startswith(('images', 'thumbs'))]
+    task['outputFiles'].extend(_task_logs(repeat_task, task_id))
+    return task
+
+
+def _task_logs(repeat_task, task_id):
+    """Get the output files to upload the stdout and stderr of a task that
+    doesn't split its output into a log per frame.
+
+    :param dict repeat_task: The template repeat task.
+    :param str task_id: The ID of the task, used to name its logs.
+    """
+    file_group = repeat_task['outputFiles'][0]['destination']['autoStorage']['fileGroup']
+    return [OrderedDict([
+        ('filePattern', "../{}.txt".format(stream)),
+        ('destination', {'autoStorage': OrderedDict([
+            ('fileGroup', file_group), ('path', "logs/{}{}.log".format(task_id, suffix))])}),
+        ('uploadOptions', {'uploadCondition': 'taskCompletion'})])
+        for stream, suffix in [('stdout', ''), ('stderr', '_error')]]
+
+
+def frame_queue(frames):
+    """Get the names of the blobs queueing the frames to be rendered by
+    render workers. Workers claim frames in name order, so the names are
+    prefixed with the position of the frame in the given order.
+
+    :param list frames: The frames to be rendered, in the order to render them.
+    """
+    return ["{}/{:06d}_{}".format(QUEUE_PATH, index, frame) for index, frame in enumerate(frames)]
+
+
+def build_worker_collection(template, worker_count, worker_task):
+    """Replace the parametric sweep task factory of a job application template
+    with a collection of render worker tasks. Each worker keeps the scene
+    loaded in a single Maya session and renders frames claimed from the job
+    frame queue until it is empty, uploading the outputs of each frame itself.
+
+    :param dict template: The loaded application template.
+    :param int worker_count: The number of worker tasks, which is usually the
+     number of tasks the pool can run at once.
+    :param dict worker_task: The command line, resource files and environment
+     settings of the worker tasks.
+    :returns: A copy of the template with a task collection task factory.
+    """
+    template = copy.deepcopy(template)
+    repeat_task = template['taskFactory']['repeatTask']
+    tasks = []
+    for index in range(worker_count):
+        task = _script_task(repeat_task, "{}{}".format(WORKER_PREFIX, index), worker_task)
+        task['displayName'] = "Render worker {}".format(index + 1)
+        task['outputFiles'] = _task_logs(repeat_task, task['id'])
+        tasks.append(task)
+    template['taskFactory'] = OrderedDict([('type', 'taskCollection'), ('tasks', tasks)])
+    return template
+
+
+def _script_task(repeat_task, task_id, script_task):
+    """Create a task from the repeat task that runs a script in place of the
+    render command line, with the environment of both.
+
+    :param dict repeat_task: The template repeat task.
+    :param dict script_task: The command line, resource files and environment
+     settings of the task.
+    """
+    task = OrderedDict([('id', task_id)])
+    for key in ['userIdentity', 'containerSettings']:
+        if key in repeat_task:
+            task[key] = copy.deepcopy(repeat_task[key])
+    task['commandLine'] = script_task['commandLine']
+    task['resourceFiles'] = copy.deepcopy(script_task.get('resourceFiles', []))
+    task['environmentSettings'] = copy.deepcopy(repeat_task.get('environmentSettings', []))
+    task['environmentSettings'].extend(copy.deepcopy(script_task.get('environmentSettings', [])))
+    return task
+
+
+def build_export_collection(template, chunks, export_task, render_task):
+    """Replace the parametric sweep task factory of a job application
+    template with tasks that export each chunk of frames to the scene format
+    of the renderer, and tasks that depend on them to render the exported
+    frames with the standalone renderer, without starting Maya. The exported
+    files are uploaded to the job outputs, from where they are downloaded by
+    the render task.
+
+    :param dict template: The loaded application template.
+    :param list chunks: A list of (first frame, last frame) tuples.
+    :param dict export_task: The command line, resource files and environment
+     settings of the export tasks.
+    :param dict render_task: The command line, resource files and environment
+     settings of the render tasks, and their multi-instance settings if each
+     frame is rendered across several nodes.
+    :returns: A copy of the template with a task collection task factory.
+    """
+    template = copy.deepcopy(template)
+    repeat_task = template['taskFactory']['repeatTask']
+    file_group = repeat_task['outputFiles'][0]['destination']['autoStorage']['fileGroup']
+    tasks = []
+    for index, (first_frame, last_frame) in enumerate(chunks):
+        frames = [OrderedDict([('name', 'FRAME_START'), ('value', str(first_frame))]),
+                  OrderedDict([('name', 'FRAME_END'), ('value', str(last_frame))])]
+        export = _script_task(repeat_task, "{}{}".format(EXPORT_PREFIX, index), export_task)
+        export['displayName'] = "Export " + task_name(first_frame, last_frame)
+        export['environmentSettings'].extend(copy.deepcopy(frames))
+        export['outputFiles'] = [OrderedDict([
+            ('filePattern', "{}/**/*".format(EXPORT_PATH)),
+            ('destination', {'autoStorage': OrderedDict([('fileGroup', file_group), ('path', EXPORT_PATH)])}),
+            ('uploadOptions', {'uploadCondition': 'taskSuccess'})])]
+        export['outputFiles'].extend(_task_logs(repeat_task, export['id']))
+        render = _script_task(repeat_task, str(index), render_task)
+        render['displayName'] = task_name(first_frame, last_frame)
+        render['environmentSettings'].extend(frames)
+        render['dependsOn'] = OrderedDict([('taskIds', [export['id']])])
+        if 'multiInstanceSettings' in render_task:
+            render['multiInstanceSettings'] = copy.deepcopy(render_task['multiInstanceSettings'])
+        render['outputFiles'] = copy.deepcopy(repeat_task['outputFiles'])
+        tasks.extend([export, render])
+    template['taskFactory'] = OrderedDict([('type', 'taskCollection'), ('tasks', tasks)])
+    template['usesTaskDependencies'] = True
+    return template
+
+
+def build_task_collection(template, chunks, outputs=None, tiles=None, merge_task=None):
+    """Replace the parametric sweep task factory of a job application template
+    with an explicit collection of tasks, one per chunk of frames and output.
+    The repeat task is used for each task, substituting the first frame of the
+    chunk, the span of frames to be rendered and the layer and camera flags.
+    As multiple tasks may render the same frame, each output is given its own
+    log file suffix.
+    If the frames are split into tiles, a task is added per tile, followed by
+    a task that depends on the tile tasks to merge them into the final images.
+
+    :param dict template: The loaded application template.
+    :param list chunks: A list of (first frame, last frame) tuples.
+    :param list outputs: A list of (layer, camera) tuples.
+    :param list tiles: A list of (left, right, bottom, top) tile regions.
+    :param dict merge_task: The command line, resource files and environment
+     settings of the task merging the tiles.
+    :returns: A copy of the template with a task collection task factory.
+    """
+    template = copy.deepcopy(template)
+    repeat_task = template['taskFactory']['repeatTask']
+    repeat_json = json.dumps(repeat_task)
+    tasks = []
+    for first_frame, last_frame in chunks:
+        for output in outputs or [(None, None)]:
+            if not tiles:
+                tasks.append(_render_task(repeat_json, str(len(tasks)), first_frame, last_frame, output))
+                continue
+            merge_id = "merge{}".format(len(tasks) + len(tiles))
+            tile_ids = []
+            for index, region in enumerate(tiles, 1):
+                task = _render_task(repeat_json, str(len(tasks)), first_frame,
+                                    last_frame, output, (index, region))
+                # Tiles are uploaded for the merge task rather than as outputs
+                task['outputFiles'] = [o for o in task['outputFiles'] if not o['filePattern'].startswith('thumbs')]
+                for output_file in task['outputFiles']:
+                    if output_file['filePattern'].startswith('images'):
+                        output_file['destination']['autoStorage']['path'] = "{}/{}/{}".format(
+                            TILE_PATH, merge_id, index)
+                tile_ids.append(task['id'])
+                tasks.append(task)
+            tasks.append(_merge_task(repeat_task, merge_id, first_frame, last_frame,
+                                     output, tile_ids, merge_task))
+    template['taskFactory'] = OrderedDict([('type', 'taskCollection'), ('tasks', tasks)])
+    if tiles:
+        # Task dependencies can only be enabled by the template of a templated job
+        template['usesTaskDependencies'] = True
+    return template
+
+
+def write_template(template, template_file):
+    """Write a job application template to file.
+
+    :param dict template: The application template.
+    :param str template_file: The path of the JSON file to write.
+    """
+    with open(template_file, 'w') as handle:
+        json.dump(template, handle, indent=2)
@@ -0,0 +1,217 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+from __future__ import unicode_literals
+
+import copy
+import logging
+import os
+import re
+
+import tasks
+
+
+EXPRESSION = re.compile(r"\[\[|\[parameters\('([^']+)'\)\]")
+PARAMETER_TYPES = ['int', 'string', 'bool']
+# Template properties that aren't part of the job
+TEMPLATE_PROPERTIES = ['templateMetadata', 'parameters']
+JOB_PROPERTIES = ['jobManagerTask', 'jobPreparationTask', 'jobReleaseTask', 'metadata',
+                  'commonEnvironmentSettings', 'usesTaskDependencies', 'onAllTasksComplete',
+                  'onTaskFailure', 'taskFactory']
+TEMPLATE_PATH_METADATA = 'az_batch:template_filepath'
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    _STRING_TYPES = (str,)
+
+
+def _compile_string(value):
+    """Split a template string into literal text and the names of the
+    parameters it references.
+
+    :returns: A list of (is parameter, text or parameter name) tuples, or None
+     if the string contains no template expressions.
+    """
+    parts = []
+    position = 0
+    for match in EXPRESSION.finditer(value):
+        if match.start() > position:
+            parts.append((False, value[position:match.start()]))
+        if match.group(1):
+            parts.append((True, match.group(1)))
+        else:
+            parts.append((False, '['))
+        position = match.end()
+    if not parts:
+        return None
+    if position < len(value):
+        parts.append((False, value[position:]))
+    return parts
+
+
+def compile_references(node, path=()):
+    """Find the strings in a template that contain parameter expressions.
+
+    :param node: The template, or any value within it.
+    :param tuple path: The keys and indices leading to the node.
+    :returns: A list of (path, parts) tuples, where the parts are as returned
+     by :func:`_compile_string`.
+    """
+    references = []
+    if isinstance(node, dict):
+        for key, value in node.items():
+            references.extend(compile_references(value, path + (key,)))
+    elif isinstance(node, list):
+        for index, value in enumerate(node):
+            references.extend(compile_references(value, path + (index,)))
+    elif isinstance(node, _STRING_TYPES):
+        parts = _compile_string(node)
+        if parts:
+            references.append((path, parts))
+    return references
+
+
+class ApplicationTemplate(object):
+    """A job application template, validated and compiled on load so that
+    expanding it only visits the strings that reference parameters.
+    """
+
+    def __init__(self, template_file):
+        """Load and validate an application template.
+
+        :param str template_file: The path to the template JSON file.
+        """
+        self.path = template_file
+        self.mtime = os.path.getmtime(template_file)
+        try:
+            self.template = tasks.load_template(template_file)
+        except (EnvironmentError, ValueError) as exp:
+            raise ValueError("Failed to load application template from '{}': {}".format(
+                template_file, exp))
+        self.definitions = self.template.get('parameters', {})
+        self.references = compile_references(
+            {k: v for k, v in self.template.items() if k not in TEMPLATE_PROPERTIES})
+        self._validate()
+
+    def _validate(self):
+        unsupported = [k for k in self.template if k not in TEMPLATE_PROPERTIES + JOB_PROPERTIES]
+        if unsupported:
+            raise ValueError("Application template '{}' may not use these properties: {}".format(
+                self.path, ', '.join(unsupported)))
+        for name, definition in self.definitions.items():
+            if definition.get('type') not in PARAMETER_TYPES:
+                raise ValueError("The parameter '{}' of application template '{}' specifies an "
+                                 "unsupported type: {}".format(name, self.path, definition.get('type')))
+        undefined = set(p[1] for r in self.references for p in r[1]
+                        if p[0] and p[1] not in self.definitions)
+        if undefined:
+            raise ValueError("Application template '{}' does not define parameter(s): {}".format(
+                self.path, ', '.join(sorted(undefined))))
+
+    def _parameter_values(self, parameters):
+        """Validate the parameters supplied by the job against the template
+        definitions, and fill in the default values.
+        """
+        unexpected = [k for k in parameters if k not in self.definitions]
+        if unexpected:
+            raise ValueError("Provided parameter(s) {} are not expected "
+                             "by the template.".format(', '.join(unexpected)))
+        values = {}
+        for name, definition in self.definitions.items():
+            value = parameters.get(name, definition.get('defaultValue'))
+            if value is None:
+                raise ValueError("A value for parameter '{}' must be provided "
+                                 "by the job.".format(name))
+            try:
+                if definition['type'] == 'int':
+                    value = int(value)
+                elif definition['type'] == 'bool' and not isinstance(value, bool):
+                    if str(value).lower() not in ['true', 'false']:
+                        raise ValueError()
+                    value = str(value).lower() == 'true'
+            except (TypeError, ValueError):
+                raise ValueError("Value '{}' supplied for parameter '{}' must be "
+                                 "a {}.".format(value, name, definition['type']))
+            if value not in definition.get('allowedValues', [value]):
+                raise ValueError("Value '{}' supplied for parameter '{}' must be one of: {}".format(
+                    value, name, ', '.join('{}'.format(v) for v in definition['allowedValues'])))
+            values[name] = value
+        return values
+
+    def expand(self, parameters, template=None):
+        """Substitute the parameter values into the template, to get the
+        properties it defines for a job.
+
+        :param dict parameters: The parameter values supplied by the job.
+        :param dict template: A modified copy of the template with a new
+         task factory, whose references are found as it's expanded.
+        :returns: A new dict of job properties.
+        """
+        values = self._parameter_values(parameters)
+        references = self.references
+        if template is None:
+            template = self.template
+        elif template.get('taskFactory') is not self.template.get('taskFactory'):
+            references = [r for r in references if r[0][0] != 'taskFactory']
+            references.extend(compile_references(template.get('taskFactory'), ('taskFactory',)))
+        job = copy.deepcopy(
+            type(template)((k, v) for k, v in template.items() if k not in TEMPLATE_PROPERTIES))
+        for path, parts in references:
+            node = job
+            for key in path[:-1]:
+                node = node[key]
+            if len(parts) == 1 and parts[0][0]:
+                # An entire value keeps the type of its parameter
+                node[path[-1]] = values[parts[0][1]]
+            else:
+                node[path[-1]] = ''.join(
+                    '{}'.format(values[p]) if is_param else p for is_param, p in parts)
+        return job
+
+
+class TemplateRegistry(object):
+    """Cache of the application templates, which are reloaded when the
+    template file is modified.
+    """
+
+    def __init__(self, directory):
+        """Create the template registry.
+
+        :param str directory: The directory of application templates.
+        """
+        self._log = logging.getLogger('AzureBatchMaya')
+        self.directory = directory
+        self.templates = {}
+
+    def load_all(self):
+        """Load and validate every template in the templates directory."""
+        for root, dirs, files in os.walk(self.directory):
+            for name in sorted(files):
+                if name.endswith('.json'):
+                    try:
+                        self.get(os.path.join(root, name))
+                    except ValueError as exp:
+                        self._log.warning(str(exp))
+        self._log.debug("Loaded {} application templates.".format(len(self.templates)))
+
+    def get(self, template_file):
+        """Get an application template, loading it if it hasn't been loaded
+        or has changed on disk since it was loaded.
+
+        :param str template_file: The path to the template JSON file.
+        :rtype: :class:`.ApplicationTemplate`
+        """
+        template = self.templates.get(template_file)
+        try:
+            modified = os.path.getmtime(template_file)
+        except EnvironmentError as exp:
+            raise ValueError("Failed to load application template from '{}': {}".format(
+                template_file, exp))
+        if not template or template.mtime != modified:
+            self._log.debug("Loading application template {}".format(template_file))
+            template = ApplicationTemplate(template_file)
+            self.templates[template_file] = template
+        return template
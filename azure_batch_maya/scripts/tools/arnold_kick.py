@@ -0,0 +1,160 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Render Arnold jobs outside of Maya. The export tasks of a job run this
+script with 'export' in mayapy, to export each frame of their chunk of
+frames to Arnold scene source files, which are uploaded to the job outputs.
+The render tasks then run it with 'render' to download the exported frames
+and render them with kick, without starting Maya.
+"""
+
+import os
+import re
+import sys
+import subprocess
+import traceback
+
+from task_utils import find_executable, render_threads, task_frames, list_blobs, download_blob
+
+
+FRAME_MARKER = "[AzureBatch] Starting frame"
+NODE_TYPE = re.compile(r'^([A-Za-z_]\w*)\s*$')
+NODE_PARAM = re.compile(r'^\s+(name|filename)\s+(.*?)\s*$')
+# Arnold log verbosity for each plug-in log level
+VERBOSITY = [1, 2, 5]
+
+
+def export_frames(scene_file, project, frames, ass_dir):
+    """Export each renderable layer and camera of the frames to a .ass file
+    per frame, named <frame>/<layer>_<camera>.ass.
+    """
+    import maya.standalone
+    maya.standalone.initialize()
+    from maya import cmds, mel
+    cmds.workspace(project, openWorkspace=True)
+    cmds.file(scene_file, open=True, force=True)
+    cmds.loadPlugin('mtoa', quiet=True)
+    mel.eval("renderPrep")
+    layers = [l for l in cmds.ls(type='renderLayer') if cmds.getAttr(l + '.renderable')]
+    cameras = [c for c in cmds.ls(type='camera') if cmds.getAttr(c + '.renderable')]
+    if not layers or not cameras:
+        raise Exception("The scene has no renderable layers or cameras.")
+    for frame in frames:
+        cmds.currentTime(frame)
+        mel.eval("renderPrepFrame")
+        for layer in layers:
+            cmds.editRenderLayerGlobals(currentRenderLayer=layer)
+            for camera in cameras:
+                name = re.sub(r'\W', '_', "{}_{}".format(layer, camera))
+                ass_file = os.path.join(ass_dir, str(frame), name + '.ass')
+                if not os.path.isdir(os.path.dirname(ass_file)):
+                    os.makedirs(os.path.dirname(ass_file))
+                print("Exporting frame {} of {} ({}) to {}".format(frame, layer, camera, ass_file))
+                cmds.arnoldExportAss(f=ass_file, cam=camera, lightLinks=True, shadowLinks=True)
+
+
+def ass_drivers(ass_file):
+    """Find the output drivers of an exported frame, returning the name and
+    image file of each driver.
+    """
+    drivers = []
+    node_type = None
+    name = None
+    with open(ass_file, 'r') as ass:
+        for line in ass:
+            node = NODE_TYPE.match(line)
+            if node:
+                node_type, name = node.group(1), None
+                continue
+            param = NODE_PARAM.match(line)
+            if not param or not node_type or not node_type.startswith('driver_'):
+                continue
+            if param.group(1) == 'name':
+                name = param.group(2)
+            elif name:
+                drivers.append((name, param.group(2).strip('"')))
+    return drivers
+
+
+def image_path(filename):
+    """The path of an image relative to the images directory of the task,
+    keeping any directories below the images directory it was exported to.
+    """
+    path = filename.replace('\\', '/')
+    index = path.rfind('/images/')
+    return path[index + len('/images/'):] if index >= 0 else os.path.basename(path)
+
+
+def kick_command(kick, ass_file, image_dir, threads, verbosity, shader_path=None):
+    """Build the command to render an exported frame with kick, with the
+    images written to the images directory of the task.
+    """
+    commands = [kick, '-i', ass_file, '-dw', '-dp', '-nstdin', '-t', str(threads), '-v', str(verbosity)]
+    if shader_path:
+        commands.extend(['-l', shader_path])
+    for name, filename in ass_drivers(ass_file):
+        output = os.path.join(image_dir, image_path(filename))
+        if not os.path.isdir(os.path.dirname(output)):
+            os.makedirs(os.path.dirname(output))
+        commands.extend(['-set', name + '.filename', output])
+    return commands
+
+
+def render_frames(container_url, prefix, frames, cwd):
+    """Download the exported files of each frame and render them with kick.
+
+    :returns: The number of frames that failed to render.
+    """
+    mtoa_path = os.environ.get('MTOA_PATH', '')
+    kick = os.environ.get('KICK') or find_executable('kick') or \
+        os.path.join(mtoa_path, 'bin', 'kick.exe' if os.name == 'nt' else 'kick')
+    shader_path = os.path.join(mtoa_path, 'shaders')
+    threads = render_threads()
+    log_level = min(max(int(os.environ.get('LOG_LEVEL', 1)), 0), len(VERBOSITY) - 1)
+    image_dir = os.path.join(cwd, 'images')
+    failures = 0
+    for frame in frames:
+        print("{} {}".format(FRAME_MARKER, frame))
+        sys.stdout.flush()
+        try:
+            frame_prefix = "{}{}/".format(prefix, frame)
+            blobs = list_blobs(container_url, frame_prefix)
+            if not blobs:
+                raise Exception("No exported files found for frame {}".format(frame))
+            for blob in blobs:
+                ass_file = os.path.join(cwd, 'exports', str(frame), blob[len(frame_prefix):])
+                download_blob(container_url, blob, ass_file)
+                commands = kick_command(kick, ass_file, image_dir, threads, VERBOSITY[log_level],
+                                        shader_path if os.path.isdir(shader_path) else None)
+                print("Running: {}".format(commands))
+                sys.stdout.flush()
+                exit_code = subprocess.call(commands)
+                if exit_code != 0:
+                    raise Exception("kick exited with code {}".format(exit_code))
+        except Exception as exp:
+            print("Frame {} failed: {}".format(frame, exp))
+            failures += 1
+    return failures
+
+
+if __name__ == '__main__':
+    exit_code = 0
+    try:
+        cwd = os.getcwd()
+        if sys.argv[1] == 'export':
+            export_frames(os.environ['SCENE_FILE'], os.environ['AZ_BATCH_JOB_PREP_WORKING_DIR'],
+                          task_frames(), os.path.join(cwd, 'exports'))
+        else:
+            failures = render_frames(os.environ['EXPORT_URL'], os.environ['EXPORT_PREFIX'], task_frames(), cwd)
+            if failures:
+                raise Exception("{} frames failed to render.".format(failures))
+    except Exception as exp:
+        exc_type, exc_value, exc_traceback = sys.exc_info()
+        print("".join(traceback.format_exception(exc_type, exc_value, exc_traceback)))
+        exit_code = 1
+    finally:
+        print("Exiting with code: {}".format(exit_code))
+        sys.stdout.flush()
+        sys.exit(exit_code)
@@ -13,6 +13,36 @@ import string
 
 printable = set(string.printable)
 SUPPORTED_FORMATS =  { ".png", ".bmp", ".jpg", ".tga", ".exr", ".jpeg" }
+FRAME_MARKER = b"[AzureBatch] Starting frame"
+
+
+def split_logs(first_frame, last_frame, frame_step):
+    """Split the task output into a log per frame, using the markers printed
+    by the pre-frame script. Any output before the first marker is included
+    in the log of the first frame, and anything after the last marker in the
+    log of the last frame. The error output is not marked, so it is copied
+    to the error log of each frame. If the frames are split between tasks by
+    render layer or camera, the log names are given the suffix for the task.
+    """
+    cwd = os.getcwd()
+    log_dir = os.path.join(cwd, 'logs')
+    if not os.path.isdir(log_dir):
+        os.makedirs(log_dir)
+    frames = list(range(first_frame, last_frame + 1, max(frame_step, 1))) or [first_frame]
+    frame_logs = [[] for _ in frames]
+    index = -1
+    with open(os.path.join(cwd, '..', 'stdout.txt'), 'rb') as task_log:
+        for line in task_log:
+            if FRAME_MARKER in line:
+                index = min(index + 1, len(frames) - 1)
+            frame_logs[max(index, 0)].append(line)
+    error_log = os.path.join(cwd, '..', 'stderr.txt')
+    suffix = os.environ.get('RENDER_LOG_SUFFIX', '')
+    for frame, lines in zip(frames, frame_logs):
+        with open(os.path.join(log_dir, 'frame_{}{}.log'.format(frame, suffix)), 'wb') as handle:
+            handle.writelines(lines)
+        shutil.copyfile(error_log, os.path.join(log_dir, 'frame_{}{}_error.log'.format(frame, suffix)))
+
 
 if __name__ == '__main__':
     try:
@@ -79,4 +109,10 @@ if __name__ == '__main__':
         print("".join(traceback.format_exception(exc_type, exc_value, exc_traceback)))
     finally:
         print("Exiting with code: {}".format(render_exit_code))
+        if len(sys.argv) > 4:
+            sys.stdout.flush()
+            try:
+                split_logs(int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
+            except Exception as exp:
+                print("Failed to split task logs: {}".format(exp))
         sys.exit(render_exit_code)
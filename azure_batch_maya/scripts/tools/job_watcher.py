@@ -26,6 +26,7 @@ from azure.batch.models import BatchErrorException
 from msrestazure.azure_exceptions import CloudError
 
 from aadEnvironmentProvider import AADEnvironmentProvider
+import tasks
 
 try:
     str = unicode
@@ -34,6 +35,12 @@ except NameError:
 batch_client = None
 storage_client = None
 header_line_length = 50
+# Intermediate outputs of the job that aren't downloaded
+SKIPPED_OUTPUTS = ['thumbs', 'tiles', 'queue', 'exports']
+DOWNLOAD_STATE = ".{}.downloads.json"
+QUEUE_PREFIX = 'queue/'
+# The suffix of the display name of a task rendering a tile of its frames
+TILE_TASK = re.compile(r'(?:\(|, )tile \d+\)$')
 
 aadClientId = "04b07795-8ddb-461a-bbee-02f9e1bf7b46" #Azure CLI
 
@@ -62,29 +69,210 @@ def _check_valid_dir(directory):
         raise RuntimeError(exp)
 
 
-def _download_output(job_id, output_name, output_path, size):
+def _download_output(job_id, output_name, output_path, size, downloaded=None, key=None):
     print("Downloading task output: {}".format(output_name))
-    call(batch_client.file.download, output_path, job_id, remote_path=output_name)
+    call(batch_client.file.download, output_path, job_id, remote_path=output_name, overwrite=True)
     print("Output {} download successful".format(output_name))
+    if downloaded is not None:
+        downloaded[output_name] = key
 
-def _track_completed_outputs(job_id, dwnld_dir):
-    job_outputs =  call(batch_client.file.list_from_group, job_id)
+
+def _state_file(job_id, dwnld_dir):
+    return os.path.join(dwnld_dir, DOWNLOAD_STATE.format(job_id))
+
+
+def _load_downloaded(job_id, dwnld_dir):
+    """Load the outputs already downloaded from the file group by earlier runs
+    of the watcher, as a dict of output names to their [size, uploaded time].
+    """
+    try:
+        with open(_state_file(job_id, dwnld_dir), 'r') as handle:
+            return json.load(handle)
+    except (EnvironmentError, ValueError):
+        return {}
+
+
+def _save_downloaded(job_id, dwnld_dir, downloaded):
+    try:
+        with open(_state_file(job_id, dwnld_dir), 'w') as handle:
+            json.dump(downloaded, handle)
+    except EnvironmentError as exp:
+        print("Failed to save download state: {}".format(exp))
+
+
+def _output_key(output):
+    return [output['size'], str(output.get('uploaded'))]
+
+
+class OutputDiscovery(object):
+    """Finds the outputs of the frames completed since the last poll, rather
+    than listing the whole output file group every poll. The images of a frame
+    are listed by the names of the image sequences found so far, with the frame
+    number in place of theirs, and its logs by their names in the template.
+    The whole file group is only listed on the first poll, once the job has
+    completed, or when a task rendered images that aren't part of a known
+    sequence, like a render layer that hasn't completed a frame before.
+    """
+
+    def __init__(self, job_id, output_group, frame_step=1):
+        self.job_id = job_id
+        self.output_group = output_group
+        self.frame_step = frame_step
+        self.completed = {}
+        self.since = None
+        self.sequences = set()
+        self.queued = None
+        self.list_all = True
+
+    def _list(self, prefix=None):
+        """List the outputs with a name prefix, leaving out those where the
+        prefix is followed by more digits, which belong to another frame or task.
+        """
+        outputs = call(batch_client.file.list_from_group, self.output_group, remote_path=prefix)
+        if not prefix:
+            return list(outputs)
+        return [o for o in outputs if not o['name'][len(prefix):][:1].isdigit()]
+
+    def _learn(self, outputs):
+        """Add the image sequences of the outputs, as the name before the
+        frame number and the padding of the frame number.
+        """
+        for output in outputs:
+            name = output['name']
+            if name.split('/', 1)[0] in SKIPPED_OUTPUTS + ['logs']:
+                continue
+            base_name = name.rsplit('/', 1)[-1]
+            match = tasks.FRAME_NUMBER.search(os.path.splitext(base_name)[0])
+            if match:
+                digits = match.group(1)
+                padding = len(digits) if digits.startswith('0') else 1
+                self.sequences.add((name[:len(name) - len(base_name) + match.start(1)], padding))
+
+    def completed_tasks(self):
+        """Get the tasks that have completed, or completed again after being
+        retried, since the last poll.
+        """
+        from azure.batch.models import TaskListOptions
+        query = "state eq 'completed'"
+        if self.since:
+            query += " and " + tasks.changed_since(self.since)
+        options = TaskListOptions(filter=query, select='id,displayName,stateTransitionTime,executionInfo')
+        job_tasks = [t for t in call(batch_client.task.list, self.job_id, task_list_options=options)
+                     if self.completed.get(t.id) != t.state_transition_time]
+        for task in job_tasks:
+            self.completed[task.id] = task.state_transition_time
+            if self.since is None or task.state_transition_time > self.since:
+                self.since = task.state_transition_time
+        return job_tasks
+
+    def completed_queue_frames(self):
+        """Get the frames of the frame queue rendered since the last poll, whose
+        entries have been removed from the queue by the render workers.
+        """
+        if self.queued is not None and not self.queued:
+            return []
+        queued = set(o['name'] for o in self._list(QUEUE_PREFIX))
+        completed = self.queued - queued if self.queued else set()
+        self.queued = queued
+        return [int(n.rsplit('_', 1)[1]) for n in completed]
+
+    def frame_outputs(self, frames, downloaded, logs=True, succeeded=True):
+        """Find the images and logs of rendered frames. If the frames rendered
+        successfully but no new images were found, the whole file group is
+        listed instead, to find the images of any new image sequences.
+        """
+        outputs = []
+        new_images = False
+        for frame in frames:
+            if logs:
+                outputs.extend(self._list("logs/frame_{}".format(frame)))
+            for prefix, padding in sorted(self.sequences):
+                images = self._list("{}{:0{}d}".format(prefix, frame, padding))
+                new_images |= any(downloaded.get(i['name']) != _output_key(i) for i in images)
+                outputs.extend(images)
+        if frames and succeeded and not new_images:
+            self.list_all = True
+        return outputs
+
+    def task_outputs(self, task, downloaded):
+        """Find the outputs of a completed task."""
+        name = task.display_name or ''
+        merge = name.startswith(tasks.MERGE_PREFIX)
+        if merge:
+            name = name[len(tasks.MERGE_PREFIX):]
+        frames = tasks.task_frames(name, self.frame_step)
+        if not frames:
+            # Export tasks and render workers upload a log per task
+            return self._list("logs/{}".format(task.id))
+        if TILE_TASK.search(name):
+            # Tiles are uploaded for the merge task rather than as outputs
+            return [l for f in frames for l in self._list("logs/frame_{}".format(f))]
+        outputs = self._list("logs/{}".format(task.id)) if merge else []
+        outputs.extend(self.frame_outputs(frames, downloaded, logs=not merge,
+                                          succeeded=bool(task.execution_info) and task.execution_info.exit_code == 0))
+        return outputs
+
+    def new_outputs(self, downloaded, job_completed=False):
+        """Find the outputs of the tasks and queued frames completed since
+        the last poll.
+        :param dict downloaded: The outputs already downloaded.
+        :param bool job_completed: Whether the job has completed, in which case
+         the whole file group is listed to find any outputs that were missed.
+        :returns: A list of the outputs, as listed from the file group.
+        """
+        job_tasks = self.completed_tasks()
+        queue_frames = self.completed_queue_frames()
+        outputs = []
+        if not self.list_all and not job_completed:
+            outputs.extend(self.frame_outputs(queue_frames, downloaded))
+            for task in job_tasks:
+                outputs.extend(self.task_outputs(task, downloaded))
+        if self.list_all or job_completed:
+            self.list_all = False
+            outputs = self._list()
+        self._learn(outputs)
+        return outputs
+
+
+def _track_completed_outputs(job_id, dwnld_dir, downloaded=None, job_outputs=None):
+    """Download the outputs that have been added to the file group, or have
+    changed, since they were last downloaded. Outputs that already exist in
+    the download directory with the same size are only recorded as downloaded.
+    :param dict downloaded: The outputs already downloaded, which is updated
+     with the new downloads. If not set, it's loaded from the download state file.
+    :param list job_outputs: The outputs to check, if not every output of the file group.
+    """
+    if downloaded is None:
+        downloaded = _load_downloaded(job_id, dwnld_dir)
+    if job_outputs is None:
+        job_outputs = call(batch_client.file.list_from_group, job_id)
+    previous = dict(downloaded)
     downloads = []
     for output in job_outputs:
-        if output['name'].startswith('thumbs/'):
+        if output['name'].split('/', 1)[0] in SKIPPED_OUTPUTS:
             continue
-        else:
-            downloads.append(
-                threading.Thread(
-                    target=_download_output,
-                    args=(job_id, output['name'], dwnld_dir, output['size'])))
-            downloads[-1].start()
-            if len(downloads) >= batch_client.threads:
-                for thread in downloads:
-                    thread.join()
-                downloads = []
+        key = _output_key(output)
+        if downloaded.get(output['name']) == key:
+            continue
+        local_path = os.path.join(dwnld_dir, output['name'])
+        if output['name'] not in downloaded and os.path.isfile(local_path) and \
+                os.path.getsize(local_path) == output['size']:
+            downloaded[output['name']] = key
+            continue
+        downloads.append(
+            threading.Thread(
+                target=_download_output,
+                args=(job_id, output['name'], dwnld_dir, output['size'], downloaded, key)))
+        downloads[-1].start()
+        if len(downloads) >= int(batch_client.threads):
+            for thread in downloads:
+                thread.join()
+            downloads = []
     for thread in downloads:
         thread.join()
+    if downloaded != previous:
+        _save_downloaded(job_id, dwnld_dir, downloaded)
+    return downloaded
 
 
 def _check_job_stopped(job):
@@ -120,30 +308,52 @@ def _check_job_stopped(job):
         raise RuntimeError(exp)
 
 
+def _task_counts(job_id, task_states):
+    """Count the tasks of the job, using the job task counts where they're
+    available, or otherwise listing the tasks that changed state since the
+    last poll.
+    :returns: The number of tasks, completed tasks and failed tasks.
+    """
+    from azure.batch.models import TaskListOptions
+    if task_states.job_counts and hasattr(batch_client.job, 'get_task_counts'):
+        try:
+            return tasks.job_task_counts(call(batch_client.job.get_task_counts, job_id))
+        except (ValueError, BatchErrorException) as exp:
+            print("Job task counts unavailable, listing tasks instead: {}".format(exp))
+            task_states.job_counts = False
+    options = TaskListOptions(filter=task_states.filter, select=tasks.TASK_STATE_SELECT)
+    task_states.update(call(batch_client.task.list, job_id, task_list_options=options))
+    return task_states.counts()
+
+
 def track_job_progress(job_id, dwnld_dir):
-    from azure.batch.models import TaskState
+    from azure.batch.models import JobState
     print("Tracking job with ID: {0}".format(job_id))
     try:
         job = call(batch_client.job.get, job_id)
-        tasks = [t for t in call(batch_client.task.list, job_id)]
+        metadata = {m.name: m.value for m in job.metadata or []}
+        # A job rerunning failed tasks uploads to the outputs of the original job
+        output_group = metadata.get('Outputs', job_id)
+        discovery = OutputDiscovery(job_id, output_group, int(metadata.get('FrameStep', 1)))
+        task_states = tasks.TaskStates()
+        downloaded = _load_downloaded(output_group, dwnld_dir)
         while True:
-            completed_tasks = [t for t in tasks if t.state == TaskState.completed]
-            errored_tasks = [t for t in completed_tasks if t.execution_info.exit_code != 0]
-            if len(tasks) == 0:
+            total, completed, failed = _task_counts(job_id, task_states)
+            if total == 0:
                 percentage = 0
             else:
-                percentage = (100 * len(completed_tasks)) / len(tasks)
+                percentage = (100 * completed) / total
             print("Running - {}%".format(percentage))
-            if errored_tasks:
+            if failed:
                 print("    - Warning: some tasks have failed.")
 
-            _track_completed_outputs(job_id, dwnld_dir)
+            outputs = discovery.new_outputs(downloaded, job.state == JobState.completed)
+            _track_completed_outputs(output_group, dwnld_dir, downloaded, outputs)
             if _check_job_stopped(job):
                 return # Job complete
 
             time.sleep(10)
             job = call(batch_client.job.get, job_id)
-            tasks = [t for t in call(batch_client.task.list, job_id)]
     except BatchErrorException: #KeyboardInterrupt:
         raise RuntimeError("Monitoring aborted.")
 
@@ -0,0 +1,90 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import sys
+import subprocess
+import traceback
+
+from task_utils import find_executable, list_blobs, download_blob
+
+
+def merge_command(tiles, output_file):
+    """Build the command to stitch the tiles of an image. Each tile is a full
+    frame that is empty outside its region, so the tiles are added together.
+    OpenImageIO is preferred as it retains every channel of a multichannel EXR,
+    otherwise ImageMagick is used.
+    """
+    oiiotool = os.environ.get('OIIOTOOL') or find_executable('oiiotool')
+    if oiiotool:
+        commands = [oiiotool, tiles[0]]
+        for tile in tiles[1:]:
+            commands.extend([tile, '--add'])
+        return commands + ['-o', output_file]
+    commands = ['convert'] + tiles + ['-background', 'none', '-compose', 'plus', '-layers', 'flatten', output_file]
+    if os.name == 'nt':
+        commands.insert(0, 'magick')
+    return commands
+
+
+def run(commands):
+    print("Running: {}".format(commands))
+    process = subprocess.Popen(commands, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    if process.returncode != 0:
+        print(stdout)
+        print(stderr)
+        raise Exception("Command exited with code: {}".format(process.returncode))
+
+
+if __name__ == '__main__':
+    exit_code = 0
+    try:
+        cwd = os.getcwd()
+        container_url = os.environ['TILES_URL']
+        prefix = os.environ['TILES_PREFIX']
+        tile_count = int(os.environ['TILE_COUNT'])
+
+        # Tiles are uploaded to <prefix><tile index>/<image path>
+        images = {}
+        for blob in list_blobs(container_url, prefix):
+            tile, image = blob[len(prefix):].split('/', 1)
+            local_path = os.path.join(cwd, 'tiles', tile, *image.split('/'))
+            download_blob(container_url, blob, local_path)
+            images.setdefault(image, []).append(local_path)
+        print("Downloaded tiles of {} images.".format(len(images)))
+        if not images:
+            raise Exception("No tiles found under: {}".format(prefix))
+
+        merged = []
+        for image, tiles in sorted(images.items()):
+            if len(tiles) != tile_count:
+                raise Exception("Found {} of {} tiles for image: {}".format(len(tiles), tile_count, image))
+            output_file = os.path.join(cwd, 'images', *image.split('/'))
+            if not os.path.isdir(os.path.dirname(output_file)):
+                os.makedirs(os.path.dirname(output_file))
+            run(merge_command(sorted(tiles), output_file))
+            merged.append(output_file)
+        print("Successfully merged {} images.".format(len(merged)))
+
+        try:
+            thumb_dir = os.path.join(cwd, 'thumbs')
+            if not os.path.isdir(thumb_dir):
+                os.makedirs(thumb_dir)
+            beauty_pass = [m for m in merged if 'beauty' in m.lower()]
+            thumbnail = os.path.join(thumb_dir, os.environ['AZ_BATCH_TASK_ID'] + '_thumb.png')
+            commands = ['convert', (beauty_pass or merged)[0], '-thumbnail', '200x150', thumbnail]
+            if os.name == 'nt':
+                commands.insert(0, 'magick')
+            run(commands)
+        except Exception as exp:
+            print("Thumbnail generation failed: {}".format(exp))
+    except Exception as exp:
+        exc_type, exc_value, exc_traceback = sys.exc_info()
+        print("".join(traceback.format_exception(exc_type, exc_value, exc_traceback)))
+        exit_code = 1
+    finally:
+        print("Exiting with code: {}".format(exit_code))
+        sys.exit(exit_code)
@@ -0,0 +1,366 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import uuid
+import shutil
+import threading
+import subprocess
+import traceback
+import xml.etree.ElementTree as ET
+
+try:
+    from urllib.request import urlopen, Request
+    from urllib.error import HTTPError
+    from urllib.parse import quote
+except ImportError:
+    from urllib2 import urlopen, Request, HTTPError
+    from urllib import quote
+
+from task_utils import render_threads
+
+
+QUEUE_WAIT = 30
+# Stop waiting for frames claimed by other workers after this many seconds.
+QUEUE_TIMEOUT = 10 * 60
+# Claimed frames are released this many seconds after a worker stops renewing
+# the lease, so the frames of a worker that died are picked up by the others.
+LEASE_DURATION = 60
+# The renderers of the Render command shorthands of the renderer parameter
+RENDERER_NAMES = {'sw': 'mayaSoftware'}
+
+
+class BlobFrameQueue(object):
+    """A queue of frames to render, shared between the workers of a job.
+    Each frame is an empty blob named <prefix><order>_<frame>. A worker claims
+    a frame by taking a lease on its blob, which is renewed while the frame
+    is rendered, and deletes the blob once the frame has been rendered. Leases
+    are taken with an ID unique to the worker task, so if the task is retried
+    it resumes the frames it had claimed.
+    """
+
+    def __init__(self, container_url, prefix, worker_id):
+        self.base_url, self.sas = container_url.split('?', 1)
+        self.prefix = prefix
+        self.lease_id = str(uuid.uuid5(uuid.NAMESPACE_URL, worker_id))
+
+    def _request(self, method, blob=None, query='', headers=None, data=None):
+        url = "{}/{}?{}{}".format(self.base_url, quote(blob), query, self.sas) if blob else \
+            "{}?{}{}".format(self.base_url, query, self.sas)
+        request = Request(url, data=data, headers=headers or {})
+        request.get_method = lambda: method
+        request.add_header('x-ms-version', '2017-04-17')
+        return urlopen(request).read()
+
+    def list(self):
+        """List the names of the frames remaining in the queue, in order."""
+        names, marker = [], ''
+        while True:
+            listing = ET.fromstring(self._request(
+                'GET', query="restype=container&comp=list&prefix={}&marker={}&".format(
+                    quote(self.prefix), quote(marker))))
+            names.extend(b.find('Name').text for b in listing.iter('Blob'))
+            marker = listing.findtext('NextMarker')
+            if not marker:
+                return names
+
+    def claim(self, name):
+        """Try to take the lease of a frame blob, returning False if it has
+        already been claimed by another worker or completed.
+        """
+        try:
+            self._request('PUT', name, query="comp=lease&", headers={
+                'x-ms-lease-action': 'acquire',
+                'x-ms-lease-duration': str(LEASE_DURATION),
+                'x-ms-proposed-lease-id': self.lease_id})
+            return True
+        except HTTPError as exp:
+            if exp.code in [404, 409]:
+                return False
+            raise
+
+    def renew(self, name):
+        """Renew the lease of a claimed frame."""
+        self._request('PUT', name, query="comp=lease&", headers={
+            'x-ms-lease-action': 'renew',
+            'x-ms-lease-id': self.lease_id})
+
+    def complete(self, name):
+        try:
+            self._request('DELETE', name, headers={'x-ms-lease-id': self.lease_id})
+        except HTTPError as exp:
+            if exp.code not in [404, 409, 412]:
+                raise
+            print("Lost the lease of {}, so it may be rendered again.".format(name))
+
+    def upload(self, local_path, blob):
+        """Upload a file to the output file group."""
+        with open(local_path, 'rb') as handle:
+            self._request('PUT', blob, headers={'x-ms-blob-type': 'BlockBlob'}, data=handle.read())
+
+
+class LocalFrameQueue(object):
+    """A stand-in for the blob frame queue, using files in a local directory.
+    A frame is claimed by renaming its file with the worker ID, with the
+    modification time of the file as the time the lease was last renewed,
+    and outputs are copied to an outputs directory.
+    """
+
+    def __init__(self, directory, worker_id, lease_duration=LEASE_DURATION):
+        self.directory = directory
+        self.worker_id = worker_id
+        self.lease_duration = lease_duration
+        self.outputs = os.path.join(directory, 'outputs')
+
+    def list(self):
+        queue_dir = os.path.join(self.directory, 'queue')
+        return sorted('queue/' + f.split('.', 1)[0] for f in os.listdir(queue_dir))
+
+    def claim(self, name):
+        path = os.path.join(self.directory, *name.split('/'))
+        claimed = "{}.{}".format(path, self.worker_id)
+        if os.path.isfile(claimed):
+            os.utime(claimed, None)
+            return True
+        queue_dir, frame = os.path.split(path)
+        expired = [os.path.join(queue_dir, f) for f in os.listdir(queue_dir)
+                   if f.split('.', 1)[0] == frame and f != frame]
+        expired = [f for f in expired if os.path.getmtime(f) < time.time() - self.lease_duration]
+        for current in [path] + expired:
+            try:
+                os.rename(current, claimed)
+                os.utime(claimed, None)
+                return True
+            except OSError:
+                continue
+        return False
+
+    def renew(self, name):
+        os.utime("{}.{}".format(os.path.join(self.directory, *name.split('/')), self.worker_id), None)
+
+    def complete(self, name):
+        os.remove("{}.{}".format(os.path.join(self.directory, *name.split('/')), self.worker_id))
+
+    def upload(self, local_path, blob):
+        destination = os.path.join(self.outputs, *blob.split('/'))
+        if not os.path.isdir(os.path.dirname(destination)):
+            os.makedirs(os.path.dirname(destination))
+        shutil.copyfile(local_path, destination)
+
+
+def queue_frame(name):
+    """Get the frame number from the name of a queued frame."""
+    return int(name.rsplit('/', 1)[-1].split('_', 1)[1])
+
+
+def claim_frames(queue, wait=QUEUE_WAIT, timeout=QUEUE_TIMEOUT):
+    """Claim frames from the queue until it is empty. If the remaining frames
+    are all claimed by other workers, wait in case a worker fails and the
+    lease of its frames expires, for up to the timeout.
+
+    :returns: A generator of (queued name, frame number) tuples.
+    """
+    waited = 0
+    while True:
+        remaining = queue.list()
+        if not remaining:
+            return
+        claimed = False
+        for name in remaining:
+            if queue.claim(name):
+                claimed = True
+                waited = 0
+                yield name, queue_frame(name)
+        if not claimed:
+            if waited >= timeout:
+                print("The remaining {} frames are being rendered by other workers.".format(len(remaining)))
+                return
+            time.sleep(wait)
+            waited += wait
+
+
+class LeaseHeartbeat(threading.Thread):
+    """Renew the lease of a claimed frame in the background until stopped."""
+
+    def __init__(self, queue, frame_name, interval=LEASE_DURATION / 3):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.queue = queue
+        self.frame_name = frame_name
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.queue.renew(self.frame_name)
+            except Exception as exp:
+                print("Failed to renew the lease of {}: {}".format(self.frame_name, exp))
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class LogSplitter(object):
+    """Copy the task output written while rendering each frame into a log per frame,
+    named as in the render tasks."""
+
+    def __init__(self, task_dir):
+        self.streams = [(os.path.join(task_dir, 'stdout.txt'), ''),
+                        (os.path.join(task_dir, 'stderr.txt'), '_error')]
+        self.offsets = [self._size(s[0]) for s in self.streams]
+
+    def _size(self, path):
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+
+    def frame_logs(self, frame, log_dir):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        logs = []
+        for index, (stream, suffix) in enumerate(self.streams):
+            log_file = os.path.join(log_dir, 'frame_{}{}.log'.format(frame, suffix))
+            with open(log_file, 'wb') as log:
+                if os.path.isfile(stream):
+                    with open(stream, 'rb') as handle:
+                        handle.seek(self.offsets[index])
+                        log.write(handle.read())
+            self.offsets[index] = self._size(stream)
+            logs.append(log_file)
+        return logs
+
+
+def upload_outputs(queue, local_dir, blob_dir):
+    """Upload and remove the files rendered for a frame."""
+    uploaded = []
+    for root, dirs, files in os.walk(local_dir):
+        for name in files:
+            local_path = os.path.join(root, name)
+            relative = os.path.relpath(local_path, local_dir).replace(os.sep, '/')
+            queue.upload(local_path, "{}/{}".format(blob_dir, relative) if blob_dir else relative)
+            uploaded.append(local_path)
+    for local_path in uploaded:
+        os.remove(local_path)
+    return uploaded
+
+
+def make_thumbnail(images, thumb_file):
+    commands = ['convert', ([i for i in images if 'beauty' in i.lower()] or images)[0],
+                '-thumbnail', '200x150', thumb_file]
+    if os.name == 'nt':
+        commands.insert(0, 'magick')
+    subprocess.call(commands)
+
+
+def render_frames(queue, render, cwd, task_dir, task_id):
+    """Render frames claimed from the queue until it is empty, uploading the
+    images, thumbnail and logs of each frame to the same paths as the render
+    tasks.
+
+    :param func render: Renders a frame to a directory, raising on failure.
+    :returns: The number of frames that failed to render.
+    """
+    image_dir = os.path.join(cwd, 'images')
+    thumb_dir = os.path.join(cwd, 'thumbs')
+    log_dir = os.path.join(cwd, 'logs')
+    for directory in [image_dir, thumb_dir, log_dir]:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+    logs = LogSplitter(task_dir)
+    failures = 0
+    for name, frame in claim_frames(queue):
+        heartbeat = LeaseHeartbeat(queue, name)
+        heartbeat.start()
+        try:
+            render(frame, image_dir)
+            images = [os.path.join(r, f) for r, d, files in os.walk(image_dir) for f in files]
+            if not images:
+                raise Exception("No images rendered for frame {}".format(frame))
+            try:
+                make_thumbnail(images, os.path.join(thumb_dir, "{}_{}_thumb.png".format(task_id, frame)))
+            except Exception as exp:
+                print("Thumbnail generation failed: {}".format(exp))
+            upload_outputs(queue, image_dir, None)
+            upload_outputs(queue, thumb_dir, 'thumbs')
+        except Exception as exp:
+            print("Frame {} failed: {}".format(frame, exp))
+            failures += 1
+            # Don't upload any partial outputs with the next frame
+            shutil.rmtree(image_dir, ignore_errors=True)
+            os.makedirs(image_dir)
+        finally:
+            logs.frame_logs(frame, log_dir)
+            upload_outputs(queue, log_dir, 'logs')
+            heartbeat.stop()
+            queue.complete(name)
+    return failures
+
+
+def thread_settings(renderer, threads):
+    """The render settings limiting the threads of a renderer, as set by the
+    -ai:threads, -threads and -n flags of the Render command of the other
+    tasks of a job, so the workers on a node split its cores between them.
+    """
+    if renderer == 'arnold':
+        return [('defaultArnoldRenderOptions.threads_autodetect', 0),
+                ('defaultArnoldRenderOptions.threads', threads)]
+    if renderer == 'vray':
+        return [('vraySettings.sys_max_threads', threads)]
+    if renderer == 'mayaSoftware':
+        return [('defaultRenderGlobals.numCpusToUse', threads)]
+    return []
+
+
+def maya_renderer(scene_file, renderer, project, threads):
+    """Open the scene in a Maya session, and return a function to render a
+    frame of the scene with the renderer of the job.
+
+    :param str renderer: The renderer parameter of the job, which may be the
+     shorthand of the renderer used by the Render command.
+    :param int threads: The number of threads to render with.
+    """
+    import maya.standalone
+    maya.standalone.initialize()
+    from maya import cmds, mel
+    renderer = RENDERER_NAMES.get(renderer, renderer)
+    cmds.workspace(project, openWorkspace=True)
+    cmds.file(scene_file, open=True, force=True)
+    mel.eval("renderPrep")
+    cmds.setAttr('defaultRenderGlobals.animation', 1)
+    for attribute, value in thread_settings(renderer, threads):
+        cmds.setAttr(attribute, value)
+
+    def render(frame, image_dir):
+        cmds.workspace(fileRule=['images', image_dir])
+        cmds.setAttr('defaultRenderGlobals.startFrame', frame)
+        cmds.setAttr('defaultRenderGlobals.endFrame', frame)
+        cmds.setAttr('defaultRenderGlobals.byFrameStep', 1)
+        mel.eval("renderPrepFrame")
+        mel.eval('mayaBatchRenderProcedure(0, "", "", "{}", "")'.format(renderer))
+    return render
+
+
+if __name__ == '__main__':
+    exit_code = 0
+    try:
+        cwd = os.getcwd()
+        task_id = os.environ['AZ_BATCH_TASK_ID']
+        worker_id = "{}/{}".format(os.environ['AZ_BATCH_JOB_ID'], task_id)
+        queue = BlobFrameQueue(os.environ['QUEUE_URL'], os.environ['QUEUE_PREFIX'], worker_id)
+        render = maya_renderer(os.environ['SCENE_FILE'], os.environ['RENDERER'],
+                               os.environ['AZ_BATCH_JOB_PREP_WORKING_DIR'], render_threads())
+        failures = render_frames(queue, render, cwd, os.path.dirname(cwd), task_id)
+        if failures:
+            raise Exception("{} frames failed to render.".format(failures))
+        print("Render queue is empty.")
+    except Exception as exp:
+        exc_type, exc_value, exc_traceback = sys.exc_info()
+        print("".join(traceback.format_exception(exc_type, exc_value, exc_traceback)))
+        exit_code = 1
+    finally:
+        print("Exiting with code: {}".format(exit_code))
+        sys.exit(exit_code)
@@ -0,0 +1,45 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Submit render jobs from the command line, without the Maya UI.
+
+Usage:
+    mayapy submit_jobs.py <job configuration JSON file>
+
+The plug-in must have been signed in from Maya at least once, as the cached
+sign-in of the plug-in is reused. Progress and results are written to stdout
+as lines of JSON. See docs/submitting_jobs.md for the job configuration format.
+"""
+
+import os
+import sys
+
+
+if __name__ == "__main__":
+    tools_dir = os.path.dirname(os.path.abspath(__file__))
+    scripts_dir = os.path.dirname(tools_dir)
+    install_dir = os.path.dirname(scripts_dir)
+    os.environ.setdefault("AZUREBATCH_ICONS", os.path.join(install_dir, "icons"))
+    os.environ.setdefault("AZUREBATCH_TEMPLATES", os.path.join(install_dir, "templates"))
+    os.environ.setdefault("AZUREBATCH_MODULES", os.path.join(install_dir, "modules"))
+    os.environ.setdefault("AZUREBATCH_TOOLS", tools_dir)
+    os.environ.setdefault("AZUREBATCH_SCRIPTS", os.pathsep.join(
+        [scripts_dir, os.path.join(scripts_dir, "ui")]))
+    sys.path.extend(os.environ["AZUREBATCH_SCRIPTS"].split(os.pathsep))
+    sys.path.append(os.environ['AZUREBATCH_MODULES'])
+    sys.path.append(os.environ['AZUREBATCH_TOOLS'])
+
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    try:
+        from maya import cmds
+        sys.path.insert(0, os.path.normpath(
+            os.path.join(cmds.internalVar(userScriptDir=True), 'azure-batch-libs')))
+        import headless
+        exit_code = headless.main(sys.argv[1:])
+    finally:
+        maya.standalone.uninitialize()
+    sys.exit(exit_code)
@@ -0,0 +1,82 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Helpers shared by the scripts run by the tasks of a job on the pool nodes.
+This script is uploaded with the job scripts and downloaded next to them
+into the working directory of each task that runs one of them.
+"""
+
+import os
+import xml.etree.ElementTree as ET
+
+try:
+    from urllib.request import urlopen
+    from urllib.parse import quote
+except ImportError:
+    from urllib2 import urlopen
+    from urllib import quote
+
+
+def find_executable(name):
+    """Find an executable on the PATH, returning None if it can't be found."""
+    extensions = ['.exe', ''] if os.name == 'nt' else ['']
+    for path in os.environ.get('PATH', '').split(os.pathsep):
+        for ext in extensions:
+            executable = os.path.join(path.strip('"'), name + ext)
+            if os.path.isfile(executable):
+                return executable
+    return None
+
+
+def cpu_count():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+
+def render_threads():
+    """The number of threads to render with, splitting the cores of the node
+    between the tasks that run on it at the same time.
+    """
+    tasks_per_node = max(1, int(os.environ.get('TASKS_PER_NODE', 1)))
+    return max(1, cpu_count() // tasks_per_node)
+
+
+def task_frames():
+    """The frames of the task, as set by its environment."""
+    return list(range(int(os.environ['FRAME_START']), int(os.environ['FRAME_END']) + 1,
+                      max(1, int(os.environ['FRAME_STEP']))))
+
+
+def list_blobs(container_url, prefix):
+    """List the blobs with a name prefix, following continuation markers.
+
+    :param str container_url: The output container URL with a list and read SAS.
+    """
+    base_url, sas = container_url.split('?', 1)
+    blobs, marker = [], ''
+    while True:
+        url = "{}?restype=container&comp=list&prefix={}&marker={}&{}".format(
+            base_url, quote(prefix), quote(marker), sas)
+        listing = ET.fromstring(urlopen(url).read())
+        blobs.extend(b.find('Name').text for b in listing.iter('Blob'))
+        marker = listing.findtext('NextMarker')
+        if not marker:
+            return blobs
+
+
+def download_blob(container_url, blob, local_path):
+    base_url, sas = container_url.split('?', 1)
+    if not os.path.isdir(os.path.dirname(local_path)):
+        os.makedirs(os.path.dirname(local_path))
+    response = urlopen("{}/{}?{}".format(base_url, quote(blob), sas))
+    with open(local_path, 'wb') as handle:
+        while True:
+            data = response.read(1024 * 1024)
+            if not data:
+                break
+            handle.write(data)
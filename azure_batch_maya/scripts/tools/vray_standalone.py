@@ -0,0 +1,201 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Render V-Ray jobs outside of Maya. The export tasks of a job run this
+script with 'export' in mayapy, to export their chunk of frames to a .vrscene
+file per render layer and camera, which are uploaded to the job outputs.
+The render tasks then run it with 'render' to download the exported scenes
+and render them with V-Ray Standalone, without starting Maya. The asset
+paths in the exported scenes are remapped with the dirmap rules of the job
+path map. When run by the primary instance of a multi-instance task, the
+frames are rendered with the render servers on the other nodes of the task.
+"""
+
+import os
+import re
+import sys
+import subprocess
+import traceback
+import xml.etree.ElementTree as ET
+
+from task_utils import find_executable, render_threads, task_frames, list_blobs, download_blob
+
+
+FRAME_MARKER = "[AzureBatch] Starting frame"
+# V-Ray Standalone renders every frame of the chunk in a single process,
+# so the frame markers for the task logs are added as each frame starts.
+VRAY_FRAME = re.compile(r'(?:Rendering|Starting) frame (-?\d+)', re.IGNORECASE)
+DIRMAP_RULE = re.compile(r'^dirmap -m "((?:[^"\\]|\\.)*)" "((?:[^"\\]|\\.)*)";')
+
+
+def frame_range(frames):
+    """The start, end and step of the frames of a chunk, which Maya can only
+    export as a range with a single step.
+    """
+    steps = set(b - a for a, b in zip(frames, frames[1:])) or set([1])
+    if len(steps) > 1:
+        raise ValueError("Frames {} are not evenly stepped.".format(frames))
+    return frames[0], frames[-1], steps.pop()
+
+
+def export_scenes(scene_file, project, frames, export_dir):
+    """Export the frames of each renderable layer and camera to a .vrscene
+    file, named <layer>_<camera>.vrscene.
+    """
+    import maya.standalone
+    maya.standalone.initialize()
+    from maya import cmds, mel
+    cmds.workspace(project, openWorkspace=True)
+    cmds.file(scene_file, open=True, force=True)
+    cmds.loadPlugin('vrayformaya', quiet=True)
+    mel.eval("renderPrep")
+    layers = [l for l in cmds.ls(type='renderLayer') if cmds.getAttr(l + '.renderable')]
+    cameras = [c for c in cmds.ls(type='camera') if cmds.getAttr(c + '.renderable')]
+    if not layers or not cameras:
+        raise Exception("The scene has no renderable layers or cameras.")
+    start, end, step = frame_range(frames)
+    if not os.path.isdir(export_dir):
+        os.makedirs(export_dir)
+    cmds.setAttr('defaultRenderGlobals.animation', 1)
+    cmds.setAttr('defaultRenderGlobals.startFrame', start)
+    cmds.setAttr('defaultRenderGlobals.endFrame', end)
+    cmds.setAttr('defaultRenderGlobals.byFrameStep', step)
+    cmds.setAttr('vraySettings.animType', 1)
+    cmds.setAttr('vraySettings.vrscene_on', 1)
+    cmds.setAttr('vraySettings.vrscene_render_on', 0)
+    for layer in layers:
+        cmds.editRenderLayerGlobals(currentRenderLayer=layer)
+        for camera in cameras:
+            name = re.sub(r'\W', '_', "{}_{}".format(layer, camera))
+            vrscene = os.path.join(export_dir, name + '.vrscene')
+            print("Exporting frames {}-{} of {} ({}) to {}".format(start, end, layer, camera, vrscene))
+            cmds.setAttr('vraySettings.vrscene_filename', vrscene, type='string')
+            mel.eval('vrend -camera "{}"'.format(camera))
+            if not os.path.isfile(vrscene):
+                raise Exception("V-Ray did not export {}".format(vrscene))
+
+
+def write_remap_file(path_map, remap_file):
+    """Write the dirmap rules of the job path map as a V-Ray path remapping
+    file, so that the asset paths of the exported scenes are resolved in the
+    same way as when rendering in Maya.
+
+    :param str path_map: The path of the job pre-render MEL script.
+    :returns: The number of remapped paths.
+    """
+    root = ET.Element('RemapPaths')
+    with open(path_map, 'r') as handle:
+        for line in handle:
+            rule = DIRMAP_RULE.match(line.strip())
+            if rule:
+                item = ET.SubElement(root, 'RemapItem')
+                ET.SubElement(item, 'From').text = re.sub(r'\\(.)', r'\1', rule.group(1))
+                ET.SubElement(item, 'To').text = re.sub(r'\\(.)', r'\1', rule.group(2))
+    ET.ElementTree(root).write(remap_file)
+    return len(root)
+
+
+def render_hosts():
+    """The addresses of the other nodes of a multi-instance task, which run
+    the render servers of a distributed render.
+    """
+    master = os.environ.get('AZ_BATCH_MASTER_NODE', '').split(':')[0]
+    return [h for h in os.environ.get('AZ_BATCH_HOST_LIST', '').split(',') if h and h != master]
+
+
+def vray_command(vray, vrscene, frames, image_dir, threads, remap_file=None, hosts=None, port=None):
+    """Build the command to render the frames of an exported scene with
+    V-Ray Standalone, with the images written to the images directory of
+    the task. If render server hosts are given, the frames are rendered with
+    distributed rendering, transferring any assets the servers can't find.
+    """
+    commands = [vray, '-sceneFile=' + vrscene, '-frames=' + ','.join(str(f) for f in frames),
+                '-display=0', '-autoClose=1', '-verboseLevel=3', '-numThreads=' + str(threads),
+                '-parameterOverride=SettingsOutput::img_dir=' + image_dir + os.sep]
+    if remap_file:
+        commands.append('-remapPathFile=' + remap_file)
+    if hosts:
+        commands.extend(['-distributed=1', '-renderhost=' + ';'.join(hosts),
+                         '-portNumber=' + str(port), '-transferAssets=1'])
+    return commands
+
+
+def run(commands):
+    """Run V-Ray, printing a frame marker for the task logs as it starts
+    rendering each frame.
+
+    :returns: The exit code of V-Ray.
+    """
+    process = subprocess.Popen(commands, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               universal_newlines=True)
+    for line in iter(process.stdout.readline, ''):
+        frame = VRAY_FRAME.search(line)
+        if frame:
+            print("{} {}".format(FRAME_MARKER, frame.group(1)))
+        sys.stdout.write(line)
+        sys.stdout.flush()
+    return process.wait()
+
+
+def render_scenes(container_url, prefix, frames, cwd, path_map):
+    """Download the exported scenes of the chunk of frames and render them
+    with V-Ray Standalone.
+
+    :returns: The number of scenes that failed to render.
+    """
+    vray_path = os.environ.get('VRAY_PATH', '')
+    vray = os.environ.get('VRAY') or find_executable('vray') or \
+        os.path.join(vray_path, 'bin', 'vray.exe' if os.name == 'nt' else 'vray')
+    threads = render_threads()
+    image_dir = os.path.join(cwd, 'images')
+    if not os.path.isdir(image_dir):
+        os.makedirs(image_dir)
+    hosts = render_hosts() if os.environ.get('DR_PORT') else None
+    if hosts:
+        print("Rendering with render servers: {}".format(", ".join(hosts)))
+    remap_file = None
+    if os.path.isfile(path_map):
+        remap_file = os.path.join(cwd, 'remap.xml')
+        print("Remapping {} asset paths".format(write_remap_file(path_map, remap_file)))
+    chunk_prefix = "{}{}/".format(prefix, frames[0])
+    blobs = list_blobs(container_url, chunk_prefix)
+    if not blobs:
+        raise Exception("No exported scenes found for frames {}-{}".format(frames[0], frames[-1]))
+    failures = 0
+    for blob in blobs:
+        vrscene = os.path.join(cwd, 'exports', str(frames[0]), blob[len(chunk_prefix):])
+        download_blob(container_url, blob, vrscene)
+        commands = vray_command(vray, vrscene, frames, image_dir, threads, remap_file,
+                                hosts, os.environ.get('DR_PORT'))
+        print("Running: {}".format(commands))
+        sys.stdout.flush()
+        exit_code = run(commands)
+        if exit_code != 0:
+            print("V-Ray exited with code {} rendering {}".format(exit_code, blob))
+            failures += 1
+    return failures
+
+
+if __name__ == '__main__':
+    exit_code = 0
+    try:
+        cwd = os.getcwd()
+        frames = task_frames()
+        if sys.argv[1] == 'export':
+            export_scenes(os.environ['SCENE_FILE'], os.environ['AZ_BATCH_JOB_PREP_WORKING_DIR'],
+                          frames, os.path.join(cwd, 'exports', str(frames[0])))
+        else:
+            path_map = os.path.join(os.environ['AZ_BATCH_JOB_PREP_WORKING_DIR'], 'scripts', 'renderPrep.mel')
+            failures = render_scenes(os.environ['EXPORT_URL'], os.environ['EXPORT_PREFIX'], frames, cwd, path_map)
+            if failures:
+                raise Exception("{} scenes failed to render.".format(failures))
+    except Exception as exp:
+        exc_type, exc_value, exc_traceback = sys.exc_info()
+        print("".join(traceback.format_exception(exc_type, exc_value, exc_traceback)))
+        exit_code = 1
+    finally:
+        print("Exiting with code: {}".format(exit_code))
+        sys.stdout.flush()
+        sys.exit(exit_code)
@@ -0,0 +1,168 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Convert textures to tiled, mip-mapped .tx files with maketx, caching the
+converted files by the hash of the texture contents so that each texture is
+only converted once, however many jobs or scenes it is used by.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+
+INDEX_FILE = 'index.json'
+CONVERTIBLE = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.exr', '.hdr', '.tga', '.bmp', '.psd')
+# Changing the conversion options invalidates the cached files.
+MAKETX_OPTIONS = ['-u', '--oiio', '--monochrome-detect', '--opaque-detect',
+                  '--constant-color-detect', '--filter', 'lanczos3']
+
+
+def can_convert(path):
+    """Whether the file is a texture that can be converted to a .tx file."""
+    return path.lower().endswith(CONVERTIBLE)
+
+
+def tx_name(path):
+    """The name of the .tx file of a texture, as looked up by Arnold next to
+    the texture when using existing tiled textures.
+    """
+    return os.path.splitext(os.path.basename(path))[0] + '.tx'
+
+
+def _file_hash(path):
+    digest = hashlib.sha1(' '.join(MAKETX_OPTIONS).encode('utf-8'))
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TxCache(object):
+    """The textures converted by previous jobs, stored as <hash>/<name>.tx in
+    the cache directory, so that the uploaded file has the name Arnold looks
+    for next to the texture. The hash of each texture is indexed by its path, size
+    and modification time, so unchanged textures aren't read again.
+    """
+
+    def __init__(self, cache_dir):
+        """Load the cache index.
+
+        :param str cache_dir: The directory of the converted files.
+        """
+        self._log = logging.getLogger('AzureBatchMaya')
+        self.cache_dir = cache_dir
+        self.index_file = os.path.join(cache_dir, INDEX_FILE)
+        try:
+            with open(self.index_file, 'r') as handle:
+                self.index = json.load(handle)
+        except (IOError, OSError, ValueError):
+            self.index = {}
+
+    def texture_hash(self, path):
+        """Get the hash of a texture, only reading the file if it has changed
+        since it was indexed.
+        """
+        stat = os.stat(path)
+        entry = self.index.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+            return entry[2]
+        digest = _file_hash(path)
+        self.index[path] = [stat.st_size, stat.st_mtime, digest]
+        return digest
+
+    def save(self):
+        """Write the cache index, only keeping the textures that still exist."""
+        self.index = {p: e for p, e in self.index.items() if os.path.isfile(p)}
+        with open(self.index_file, 'w') as handle:
+            json.dump(self.index, handle)
+
+    def _convert(self, maketx, path, tx_file):
+        """Convert a single texture, writing to a temporary file first so that
+        a failed conversion is never left in the cache.
+        """
+        try:
+            os.makedirs(os.path.dirname(tx_file))
+        except OSError:
+            # Created by the conversion of another texture with the same contents
+            if not os.path.isdir(os.path.dirname(tx_file)):
+                raise
+        temp_file = "{}.{}.tmp".format(tx_file, os.getpid())
+        command = [maketx] + MAKETX_OPTIONS + [path, '-o', temp_file]
+        try:
+            with open(os.devnull, 'w') as devnull:
+                exit_code = subprocess.call(command, stdout=devnull, stderr=subprocess.STDOUT)
+            if exit_code != 0 or not os.path.isfile(temp_file):
+                self._log.warning("Failed to convert {} to .tx: maketx exited with code {}".format(
+                    path, exit_code))
+                return False
+            if os.path.isfile(tx_file):
+                os.remove(tx_file)
+            os.rename(temp_file, tx_file)
+            return True
+        finally:
+            if os.path.isfile(temp_file):
+                os.remove(temp_file)
+
+    def convert(self, paths, maketx, workers=None):
+        """Convert the textures that haven't been converted before, running a
+        maketx process for each in parallel.
+
+        :param list paths: The paths of the textures.
+        :param str maketx: The path of the maketx executable.
+        :param int workers: The number of textures to convert at the same time,
+         by default the number of cores.
+        :returns: A dict of the texture paths to their converted .tx files.
+         Textures that failed to convert are left out, as are textures that
+         share the name of their .tx file with another texture in the same
+         directory, such as wood.jpg and wood.png, as Arnold would render
+         both with the one .tx file uploaded next to them.
+        """
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        textures = set(p for p in paths if can_convert(p) and os.path.isfile(p))
+        tx_paths = {}
+        for path in textures:
+            tx_path = os.path.normcase(os.path.join(os.path.dirname(path), tx_name(path)))
+            tx_paths.setdefault(tx_path, []).append(path)
+        for tx_path, clashing in tx_paths.items():
+            if len(clashing) > 1:
+                self._log.warning("Not converting {} to .tx, as they would share the file {}.".format(
+                    ', '.join(sorted(clashing)), tx_path))
+                textures.difference_update(clashing)
+        converted = {}
+        pending = {}
+        for path in textures:
+            tx_file = os.path.join(self.cache_dir, self.texture_hash(path), tx_name(path))
+            if os.path.isfile(tx_file):
+                converted[path] = tx_file
+            else:
+                pending.setdefault(tx_file, []).append(path)
+        self._log.info("Found {} textures converted by previous jobs, converting {}.".format(
+            len(converted), len(pending)))
+        if pending:
+            pool = ThreadPool(workers or _cpu_count())
+            try:
+                results = pool.map(lambda t: self._convert(maketx, pending[t][0], t), list(pending))
+            finally:
+                pool.close()
+            for tx_file, success in zip(list(pending), results):
+                if success:
+                    converted.update((p, tx_file) for p in pending[tx_file])
+        self.save()
+        return converted
+
+
+def _cpu_count():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
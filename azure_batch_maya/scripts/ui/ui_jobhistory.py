@@ -286,6 +286,8 @@ class AzureBatchJobInfo(object):
             value in ["active", "enabling"]))
         maya.icon_button(self.delete_button, edit=True, enable=(
             value=='completed'))
+        maya.button(self.rerun_button, edit=True, enable=(
+            value=='completed'))
 
     def get_status(self):
         """Get the status of the job."""
@@ -361,6 +363,11 @@ class AzureBatchJobInfo(object):
             "btn_cancel.png", self.cancel_job, "Cancel this job")
         self.delete_button = self.display_button(
             "btn_delete.png",self.delete_job, "Delete job")
+        self.rerun_button = maya.button(
+            label="Rerun failed frames", command=self.rerun_failed,
+            parent=self.job_details, enable=False,
+            annotation="Rerun the failed or missing frames of this job in a new job")
+        self.content.append(self.rerun_button)
         maya.form_layout(
             self.job_details, edit=True,
             attachForm=[(row,"top",5), (row,"left",5), (row,"right",5),
@@ -371,6 +378,7 @@ class AzureBatchJobInfo(object):
                         (jb_row,"left",5), (jb_row,"right",5),
                         (pl_row,"left",5), (pl_row,"right",5),
                         (dr_row,"left",5), (dr_row,"right",5),
+                        (self.rerun_button,"left",5), (self.rerun_button,"right",5),
                         (self.refresh_button,"left",5),
                         (self.delete_button,"right",5),
                         (self.refresh_button,"bottom",5),
@@ -385,11 +393,12 @@ class AzureBatchJobInfo(object):
                           (jb_row,"top",5, tk_row),
                           (pl_row,"top",5, jb_row),
                           (dr_row,"top",5, pl_row),
-                          (self.refresh_button,"top",5, dr_row),
-                          (self.view_button,"top",5, dr_row),
-                          (self.watch_button,"top",5, dr_row),
-                          (self.cancel_button,"top",5, dr_row),
-                          (self.delete_button, "top", 5, dr_row)],
+                          (self.rerun_button,"top",5, dr_row),
+                          (self.refresh_button,"top",5, self.rerun_button),
+                          (self.view_button,"top",5, self.rerun_button),
+                          (self.watch_button,"top",5, self.rerun_button),
+                          (self.cancel_button,"top",5, self.rerun_button),
+                          (self.delete_button, "top", 5, self.rerun_button)],
             attachPosition=[(self.refresh_button, 'right', 5, 20),
                             (self.view_button, 'left', 5, 20),
                             (self.view_button, 'right', 5, 40),
@@ -523,6 +532,11 @@ class AzureBatchJobInfo(object):
         """Cancel the specified job. Command for cancel_button."""
         self.base.cancel_job()
 
+    def rerun_failed(self, *args):
+        """Rerun the failed frames of the specified job. Command for rerun_button."""
+        self.base.rerun_failed()
+        self.base.ui.refresh()
+
     def delete_job(self, *args):
         """Cancel the specified job. Command for cancel_button."""
         self.base.delete_job()
@@ -70,6 +70,11 @@ class SubmissionUI(object):
             self.submit_button = utils.ProcButton(
                 "Submit Job", "Submitting...", self.submit)
 
+        with utils.Row(1, 1, 355, "center") as l_btn:
+            self.shots_button = utils.ProcButton(
+                "Submit Shot List...", "Submitting...", self.submit_shots,
+                annotation="Submit a job for each scene of a shot list file.")
+
         with utils.Row(1, 1, 355, "center", (1,"bottom",0)) as r_btn:
             self.refresh_button = utils.ProcButton(
                 "Refresh", "Refreshing...", self.refresh_btn_clicked)
@@ -80,11 +85,13 @@ class SubmissionUI(object):
                         (scroll, 'left', 5), (scroll, 'right', 5),
                         (watch, 'left', 0), (watch, 'right', 0),
                         (s_btn, 'left', 0), (s_btn, 'right', 0),
+                        (l_btn, 'left', 0), (l_btn, 'right', 0),
                         (r_btn, 'bottom', 5),
                         (r_btn, 'left', 0), (r_btn, 'right', 0)],
             attachControl=[(scroll, "bottom", 5, watch),
                            (watch, "bottom" ,5, s_btn),
-                           (s_btn, "bottom", 5, r_btn)])
+                           (s_btn, "bottom", 5, l_btn),
+                           (l_btn, "bottom", 5, r_btn)])
         frame.add_tab(self)
 
     def job_watcher_ui(self):
@@ -189,6 +196,30 @@ class SubmissionUI(object):
         self.submit_button.finish()
         self.refresh_button.enable(True)
 
+    def submit_shots(self, *args):
+        """Submit a job for each shot of a shot list. Command for shots_button."""
+        shot_file = maya.file_select(
+            fileMode=1, fileFilter="Shot lists (*.csv *.txt)",
+            okCaption="Submit", caption="Select a shot list to submit")
+        if not shot_file:
+            return
+        self.shots_button.start()
+        self.submit_button.start()
+        self.refresh_button.enable(False)
+        self.enable_watcher(False)
+        maya.check_box(self.watch_job, edit=True, enable=False)
+        watcher = maya.check_box(self.watch_job, query=True, value=True)
+        if watcher and not self.selected_dir:
+            maya.warning("You must select a download directory "
+                         "if you wish to watch these jobs.")
+        else:
+            self.base.submit_shots(shot_file[0], watcher, self.selected_dir)
+        maya.check_box(self.watch_job, edit=True, enable=True)
+        self.enable_watcher(True)
+        self.submit_button.finish()
+        self.shots_button.finish()
+        self.refresh_button.enable(True)
+
     def submit_enabled(self, enable):
         """Enable or disable users ability to submit a job based on renderer
         conditions.
@@ -197,6 +228,7 @@ class SubmissionUI(object):
         maya.check_box(self.watch_job, edit=True, enable=enable)
         maya.button(self.dir_button, edit=True, enable=False)
         maya.button(self.submit_button.display, edit=True, enable=enable)
+        maya.button(self.shots_button.display, edit=True, enable=enable)
 
     def get_pool(self):
         """Get selected pool configuration.
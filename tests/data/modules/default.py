@@ -29,5 +29,5 @@ class AzureBatchRenderJob(object):
 class AzureBatchRenderAssets(object):
     render_engine = "Renderer_Default"
 
-    def renderer_assets(self):
+    def renderer_assets(self, frames=None):
         return {}
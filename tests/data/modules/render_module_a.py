@@ -10,5 +10,5 @@ class AzureBatchModuleAJob(AzureBatchRenderJob):
 class AzureBatchAModuleAAssets(AzureBatchRenderAssets):
     render_engine = "Renderer_A"
 
-    def renderer_assets(self):
+    def renderer_assets(self, frames=None):
         return {}
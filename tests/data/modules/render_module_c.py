@@ -3,5 +3,5 @@ from default import AzureBatchRenderAssets
 class AzureBatchModuleCAssets(AzureBatchRenderAssets):
     render_engine = "Renderer_C"
 
-    def renderer_assets(self):
+    def renderer_assets(self, frames=None):
         return {}
\ No newline at end of file
@@ -0,0 +1,137 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import gzip
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import arnold_renderer
+from arnold_renderer import AssDependencyCache
+
+
+PROP = b"""### exported: Mon Jan 01 00:00:00 2018
+options
+{
+ AA_samples 3
+}
+
+image
+{
+ name wood
+ filename "/textures/wood.<udim>.tx"
+}
+
+procedural
+{
+ name nested
+ dso "nested.ass.gz"
+}
+"""
+
+NESTED = b"""polymesh
+{
+ name mesh
+ vlist 3 1 POINT b85
+"""  + b"a" * (256 * 1024) + b"""
+}
+
+MayaFile
+{
+ name leaf
+ filename "/textures/leaf.tx"
+}
+"""
+
+
+class TestArnoldAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.prop = os.path.join(self.temp_dir, 'prop.ass')
+        with open(self.prop, 'wb') as handle:
+            handle.write(PROP)
+        with gzip.open(os.path.join(self.temp_dir, 'nested.ass.gz'), 'wb') as handle:
+            handle.write(NESTED)
+        return super(TestArnoldAssets, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestArnoldAssets, self).tearDown()
+
+    def test_arnold_parse_ass(self):
+        self.assertEqual(arnold_renderer.parse_ass(self.prop),
+                         ["/textures/wood.<udim>.tx", "nested.ass.gz"])
+        self.assertEqual(arnold_renderer.parse_ass(os.path.join(self.temp_dir, 'nested.ass.gz')),
+                         ["/textures/leaf.tx"])
+
+    def test_arnold_scan_ass_files(self):
+        cache_file = os.path.join(self.temp_dir, 'cache.json')
+        cache = AssDependencyCache(cache_file)
+        found = arnold_renderer.scan_ass_files([self.prop, self.prop], cache)
+        self.assertEqual(found, ["/textures/wood.<udim>.tx",
+                                 os.path.join(self.temp_dir, 'nested.ass.gz'),
+                                 "/textures/leaf.tx"])
+        cache.save()
+
+        with mock.patch("arnold_renderer.parse_ass") as mock_parse:
+            cache = AssDependencyCache(cache_file)
+            found_again = arnold_renderer.scan_ass_files([self.prop], cache)
+            self.assertEqual(found_again, found)
+            mock_parse.assert_not_called()
+
+            # Touching the file re-hashes it, but the contents are unchanged
+            os.utime(self.prop, (0, 0))
+            with mock.patch("arnold_renderer._file_hash", wraps=arnold_renderer._file_hash) as mock_hash:
+                arnold_renderer.scan_ass_files([self.prop], cache)
+                mock_hash.assert_called_once_with(self.prop)
+            mock_parse.assert_not_called()
+
+        self.assertEqual(arnold_renderer.scan_ass_files([os.path.join(self.temp_dir, 'missing.ass')], cache), [])
+
+    def test_arnold_expand_frames(self):
+        for frame in [9, 10, 11]:
+            with open(os.path.join(self.temp_dir, 'prop.{:04d}.ass'.format(frame)), 'w'):
+                pass
+        path = os.path.join(self.temp_dir, 'prop.####.ass')
+        self.assertEqual(arnold_renderer.expand_frames(path, [1, 2, 10, 12]),
+                         [os.path.join(self.temp_dir, 'prop.0010.ass')])
+        self.assertEqual(arnold_renderer.expand_frames(path, [1, 2], offset=8),
+                         [os.path.join(self.temp_dir, 'prop.0009.ass'),
+                          os.path.join(self.temp_dir, 'prop.0010.ass')])
+
+    @mock.patch("arnold_renderer.mel")
+    @mock.patch("arnold_renderer.cmds")
+    def test_arnold_renderer_assets_frames(self, mock_cmds, mock_mel):
+        for frame in range(1, 21):
+            with open(os.path.join(self.temp_dir, 'prop.{:04d}.ass'.format(frame)), 'w'):
+                pass
+        attributes = {
+            'standin.dso': os.path.join(self.temp_dir, 'prop.####.ass'),
+            'standin.useFrameExtension': True,
+            'standin.frameOffset': 0}
+        render_globals = {
+            'getAttr defaultRenderGlobals.animation': True,
+            'getAttr defaultRenderGlobals.startFrame': 1,
+            'getAttr defaultRenderGlobals.endFrame': 3,
+            'getAttr defaultRenderGlobals.byFrameStep': 1}
+        mock_cmds.ls.side_effect = lambda type: ['standin'] if type == 'aiStandIn' else []
+        mock_cmds.getAttr.side_effect = lambda attr: attributes[attr]
+        mock_cmds.internalVar.return_value = self.temp_dir
+        mock_mel.eval.side_effect = lambda cmd: render_globals[cmd]
+        renderer = arnold_renderer.ArnoldRenderAssets()
+
+        self.assertEqual(renderer.renderer_assets(),
+                         [os.path.join(self.temp_dir, 'prop.{:04d}.ass'.format(f)) for f in [1, 2, 3]])
+        self.assertEqual(renderer.renderer_assets([10, 15, 20]),
+                         [os.path.join(self.temp_dir, 'prop.{:04d}.ass'.format(f)) for f in [10, 15, 20]])
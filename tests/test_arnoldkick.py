@@ -0,0 +1,96 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import sys
+import shutil
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+top_dir = os.path.dirname(CWD)
+tools_dir = os.path.join(top_dir, 'azure_batch_maya', 'scripts', 'tools')
+sys.path.append(tools_dir)
+
+import arnold_kick
+
+
+FRAME = """### exported: Mon Jan 01 00:00:00 2018
+options
+{
+ AA_samples 3
+ outputs "RGBA RGBA defaultArnoldFilter@gaussian_filter defaultArnoldDriver@driver_exr.RGBA"
+}
+
+driver_exr
+{
+ name defaultArnoldDriver@driver_exr.RGBA
+ filename "X:/project/images/beauty/shot.0001.exr"
+}
+
+image
+{
+ name wood
+ filename "/textures/wood.tx"
+}
+"""
+
+
+class TestArnoldKick(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ass_file = os.path.join(self.temp_dir, 'masterLayer_camera.ass')
+        with open(self.ass_file, 'w') as handle:
+            handle.write(FRAME)
+        return super(TestArnoldKick, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestArnoldKick, self).tearDown()
+
+    def test_arnoldkick_ass_drivers(self):
+        self.assertEqual(arnold_kick.ass_drivers(self.ass_file),
+                         [("defaultArnoldDriver@driver_exr.RGBA", "X:/project/images/beauty/shot.0001.exr")])
+
+    def test_arnoldkick_image_path(self):
+        self.assertEqual(arnold_kick.image_path("X:\\project\\images\\beauty\\shot.0001.exr"), "beauty/shot.0001.exr")
+        self.assertEqual(arnold_kick.image_path("/tmp/shot.0001.exr"), "shot.0001.exr")
+
+    def test_arnoldkick_kick_command(self):
+        image_dir = os.path.join(self.temp_dir, 'images')
+        commands = arnold_kick.kick_command("kick", self.ass_file, image_dir, 4, 2, "/mtoa/shaders")
+        self.assertEqual(commands[:10], ["kick", "-i", self.ass_file, "-dw", "-dp", "-nstdin", "-t", "4", "-v", "2"])
+        self.assertEqual(commands[10:], ["-l", "/mtoa/shaders", "-set", "defaultArnoldDriver@driver_exr.RGBA.filename",
+                                         os.path.join(image_dir, "beauty/shot.0001.exr")])
+        self.assertTrue(os.path.isdir(os.path.join(image_dir, 'beauty')))
+
+    @mock.patch("arnold_kick.subprocess")
+    @mock.patch("arnold_kick.download_blob")
+    @mock.patch("arnold_kick.list_blobs")
+    def test_arnoldkick_render_frames(self, mock_list, mock_download, mock_subprocess):
+        mock_list.side_effect = lambda url, prefix: [prefix + "masterLayer_camera.ass"] if prefix != "exports/3/" else []
+        mock_download.side_effect = lambda url, blob, path: shutil.copy(self.ass_file, path)
+        mock_subprocess.call.return_value = 0
+        with mock.patch.dict(os.environ, {'KICK': "kick", 'MTOA_PATH': self.temp_dir, 'LOG_LEVEL': "2"}):
+            os.makedirs(os.path.join(self.temp_dir, 'exports', '1'))
+            os.makedirs(os.path.join(self.temp_dir, 'exports', '2'))
+            failures = arnold_kick.render_frames("https://outputs?sas", "exports/", [1, 2, 3], self.temp_dir)
+        self.assertEqual(failures, 1)
+        mock_download.assert_called_with("https://outputs?sas", "exports/2/masterLayer_camera.ass",
+                                         os.path.join(self.temp_dir, 'exports', '2', 'masterLayer_camera.ass'))
+        self.assertEqual(mock_subprocess.call.call_count, 2)
+        self.assertEqual(mock_subprocess.call.call_args[0][0][-1],
+                         os.path.join(self.temp_dir, 'images', 'beauty/shot.0001.exr'))
+        self.assertIn("5", mock_subprocess.call.call_args[0][0])
@@ -7,6 +7,8 @@ import sys
 import os
 import logging
 import json
+import heapq
+import random
 from Queue import Queue
 
 # win32-specific imports
@@ -31,7 +33,8 @@ else:
 from azure import batch_extensions
 
 from ui_assets import AssetsUI
-from assets import Asset, Assets, AzureBatchAssets
+from assets import Asset, Assets, AzureBatchAssets, schedule_uploads, compile_path_map
+from azurebatchutils import OperatingSystem
 from exception import FileUploadException
 from azurebatchutils import ProgressBar, ProcButton
 
@@ -283,12 +286,14 @@ class TestAssets(unittest.TestCase):
         self.mock_self._get_textures.return_value = ['a']
         self.mock_self._get_caches.return_value = ['b']
         self.mock_self._get_references.return_value = ['c']
+        self.mock_self._get_unloaded_references.return_value = ['d']
 
         Assets.gather(self.mock_self)
-        self.assertEqual(self.mock_self.refs, ['a', 'b', 'c'])
+        self.assertEqual(self.mock_self.refs, ['a', 'b', 'c', 'd'])
         self.assertEqual(self.mock_self._get_textures.call_count, 1)
         self.assertEqual(self.mock_self._get_caches.call_count, 1)
         self.assertEqual(self.mock_self._get_references.call_count, 1)
+        self.assertEqual(self.mock_self._get_unloaded_references.call_count, 1)
 
     @mock.patch("assets.Asset")
     def test_assets_extend(self, mock_asset):
@@ -326,6 +331,31 @@ class TestAssets(unittest.TestCase):
         files = Assets.collect(self.mock_self)
         self.assertEqual(files, [])
 
+    @mock.patch("assets.Asset")
+    def test_assets_collect_renderer_assets(self, mock_asset):
+        texture = mock.create_autospec(Asset)
+        texture.included.return_value = True
+        texture.path = "/textures/wood.tx"
+        standin = mock.create_autospec(Asset)
+        standin.included.return_value = True
+        excluded = mock.create_autospec(Asset)
+        excluded.included.return_value = False
+        excluded.path = "/standins/rock.ass"
+        self.mock_self.refs = [texture, standin, excluded]
+        self.mock_self.renderer_refs = [standin, excluded]
+        self.mock_self._search_path.side_effect = lambda path: [path]
+
+        def create_asset(path, *args):
+            asset = mock.create_autospec(Asset)
+            asset.path = path
+            asset.exists = True
+            asset.is_duplicate.side_effect = lambda files: path in [f.path for f in files]
+            return asset
+
+        mock_asset.side_effect = create_asset
+        files = Assets.collect(self.mock_self, ["/standins/prop.0010.ass", "/standins/rock.ass"])
+        self.assertEqual([f.path for f in files], ["/textures/wood.tx", "/standins/prop.0010.ass"])
+
     @mock.patch("assets.Asset")
     @mock.patch("assets.maya")
     def test_assets_get_textures(self, mock_maya, mock_asset):
@@ -378,6 +408,28 @@ class TestAssets(unittest.TestCase):
         refs = Assets._get_references(self.mock_self)
         self.assertEqual(refs, [mock.ANY])
 
+    @mock.patch("assets.Asset")
+    @mock.patch("assets.maya")
+    @mock.patch("assets.scenescan")
+    def test_assets_get_unloaded_references(self, mock_scan, mock_maya, mock_asset):
+        mock_asset.return_value = mock.create_autospec(Asset)
+        mock_asset.return_value.is_duplicate.return_value = False
+        mock_maya.get_list.return_value = ["1", "2"]
+        mock_maya.reference.side_effect = lambda r, **kwargs: \
+            (r == "1") if kwargs.get('isLoaded') else "c:\\ref{}.ma".format(r)
+        mock_scan.can_scan.return_value = True
+        mock_scan.scan_scene.return_value = {'textures': ['a'], 'caches': ['b'], 'references': []}
+        self.mock_self._search_path.side_effect = lambda p: [p]
+
+        refs = Assets._get_unloaded_references(self.mock_self)
+        mock_scan.scan_scene.assert_called_once_with("c:\\ref2.ma", mock.ANY)
+        self.assertEqual(refs, [mock.ANY, mock.ANY])
+        mock_asset.assert_called_with("b", mock.ANY, self.mock_self.batch, self.mock_self._log)
+
+        mock_scan.scan_scene.side_effect = IOError("Not found")
+        refs = Assets._get_unloaded_references(self.mock_self)
+        self.assertEqual(refs, [])
+
     @mock.patch("assets.Asset")
     @mock.patch("assets.maya")
     @mock.patch("assets.glob")
@@ -412,6 +464,128 @@ class TestAssets(unittest.TestCase):
         mock_asset.return_value.display.assert_called_with("ui", "layout", "scroll")
 
 
+class TestUploadScheduling(unittest.TestCase):
+
+    def setUp(self):
+        self.threads = 8
+        return super(TestUploadScheduling, self).setUp()
+
+    def _asset(self, name, size):
+        return mock.Mock(path=name, size=float(size))
+
+    def _scene_assets(self, seed):
+        """A realistic scene: hundreds of small textures, a handful of medium
+        reference files and one or two large caches that are discovered last.
+        Sizes are in MB.
+        """
+        rand = random.Random(seed)
+        assets = [self._asset("tex_{}".format(i), rand.lognormvariate(1.5, 1.0)) for i in range(300)]
+        assets.extend([self._asset("ref_{}".format(i), rand.uniform(50, 400)) for i in range(12)])
+        assets.extend([self._asset("cache_{}".format(i), rand.uniform(4000, 12000)) for i in range(2)])
+        return assets
+
+    def _simulate_batched(self, assets):
+        """The previous behaviour: fixed batches in discovery order, where each
+        batch has to complete before the next one starts.
+        """
+        makespan = 0.0
+        for i in range(0, len(assets), self.threads):
+            makespan += max(a.size for a in assets[i:i + self.threads])
+        return makespan
+
+    def _simulate_scheduled(self, reserved, bulk):
+        """Simulate the worker pool: lane 0 works through the reserved lane first,
+        then every lane pulls the next bulk asset as soon as it's free.
+        Each upload stream runs at a constant rate of 1 MB per time unit.
+        Returns the makespan and the completion times for each asset.
+        """
+        finished = {}
+        lane_zero = 0.0
+        for asset in reserved:
+            lane_zero += asset.size
+            finished[asset.path] = lane_zero
+        lanes = [(lane_zero, 0)] + [(0.0, i) for i in range(1, self.threads)]
+        heapq.heapify(lanes)
+        for asset in bulk:
+            free_at, lane = heapq.heappop(lanes)
+            finished[asset.path] = free_at + asset.size
+            heapq.heappush(lanes, (finished[asset.path], lane))
+        return max(finished.values()), finished
+
+    def test_schedule_uploads_policies(self):
+        scene = self._asset("scene.mb", 20)
+        assets = [self._asset("a", 1), scene, self._asset("b", 30), self._asset("c", 5)]
+        reserved, bulk = schedule_uploads(assets, [scene])
+        self.assertEqual(reserved, [scene])
+        self.assertEqual([a.path for a in bulk], ["b", "c", "a"])
+
+        reserved, bulk = schedule_uploads(assets, policy='discovery')
+        self.assertEqual(reserved, [])
+        self.assertEqual([a.path for a in bulk], ["a", "scene.mb", "b", "c"])
+
+        with self.assertRaises(ValueError):
+            schedule_uploads(assets, policy='smallest_first')
+
+    def test_schedule_uploads_makespan(self):
+        for seed in range(5):
+            assets = self._scene_assets(seed)
+            critical = [self._asset("scene.mb", 80), self._asset("asset_map.mel", 0.01)]
+            assets.extend(critical)
+
+            baseline = self._simulate_batched(assets)
+            reserved, bulk = schedule_uploads(assets, critical)
+            makespan, finished = self._simulate_scheduled(reserved, bulk)
+
+            # The makespan can never beat the largest file or a perfect split of the
+            # total data, and LPT is guaranteed to be within 4/3 of the optimum.
+            lower_bound = max(max(a.size for a in assets), sum(a.size for a in assets) / self.threads)
+            self.assertLessEqual(makespan, lower_bound * 4.0 / 3.0)
+            self.assertLess(makespan, baseline)
+
+            # Critical files are complete before any bulk upload could have delayed them.
+            self.assertEqual(finished["scene.mb"], 80)
+            self.assertAlmostEqual(finished["asset_map.mel"], 80.01)
+
+
+class TestPathMapCompiler(unittest.TestCase):
+
+    @staticmethod
+    def _remote(path):
+        parts = [p for p in path.replace(':', '').replace('\\', '/').split('/') if p]
+        return lambda os_flavor: '/'.join(parts)
+
+    def _pathmap(self, *paths):
+        return {p: self._remote(p) for p in paths}
+
+    def test_compile_path_map_drops_implied(self):
+        pathmap = self._pathmap("/proj/tex", "/proj/tex/wood", "/proj/tex/wood/old")
+        rules = compile_path_map(pathmap, OperatingSystem.linux)
+        self.assertEqual(rules, [("/proj/tex", "proj/tex")])
+
+    def test_compile_path_map_collapses_siblings(self):
+        pathmap = self._pathmap("/proj/tex/wood", "/proj/tex/metal", "/proj/cache/a", "/proj/cache/b")
+        rules = compile_path_map(pathmap, OperatingSystem.linux)
+        self.assertEqual(rules, [("/proj/cache", "proj/cache"), ("/proj/tex", "proj/tex")])
+
+        # Never collapse above the minimum depth
+        pathmap = self._pathmap("/a/b", "/a/c")
+        rules = compile_path_map(pathmap, OperatingSystem.linux)
+        self.assertEqual(rules, [("/a/b", "a/b"), ("/a/c", "a/c")])
+
+    def test_compile_path_map_keeps_inconsistent(self):
+        pathmap = self._pathmap("/proj/tex/wood", "/proj/tex/metal")
+        pathmap["/proj/tex/a/very/long/path"] = lambda os_flavor: "proj/short"
+        rules = compile_path_map(pathmap, OperatingSystem.linux)
+        self.assertEqual(rules, [("/proj/tex/a/very/long/path", "proj/short"),
+                                 ("/proj/tex/metal", "proj/tex/metal"),
+                                 ("/proj/tex/wood", "proj/tex/wood")])
+
+    def test_compile_path_map_windows(self):
+        pathmap = self._pathmap("C:\\proj\\tex\\wood", "C:\\proj\\tex\\metal")
+        rules = compile_path_map(pathmap, OperatingSystem.windows)
+        self.assertEqual(rules, [("C:\\proj\\tex", "C\\\\proj\\\\tex")])
+
+
 class TestAzureBatchAssets(unittest.TestCase):
 
     def setUp(self):
@@ -495,7 +669,7 @@ class TestAzureBatchAssets(unittest.TestCase):
         AzureBatchAssets.set_assets(self.mock_self)
         self.mock_self._configure_renderer.assert_called_with()
         self.mock_self._assets.gather.assert_called_with()
-        self.mock_self._assets.extend.assert_called_with(mock.ANY)
+        self.mock_self._assets.extend.assert_called_with(mock.ANY, renderer=True)
 
     def test_batchassets_get_assets(self):
         self.mock_self._assets = mock.create_autospec(Assets)
@@ -0,0 +1,163 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import io
+import json
+import logging
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import headless
+from headless import HeadlessFrame, HeadlessSubmissionUI, JsonOutput, JsonProgress
+from default import AzureBatchRenderJob
+from config import AzureBatchConfig
+from ui_submission import SubmissionUI
+
+
+class TestHeadless(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, 'scenes'))
+        for name in ['sh010.ma', 'sh020.mb']:
+            with open(os.path.join(self.temp_dir, 'scenes', name), 'w'):
+                pass
+        return super(TestHeadless, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestHeadless, self).tearDown()
+
+    def write_config(self, job_settings):
+        config_file = os.path.join(self.temp_dir, 'jobs.json')
+        with open(config_file, 'w') as handle:
+            json.dump(job_settings, handle)
+        return config_file
+
+    def test_headless_load_job_settings(self):
+        job_settings, shots = headless.load_job_settings(self.write_config(
+            {'scenes': ['scenes/sh010.ma',
+                        {'scene': 'scenes/sh020.mb', 'frames': '1-10', 'overrides': {'logLevel': 2}}]}))
+        self.assertEqual(len(shots), 2)
+        self.assertEqual(shots[0], {'scene': os.path.join(self.temp_dir, 'scenes', 'sh010.ma'),
+                                    'frames': None, 'overrides': {}})
+        self.assertEqual(shots[1]['frames'], '1-10')
+        self.assertEqual(shots[1]['overrides'], {'logLevel': 2})
+
+        with self.assertRaises(ValueError):
+            headless.load_job_settings(self.write_config({'scenes': ['scenes/sh030.ma']}))
+        with self.assertRaises(ValueError):
+            headless.load_job_settings(self.write_config({'scenes': [{'scene': 'scenes/sh010.ma', 'frames': '1-x'}]}))
+        with self.assertRaises(ValueError):
+            headless.load_job_settings(self.write_config({'scenes': []}))
+        with self.assertRaises(ValueError):
+            headless.load_job_settings(self.write_config(['scenes/sh010.ma']))
+
+    def test_headless_output(self):
+        stream = io.StringIO()
+        output = JsonOutput(stream)
+        progress = JsonProgress(output)
+        progress.max(2)
+        progress.status("Uploading")
+        progress.step()
+        progress.end()
+        events = [json.loads(l) for l in stream.getvalue().splitlines()]
+        self.assertEqual(events, [
+            {'event': 'progress', 'status': 'Uploading', 'value': 0, 'max': 2},
+            {'event': 'progress', 'status': 'Uploading', 'value': 1, 'max': 2}])
+        self.assertTrue(progress.done)
+
+    def test_headless_log_file(self):
+        logger = logging.getLogger('AzureBatchMaya')
+        handlers = logger.handlers[:]
+        logger.handlers = [headless.JsonLogHandler(JsonOutput(io.StringIO()))]
+        mock_config = mock.create_autospec(AzureBatchConfig)
+        mock_config._data_dir = self.temp_dir
+        try:
+            AzureBatchConfig._configure_logging(mock_config, logging.INFO)
+            AzureBatchConfig._configure_logging(mock_config, logging.INFO)
+            file_handlers = [h for h in logger.handlers if isinstance(h, logging.FileHandler)]
+            self.assertEqual(len(file_handlers), 1)
+            self.assertEqual(len(logger.handlers), 2)
+            file_handlers[0].close()
+        finally:
+            logger.handlers = handlers
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, "azure_batch.log")))
+
+    def test_headless_get_pool(self):
+        mock_base = mock.Mock()
+        ui = HeadlessSubmissionUI(mock_base, HeadlessFrame({}))
+        self.assertEqual(ui.get_pool(), {SubmissionUI.AUTO_POOL: (1, 0)})
+
+        ui = HeadlessSubmissionUI(mock_base, HeadlessFrame(
+            {'pool': {'type': 'new', 'dedicated': 2, 'lowPriority': 3}}))
+        self.assertEqual(ui.get_pool(), {SubmissionUI.NEW_POOL: (2, 3)})
+
+        ui = HeadlessSubmissionUI(mock_base, HeadlessFrame(
+            {'pool': {'type': 'existing', 'id': 'pool1', 'containerImage': 'image'}}))
+        self.assertEqual(ui.get_pool(), {SubmissionUI.EXISTING_POOL: 'pool1'})
+        self.assertEqual(ui.get_task_container_image(), 'image')
+
+        with self.assertRaises(ValueError):
+            HeadlessSubmissionUI(mock_base, HeadlessFrame({'pool': {'type': 'existing'}}))
+        with self.assertRaises(ValueError):
+            HeadlessSubmissionUI(mock_base, HeadlessFrame({'pool': {'type': 'other'}}))
+
+    def test_headless_renderer(self):
+        class TestRenderJob(AzureBatchRenderJob):
+            def settings(self):
+                self.frames = self.display_string("Frames:   ", "")
+                self.packing = self.display_int("Tasks per node:   ", 1)
+                self.dispatch = self.display_menu("Dispatch:   ", ["Tasks"], 1)
+
+        renderer = headless.headless_renderer(TestRenderJob(), {
+            'frames': '1-10', 'framesPerTask': 2, 'tasksPerNode': 4,
+            'dispatch': 'queue', 'taskOrder': 'progressive', 'tiles': [2, 2], 'reuseCache': True})
+        self.assertIsInstance(renderer, TestRenderJob)
+        renderer.display(None)
+        self.assertEqual(renderer.get_frame_expression(), '1-10')
+        self.assertEqual(renderer.get_frames_per_task(), 2)
+        self.assertEqual(renderer.get_tasks_per_node(), 4)
+        self.assertEqual(renderer.get_dispatch(), 'queue')
+        self.assertEqual(renderer.get_task_split(), 'frame')
+        # Settings the module doesn't display are left at their defaults
+        self.assertEqual(renderer.get_task_order(), 'sequential')
+        self.assertEqual(renderer.get_tiles(), (1, 1))
+        self.assertFalse(renderer.get_use_cache())
+
+        renderer = headless.headless_renderer(TestRenderJob(), {'dispatch': 'other'})
+        renderer.display(None)
+        with self.assertRaises(ValueError):
+            renderer.get_dispatch()
+
+    @mock.patch("headless.HeadlessSettings")
+    @mock.patch("headless.sys")
+    def test_headless_main(self, mock_sys, mock_settings):
+        mock_sys.stdout = io.StringIO()
+        config_file = self.write_config({'name': 'seq', 'scenes': ['scenes/sh010.ma', 'scenes/sh020.mb']})
+        mock_job = mock.Mock(id='job1', display_name='sh010')
+        mock_settings.return_value.submission.submit_batch.return_value = (
+            [mock_job], [('sh020.mb', 'Failed')])
+        self.assertEqual(headless.main([config_file]), headless.EXIT_SUBMIT_FAILED)
+        self.assertEqual(mock_settings.return_value.submission.submit_batch.call_args[0][1], 'seq')
+        events = [json.loads(l) for l in mock_sys.stdout.getvalue().splitlines()]
+        self.assertIn({'event': 'job', 'id': 'job1', 'name': 'sh010'}, events)
+        self.assertEqual(events[-1], {'event': 'result', 'submitted': ['job1'], 'failed': ['sh020.mb']})
+
+        mock_settings.return_value.submission.submit_batch.return_value = ([mock_job], [])
+        self.assertEqual(headless.main([config_file]), headless.EXIT_SUCCESS)
+
+        mock_settings.side_effect = ValueError("Not signed in")
+        self.assertEqual(headless.main([config_file]), headless.EXIT_INVALID_CONFIG)
+        self.assertEqual(headless.main([]), headless.EXIT_INVALID_CONFIG)
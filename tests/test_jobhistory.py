@@ -0,0 +1,84 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import logging
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from jobhistory import AzureBatchJobHistory
+from azure.batch_extensions import models
+from azure.storage.blob import BlockBlobService
+
+
+STORAGE = "https://account.blob.core.windows.net/"
+
+
+class TestJobHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_self = mock.create_autospec(AzureBatchJobHistory)
+        self.mock_self._log = logging.getLogger("TestJobHistory")
+        self.mock_self.storage = mock.create_autospec(BlockBlobService)
+        self.mock_self.storage.generate_container_shared_access_signature.return_value = "sig=container"
+        self.mock_self.storage.generate_blob_shared_access_signature.return_value = "sig=blob"
+        self.mock_self._renew_sas.side_effect = lambda *args: AzureBatchJobHistory._renew_sas(
+            self.mock_self, *args)
+        self.mock_self._renew_urls.side_effect = lambda *args: AzureBatchJobHistory._renew_urls(
+            self.mock_self, *args)
+        return super(TestJobHistory, self).setUp()
+
+    def test_jobhistory_renew_urls(self):
+        command = "azcopy --source \\\"" + STORAGE + "fgrp-files?sp=rl&sig=old\\\" --recursive"
+        self.assertEqual(AzureBatchJobHistory._renew_urls(self.mock_self, command),
+                         "azcopy --source \\\"" + STORAGE + "fgrp-files?sig=container\\\" --recursive")
+        self.mock_self.storage.generate_container_shared_access_signature.assert_called_with(
+            "fgrp-files", permission="rl", start=mock.ANY, expiry=mock.ANY)
+        self.assertEqual(AzureBatchJobHistory._renew_urls(self.mock_self, STORAGE + "fgrp-files"),
+                         STORAGE + "fgrp-files")
+        self.assertIsNone(AzureBatchJobHistory._renew_urls(self.mock_self, None))
+
+    def test_jobhistory_rerun_task(self):
+        task = models.CloudTask(
+            id="2", display_name="Frame 2",
+            command_line="maya2018.sh -s 2 -e 2;python /mnt/resource/batch/tasks/workitems/job/"
+                         "job-1/jobpreparation/wd/thumbnail.py $err 2 2 1",
+            environment_settings=[
+                models.EnvironmentSetting(
+                    name="MAYA_SCRIPT_PATH",
+                    value="/mnt/resource/batch/tasks/workitems/job/job-1/jobpreparation/wd/scripts"),
+                models.EnvironmentSetting(name="QUEUE_URL", value=STORAGE + "fgrp-job?sp=rwdl&sig=old"),
+                models.EnvironmentSetting(name="LANG", value="en_US.iso88591")],
+            resource_files=[models.ResourceFile(
+                blob_source=STORAGE + "fgrp-files/tools/merge%20tiles.py?sp=r&sig=old", file_path="merge.py")],
+            output_files=[models.OutputFile(
+                file_pattern="images/**/*",
+                destination=models.OutputFileDestination(container=models.OutputFileBlobContainerDestination(
+                    container_url=STORAGE + "fgrp-job?sp=w&sig=old")),
+                upload_options=models.OutputFileUploadOptions(upload_condition="taskSuccess"))],
+            depends_on=models.TaskDependencies(task_ids=["1", "3"]))
+        rerun = AzureBatchJobHistory._rerun_task(self.mock_self, task, "job", "rerun", {"2", "3"})
+        self.assertEqual(rerun.id, "2")
+        self.assertEqual(rerun.command_line, "maya2018.sh -s 2 -e 2;python /mnt/resource/batch/tasks/"
+                                             "workitems/rerun/job-1/jobpreparation/wd/thumbnail.py $err 2 2 1")
+        self.assertEqual([(e.name, e.value) for e in rerun.environment_settings], [
+            ("MAYA_SCRIPT_PATH", "/mnt/resource/batch/tasks/workitems/rerun/job-1/jobpreparation/wd/scripts"),
+            ("QUEUE_URL", STORAGE + "fgrp-job?sig=container"),
+            ("LANG", "en_US.iso88591")])
+        self.assertEqual(rerun.resource_files[0].blob_source, STORAGE + "fgrp-files/tools/merge%20tiles.py?sig=blob")
+        self.mock_self.storage.generate_blob_shared_access_signature.assert_called_with(
+            "fgrp-files", "tools/merge tiles.py", permission="r", start=mock.ANY, expiry=mock.ANY)
+        self.assertEqual(rerun.output_files[0].destination.container.container_url,
+                         STORAGE + "fgrp-job?sig=container")
+        self.mock_self.storage.generate_container_shared_access_signature.assert_called_with(
+            "fgrp-job", permission="w", start=mock.ANY, expiry=mock.ANY)
+        self.assertEqual(rerun.depends_on.task_ids, ["3"])
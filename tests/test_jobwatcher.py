@@ -15,6 +15,9 @@ except ImportError:
 
 import os
 import sys
+import shutil
+import tempfile
+import datetime
 from collections import namedtuple
 from azure.batch_extensions import models
 
@@ -61,10 +64,105 @@ class TestJobWatcher(unittest.TestCase):
         client._track_completed_outputs("container", "\\test_dir")
 
         self.assertEqual(mock_batchClient.file.download.call_count, 4)
-        mock_batchClient.file.download.assert_any_call('\\test_dir', 'container', remote_path='job_output.exr')
-        mock_batchClient.file.download.assert_any_call('\\test_dir', 'container', remote_path='subdir/job_output.png')
-        mock_batchClient.file.download.assert_any_call('\\test_dir', 'container', remote_path='logs/frame_0.log')
-        mock_batchClient.file.download.assert_any_call('\\test_dir', 'container', remote_path='logs/frame_0_error.log')
+        mock_batchClient.file.download.assert_any_call('\\test_dir', 'container', remote_path='job_output.exr', overwrite=True)
+        mock_batchClient.file.download.assert_any_call('\\test_dir', 'container', remote_path='subdir/job_output.png', overwrite=True)
+        mock_batchClient.file.download.assert_any_call('\\test_dir', 'container', remote_path='logs/frame_0.log', overwrite=True)
+        mock_batchClient.file.download.assert_any_call('\\test_dir', 'container', remote_path='logs/frame_0_error.log', overwrite=True)
+
+    @mock.patch.object(client, 'batch_client')
+    def test_watcher_track_completed_outputs_incremental(self, mock_batchClient):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        with open(os.path.join(temp_dir, "frame_1.exr"), 'w') as handle:
+            handle.write("1")
+        outputs = [
+            {'name': "frame_1.exr", 'size': 1, 'uploaded': "2018-01-01"},
+            {'name': "frame_2.exr", 'size': 2, 'uploaded': "2018-01-01"},
+            {'name': "tiles/frame_2_0.exr", 'size': 2, 'uploaded': "2018-01-01"},
+            {'name': "exports/2/beauty.ass", 'size': 2, 'uploaded': "2018-01-01"}]
+        mock_batchClient.file.list_from_group.side_effect = lambda group: iter(outputs)
+
+        downloaded = client._track_completed_outputs("container", temp_dir)
+        mock_batchClient.file.download.assert_called_once_with(
+            temp_dir, 'container', remote_path='frame_2.exr', overwrite=True)
+        self.assertEqual(sorted(downloaded), ["frame_1.exr", "frame_2.exr"])
+
+        mock_batchClient.file.download.reset_mock()
+        outputs.append({'name': "frame_3.exr", 'size': 3, 'uploaded': "2018-01-01"})
+        outputs[1] = {'name': "frame_2.exr", 'size': 4, 'uploaded': "2018-01-02"}
+        self.assertEqual(client._load_downloaded("container", temp_dir), downloaded)
+        client._track_completed_outputs("container", temp_dir)
+        self.assertEqual(mock_batchClient.file.download.call_count, 2)
+        mock_batchClient.file.download.assert_any_call(
+            temp_dir, 'container', remote_path='frame_2.exr', overwrite=True)
+        mock_batchClient.file.download.assert_any_call(
+            temp_dir, 'container', remote_path='frame_3.exr', overwrite=True)
+
+        mock_batchClient.file.download.reset_mock()
+        client._track_completed_outputs("container", temp_dir)
+        self.assertFalse(mock_batchClient.file.download.called)
+
+    @mock.patch.object(client, 'batch_client')
+    def test_watcher_output_discovery(self, mock_batchClient):
+        def output(name):
+            return {'name': name, 'size': 1, 'uploaded': "2018-01-01"}
+        def task(task_id, display_name, minute, exit_code=0):
+            return mock.Mock(id=task_id, display_name=display_name, execution_info=mock.Mock(exit_code=exit_code),
+                             state_transition_time=datetime.datetime(2018, 1, 1, 0, minute))
+        outputs = [output("beauty/shot.0001.exr"), output("logs/frame_1.log"), output("thumbs/0_thumb.png")]
+        tasks = [task('0', "Frame 1", 1)]
+        mock_batchClient.file.list_from_group.side_effect = lambda group, remote_path=None: iter(
+            [o for o in outputs if o['name'].startswith(remote_path or '')])
+        mock_batchClient.task.list.side_effect = lambda job_id, task_list_options: iter(tasks)
+        discovery = client.OutputDiscovery("job", "container")
+
+        self.assertEqual(discovery.new_outputs({}), outputs)
+        self.assertEqual(discovery.sequences, set([("beauty/shot.", 4)]))
+        downloaded = {o['name']: client._output_key(o) for o in outputs}
+
+        outputs.extend([output("beauty/shot.0002.exr"), output("beauty/shot.00020.exr"),
+                        output("logs/frame_2.log"), output("logs/frame_2_error.log"), output("logs/frame_20.log")])
+        tasks.append(task('1', "Frame 2", 2))
+        mock_batchClient.file.list_from_group.reset_mock()
+        self.assertEqual([o['name'] for o in discovery.new_outputs(downloaded)],
+                         ["logs/frame_2.log", "logs/frame_2_error.log", "beauty/shot.0002.exr"])
+        self.assertEqual([c[1]['remote_path'] for c in mock_batchClient.file.list_from_group.call_args_list],
+                         ["logs/frame_2", "beauty/shot.0002"])
+        self.assertEqual(mock_batchClient.task.list.call_args[1]['task_list_options'].filter,
+                         "state eq 'completed' and stateTransitionTime ge datetime'2018-01-01T00:00:00Z'")
+        downloaded.update((o['name'], client._output_key(o)) for o in outputs)
+
+        outputs.append(output("shadow/shot.0003.exr"))
+        tasks.append(task('2', "Frame 3 (shadow, camera)", 3))
+        self.assertEqual(len(discovery.new_outputs(downloaded)), len(outputs))
+        self.assertIn(("shadow/shot.", 4), discovery.sequences)
+
+        outputs.append(output("logs/worker0.log"))
+        tasks.append(task('worker0', "Render worker 0", 4))
+        self.assertEqual(discovery.new_outputs(downloaded), [output("logs/worker0.log")])
+
+        # Tile tasks only upload logs, and the merge task the images of their frame
+        outputs.extend([output("logs/frame_4.log"), output("logs/merge4.log"), output("beauty/shot.0004.exr")])
+        tasks.extend([task('4_0', "Frame 4 (shadow, tile 0)", 5), task('merge4', "Merge Frame 4 (shadow)", 6)])
+        self.assertEqual([o['name'] for o in discovery.new_outputs(downloaded)],
+                         ["logs/frame_4.log", "logs/merge4.log", "beauty/shot.0004.exr"])
+
+    @mock.patch.object(client, 'batch_client')
+    def test_watcher_task_counts(self, mock_batchClient):
+        mock_batchClient.job.get_task_counts.return_value = mock.Mock(active=2, running=3, completed=5, failed=1)
+        task_states = client.tasks.TaskStates()
+        self.assertEqual(client._task_counts("job", task_states), (10, 5, 1))
+        self.assertFalse(mock_batchClient.task.list.called)
+
+        mock_batchClient.job.get_task_counts.side_effect = ValueError("Unsupported")
+        mock_batchClient.task.list.return_value = iter([mock.Mock(
+            id="0", state="completed", execution_info=mock.Mock(exit_code=0),
+            state_transition_time=datetime.datetime(2018, 1, 1))])
+        self.assertEqual(client._task_counts("job", task_states), (1, 1, 0))
+        self.assertFalse(task_states.job_counts)
+        options = mock_batchClient.task.list.call_args[1]['task_list_options']
+        self.assertIsNone(options.filter)
+        self.assertEqual(options.select, client.tasks.TASK_STATE_SELECT)
 
     def test_watcher_check_job_stopped(self):
         mock_job = mock.create_autospec(models.CloudJob)
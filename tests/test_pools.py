@@ -224,6 +224,12 @@ class AzureTestBatchPools(unittest.TestCase):
 
         AzureBatchPools.create_pool(self.mock_self, (3, 5), "test job")
         self.mock_self.batch.pool.add.assert_called_with(mock.ANY)
+        self.assertEqual(self.mock_self.batch.pool.add.call_args[0][0].max_tasks_per_node, 1)
+        self.assertFalse(self.mock_self.batch.pool.add.call_args[0][0].enable_inter_node_communication)
+        AzureBatchPools.create_pool(self.mock_self, (3, 5), "test job", 4)
+        self.assertEqual(self.mock_self.batch.pool.add.call_args[0][0].max_tasks_per_node, 4)
+        AzureBatchPools.create_pool(self.mock_self, (3, 5), "test job", 1, True)
+        self.assertTrue(self.mock_self.batch.pool.add.call_args[0][0].enable_inter_node_communication)
 
     @mock.patch("pools.maya")
     def test_pools_resize(self, mock_maya):
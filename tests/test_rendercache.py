@@ -0,0 +1,88 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rendercache
+from rendercache import RenderCache
+
+
+SCENE = """//Maya ASCII 2018 scene
+//Last modified: Mon, Jan 01, 2018 10:00:00 AM
+requires maya "2018";
+fileInfo "application" "maya";
+createNode transform -n "pCube1";
+	setAttr ".t" -type "double3" 0 1 0 ;
+createNode animCurveTL -n "pCube1_translateX";
+	setAttr ".ktv[0:1]"  1 0 24 {key};
+select -ne :time1;
+	setAttr ".o" {time};
+connectAttr "pCube1_translateX.o" "pCube1.tx";
+"""
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        return super(TestRenderCache, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestRenderCache, self).tearDown()
+
+    def write_scene(self, name, content):
+        scene_file = os.path.join(self.temp_dir, name)
+        with open(scene_file, 'w') as scene:
+            scene.write(content)
+        return scene_file
+
+    def test_rendercache_scene_digest(self):
+        digest = rendercache.scene_digest(self.write_scene("a.ma", SCENE.format(key=10, time=1)))
+        self.assertEqual(digest, rendercache.scene_digest(self.write_scene("b.ma", SCENE.format(key=5, time=12))))
+        edited = SCENE.format(key=10, time=1).replace("0 1 0", "0 2 0")
+        self.assertNotEqual(digest, rendercache.scene_digest(self.write_scene("c.ma", edited)))
+        unlinked = SCENE.format(key=10, time=1).replace("connectAttr", "// connectAttr")
+        self.assertNotEqual(digest, rendercache.scene_digest(self.write_scene("d.ma", unlinked)))
+        binary = rendercache.scene_digest(self.write_scene("a.mb", SCENE.format(key=10, time=1)))
+        self.assertNotEqual(binary, rendercache.scene_digest(self.write_scene("b.mb", SCENE.format(key=5, time=1))))
+
+    @mock.patch("rendercache.maya")
+    def test_rendercache_frame_fingerprints(self, mock_maya):
+        scene_file = self.write_scene("a.ma", SCENE.format(key=10, time=1))
+        mock_maya.get_list.return_value = ["pCube1_translateX"]
+        mock_maya.keyframe.side_effect = lambda *args, **kwargs: [kwargs['time'][0] if kwargs['time'][0] < 3 else 3.0]
+        fingerprints = rendercache.frame_fingerprints(scene_file, [("a.png", 10, "now")], {"foo": "bar"}, [1, 2, 3])
+        self.assertEqual(len(set(fingerprints.values())), 3)
+        mock_maya.keyframe.side_effect = lambda *args, **kwargs: [1.0]
+        retimed = rendercache.frame_fingerprints(scene_file, [("a.png", 10, "now")], {"foo": "bar"}, [1, 2, 3])
+        self.assertEqual(retimed[1], fingerprints[1])
+        self.assertNotEqual(retimed[2], fingerprints[2])
+        changed = rendercache.frame_fingerprints(scene_file, [("a.png", 11, "now")], {"foo": "bar"}, [1])
+        self.assertNotEqual(changed[1], retimed[1])
+
+    def test_rendercache_find_outputs(self):
+        cache = RenderCache(self.temp_dir)
+        cache.record("job1", {1: "a", 2: "b", 3: "c"})
+        cache = RenderCache(self.temp_dir)
+        outputs = {"job1": ["images/scene.0001.exr", "images/scene.0002.exr", "thumbs/0_thumb.png"]}
+        cached = cache.find_outputs({4: "a", 5: "c", 6: "d"}, outputs.get)
+        self.assertEqual(cached, {4: [("job1", "images/scene.0001.exr")]})
+
+        cache.record("job2", {7: "a"})
+        self.assertEqual(cache.find_outputs({1: "a"}, outputs.get), {})
+        self.assertEqual(cache.find_outputs({1: "b"}, mock.Mock(side_effect=ValueError("Not found"))), {})
@@ -0,0 +1,130 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import sys
+import shutil
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+top_dir = os.path.dirname(CWD)
+src_dir = os.path.join(top_dir, 'azure_batch_maya', 'scripts')
+tools_dir = os.path.join(src_dir, 'tools')
+sys.path.extend([src_dir, tools_dir])
+
+import render_worker
+from render_worker import LocalFrameQueue
+import tasks
+
+
+class TestRenderWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, 'queue'))
+        for name in tasks.frame_queue([1, 10, 5, 20]):
+            with open(os.path.join(self.temp_dir, *name.split('/')), 'w'):
+                pass
+        self.task_dir = os.path.join(self.temp_dir, 'task')
+        os.makedirs(os.path.join(self.task_dir, 'wd'))
+        for stream in ['stdout.txt', 'stderr.txt']:
+            with open(os.path.join(self.task_dir, stream), 'w') as handle:
+                handle.write("Loading scene\n")
+        return super(TestRenderWorker, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestRenderWorker, self).tearDown()
+
+    def test_renderworker_claim_frames(self):
+        worker1 = LocalFrameQueue(self.temp_dir, 'worker0')
+        worker2 = LocalFrameQueue(self.temp_dir, 'worker1')
+        claimed = render_worker.claim_frames(worker1)
+        self.assertEqual(next(claimed), ('queue/000000_1', 1))
+        self.assertEqual(next(render_worker.claim_frames(worker2)), ('queue/000001_10', 10))
+
+        # A retried worker resumes the frame it had claimed
+        self.assertEqual(next(render_worker.claim_frames(LocalFrameQueue(self.temp_dir, 'worker0'))),
+                         ('queue/000000_1', 1))
+        worker1.complete('queue/000000_1')
+        self.assertEqual(next(claimed), ('queue/000002_5', 5))
+        self.assertEqual(len(worker1.list()), 3)
+
+    def test_renderworker_expired_claim(self):
+        worker1 = LocalFrameQueue(self.temp_dir, 'worker0')
+        worker2 = LocalFrameQueue(self.temp_dir, 'worker1')
+        for name in worker1.list():
+            self.assertTrue(worker1.claim(name))
+
+        # Frames claimed by a running worker are waited for until the timeout
+        with mock.patch.object(render_worker.time, 'sleep') as mock_sleep:
+            self.assertEqual(list(render_worker.claim_frames(worker2, wait=30, timeout=60)), [])
+            self.assertEqual(mock_sleep.call_count, 2)
+
+        # The worker dies while rendering, so stops renewing its leases
+        for name in worker1.list():
+            os.utime(os.path.join(self.temp_dir, *name.split('/')) + '.worker0', (0, 0))
+        worker1.renew('queue/000001_10')
+        self.assertEqual(next(render_worker.claim_frames(worker2)), ('queue/000000_1', 1))
+        self.assertFalse(worker2.claim('queue/000001_10'))
+        self.assertFalse(worker1.claim('queue/000000_1'))
+        self.assertEqual(len(worker2.list()), 4)
+
+    @mock.patch.dict(os.environ, {'TASKS_PER_NODE': "4"})
+    @mock.patch("task_utils.cpu_count")
+    def test_renderworker_maya_renderer(self, mock_cpu_count):
+        mock_cpu_count.return_value = 16
+        self.assertEqual(render_worker.render_threads(), 4)
+        maya = mock.MagicMock()
+        modules = {'maya': maya, 'maya.standalone': maya.standalone, 'maya.cmds': maya.cmds, 'maya.mel': maya.mel}
+        with mock.patch.dict(sys.modules, modules):
+            render = render_worker.maya_renderer("/X/scene.mb", "sw", "/prep", 4)
+            render(10, "/images")
+        maya.cmds.setAttr.assert_any_call('defaultRenderGlobals.numCpusToUse', 4)
+        maya.cmds.setAttr.assert_any_call('defaultRenderGlobals.startFrame', 10)
+        maya.mel.eval.assert_called_with('mayaBatchRenderProcedure(0, "", "", "mayaSoftware", "")')
+
+        maya.reset_mock()
+        with mock.patch.dict(sys.modules, modules):
+            render = render_worker.maya_renderer("/X/scene.mb", "arnold", "/prep", 2)
+            render(10, "/images")
+        maya.cmds.setAttr.assert_any_call('defaultArnoldRenderOptions.threads_autodetect', 0)
+        maya.cmds.setAttr.assert_any_call('defaultArnoldRenderOptions.threads', 2)
+        maya.mel.eval.assert_called_with('mayaBatchRenderProcedure(0, "", "", "arnold", "")')
+
+    @mock.patch.object(render_worker, 'make_thumbnail')
+    def test_renderworker_render_frames(self, mock_thumbnail):
+        def render(frame, image_dir):
+            with open(os.path.join(self.task_dir, 'stdout.txt'), 'a') as stdout:
+                stdout.write("Rendering frame {}\n".format(frame))
+            if frame == 5:
+                raise RuntimeError("Render failed")
+            if not os.path.isdir(os.path.join(image_dir, 'beauty')):
+                os.makedirs(os.path.join(image_dir, 'beauty'))
+            with open(os.path.join(image_dir, 'beauty', 'scene.{}.exr'.format(frame)), 'w'):
+                pass
+
+        queue = LocalFrameQueue(self.temp_dir, 'worker0')
+        cwd = os.path.join(self.task_dir, 'wd')
+        failures = render_worker.render_frames(queue, render, cwd, self.task_dir, 'worker0')
+        self.assertEqual(failures, 1)
+        self.assertEqual(queue.list(), [])
+        outputs = [os.path.relpath(os.path.join(r, f), queue.outputs).replace(os.sep, '/')
+                   for r, d, files in os.walk(queue.outputs) for f in files]
+        self.assertEqual(tasks.output_frames(outputs), {1, 10, 20})
+        self.assertIn('logs/frame_5_error.log', outputs)
+        self.assertEqual(mock_thumbnail.call_count, 3)
+        with open(os.path.join(queue.outputs, 'logs', 'frame_10.log')) as log:
+            self.assertEqual(log.read(), "Rendering frame 10\n")
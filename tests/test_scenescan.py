@@ -0,0 +1,110 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import io
+import shutil
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import scenescan
+
+
+SCENE = u"""//Maya ASCII 2018 scene
+//Name: shot.ma
+requires maya "2018";
+file -rdi 1 -ns "chr" -rfn "chrRN" -op "v=0;" -typ "mayaAscii" "scenes/chr.ma";
+file -r -ns "chr" -dr 1 -rfn "chrRN" -op "v=0;" -typ "mayaAscii" "scenes/chr.ma";
+fileInfo "application" "maya";
+createNode transform -n "pCube1";
+createNode mesh -n "pCubeShape1" -p "pCube1";
+\tsetAttr -s 8 ".vt[0:7]"  -0.5 -0.5 0.5 0.5 -0.5 0.5 -0.5 0.5 0.5 0.5 0.5 0.5
+\t\t -0.5 0.5 -0.5 0.5 0.5 -0.5 -0.5 -0.5 -0.5 0.5 -0.5 -0.5;
+createNode file -n "wood";
+\tsetAttr ".ftn" -type "string" "sourceimages/wood.jpg";
+createNode file -n "clouds";
+\tsetAttr ".ftn" -type "string" "sourceimages/clouds.0001.exr";
+\tsetAttr ".ufe" yes;
+createNode file -n "skin";
+\tsetAttr ".ftn" -type "string" "$TEXTURES/skin.<UDIM>.tif";
+createNode script -n "notes";
+\tsetAttr ".b" -type "string" "print \\"createNode file;\\";\\n\\
+setAttr \\".ftn\\" -type \\"string\\" \\"ignored.jpg\\";";
+createNode cacheFile -n "clothCache";
+\tsetAttr ".cp" -type "string" "cache/nCache";
+\tsetAttr ".cn" -type "string" "cloth";
+createNode AlembicNode -n "anim_AlembicNode";
+\tsetAttr ".fn" -type "string" "/caches/anim.abc";
+"""
+
+CHARACTER = u"""//Maya ASCII 2018 scene
+file -r -ns "hair" -rfn "hairRN" -typ "mayaAscii" "hair.ma";
+createNode aiStandIn -n "propShape";
+\tsetAttr ".dso" -type "string" "/proxies/prop.####.ass";
+"""
+
+HAIR = u"""//Maya ASCII 2018 scene
+file -r -ns "chr" -rfn "chrRN" -typ "mayaAscii" "chr.ma";
+createNode file -n "hair";
+\tsetAttr ".ftn" -type "string" "/textures/hair.tx";
+"""
+
+
+class TestSceneScan(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, 'scenes'))
+        os.makedirs(os.path.join(self.temp_dir, 'sourceimages'))
+        with open(os.path.join(self.temp_dir, 'workspace.mel'), 'w'):
+            pass
+        with open(os.path.join(self.temp_dir, 'sourceimages', 'wood.jpg'), 'w'):
+            pass
+        self.write_scene('scenes/shot.ma', SCENE)
+        self.write_scene('scenes/chr.ma', CHARACTER)
+        self.write_scene('scenes/hair.ma', HAIR)
+        os.environ['TEXTURES'] = '/textures'
+        return super(TestSceneScan, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        del os.environ['TEXTURES']
+        return super(TestSceneScan, self).tearDown()
+
+    def write_scene(self, name, content):
+        with io.open(os.path.join(self.temp_dir, name), 'w', encoding='utf-8') as handle:
+            handle.write(content)
+
+    def test_scenescan_scan_scene(self):
+        scene = os.path.join(self.temp_dir, 'scenes', 'shot.ma')
+        dependencies = scenescan.scan_scene(scene)
+        self.assertEqual(dependencies['textures'], sorted([
+            os.path.join(self.temp_dir, 'sourceimages', 'wood.jpg'),
+            os.path.join('sourceimages', 'clouds.[0-9]*.exr'),
+            os.path.normpath('/textures/skin.[0-9][0-9][0-9][0-9].tif'),
+            os.path.normpath('/proxies/prop.[0-9]*.ass'),
+            os.path.normpath('/textures/hair.tx')]))
+        self.assertEqual(dependencies['caches'], sorted([
+            os.path.join('cache', 'nCache', 'cloth*'),
+            os.path.normpath('/caches/anim.abc')]))
+        self.assertEqual(dependencies['references'], sorted([
+            os.path.join(self.temp_dir, 'scenes', 'chr.ma'),
+            os.path.join(self.temp_dir, 'scenes', 'hair.ma')]))
+
+        dependencies = scenescan.scan_scene(scene, recurse=False)
+        self.assertEqual(len(dependencies['textures']), 3)
+        self.assertEqual(dependencies['references'], [os.path.join(self.temp_dir, 'scenes', 'chr.ma')])
+
+        dependencies = scenescan.scan_scene(scene, project_dir=os.path.join(self.temp_dir, 'scenes'))
+        self.assertIn(os.path.join('sourceimages', 'wood.jpg'), dependencies['textures'])
+
+    def test_scenescan_can_scan(self):
+        self.assertTrue(scenescan.can_scan(os.path.join(self.temp_dir, 'scenes', 'shot.ma')))
+        self.assertFalse(scenescan.can_scan(os.path.join(self.temp_dir, 'scenes', 'shot.mb')))
+        self.assertFalse(scenescan.can_scan(os.path.join(self.temp_dir, 'scenes', 'other.ma')))
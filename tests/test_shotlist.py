@@ -0,0 +1,60 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import io
+import shutil
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import shotlist
+
+
+class TestShotList(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, 'scenes'))
+        for name in ['sh010.ma', 'sh 020.mb']:
+            with open(os.path.join(self.temp_dir, 'scenes', name), 'w'):
+                pass
+        return super(TestShotList, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestShotList, self).tearDown()
+
+    def write_shots(self, content):
+        shot_file = os.path.join(self.temp_dir, 'shots.csv')
+        with io.open(shot_file, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return shot_file
+
+    def test_shotlist_load(self):
+        shots = shotlist.load_shot_list(self.write_shots(
+            u"# scene, frames, settings\n"
+            u"scenes/sh010.ma, 1-120x2\n"
+            u"\n"
+            u"\"scenes/sh 020.mb\", , logLevel=2, additionalFlags=-v 5\n"))
+        self.assertEqual(len(shots), 2)
+        self.assertEqual(shots[0], {'scene': os.path.join(self.temp_dir, 'scenes', 'sh010.ma'),
+                                    'frames': "1-120x2", 'overrides': {}})
+        self.assertEqual(shots[1]['scene'], os.path.join(self.temp_dir, 'scenes', 'sh 020.mb'))
+        self.assertIsNone(shots[1]['frames'])
+        self.assertEqual(shots[1]['overrides'], {'logLevel': 2, 'additionalFlags': "-v 5"})
+
+    def test_shotlist_errors(self):
+        with self.assertRaises(ValueError):
+            shotlist.load_shot_list(self.write_shots(u"scenes/missing.ma\n"))
+        with self.assertRaises(ValueError):
+            shotlist.load_shot_list(self.write_shots(u"scenes/sh010.ma, 10-x\n"))
+        with self.assertRaises(ValueError):
+            shotlist.load_shot_list(self.write_shots(u"scenes/sh010.ma, 1-10, logLevel\n"))
+        with self.assertRaises(ValueError):
+            shotlist.load_shot_list(self.write_shots(u"# no shots\n"))
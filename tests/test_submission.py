@@ -20,13 +20,15 @@ import azurebatchutils
 from azurebatchutils import ProgressBar
 from ui_submission import SubmissionUI
 from ui_shared import AzureBatchUI
-from submission import AzureBatchSubmission, AzureBatchRenderJob
+from submission import AzureBatchSubmission, AzureBatchRenderJob, TASK_ADD_RETRIES
 from assets import AzureBatchAssets
 from pools import AzureBatchPools
 from environment import AzureBatchEnvironment
 from shared import AzureBatchSettings
-from exception import CancellationException
+from exception import CancellationException, PoolException
 from azurebatchutils import OperatingSystem
+from templates import TemplateRegistry
+import tasks
 
 from azure.batch_extensions import BatchExtensionsClient
 from azure.batch.batch_auth import SharedKeyCredentials
@@ -57,6 +59,7 @@ class TestBatchSubmission(unittest.TestCase):
         self.mock_self = mock.create_autospec(AzureBatchSubmission)
         self.mock_self.batch = mock.create_autospec(BatchExtensionsClient)
         self.mock_self.batch.job = mock.create_autospec(operations.ExtendedJobOperations)
+        self.mock_self.batch.task = mock.create_autospec(operations.ExtendedTaskOperations)
         self.mock_self.batch.job.jobparameter_from_json.return_value = \
             mock.create_autospec(models.ExtendedJobParameter)
         self.mock_self.ui = mock.create_autospec(SubmissionUI)
@@ -67,6 +70,8 @@ class TestBatchSubmission(unittest.TestCase):
         self.mock_self._log = logging.getLogger("TestSubmission")
         self.mock_self.renderer = None
         self.mock_self.frame = mock.create_autospec(AzureBatchUI)
+        self.mock_self._get_script_files.side_effect = lambda *args: AzureBatchSubmission._get_script_files(
+            self.mock_self, *args)
         return super(TestBatchSubmission, self).setUp()
 
     @mock.patch.object(AzureBatchSubmission, "_collect_modules")
@@ -90,6 +95,7 @@ class TestBatchSubmission(unittest.TestCase):
         self.mock_self._configure_renderer.assert_called_with()
         self.mock_self.renderer.display.assert_called_with("module")
         self.mock_self.ui.is_logged_in.assert_called_with()
+        self.assertEqual(self.mock_self.storage, "storage_client")
 
     def test_submission_collect_modules(self):
         mods = AzureBatchSubmission._collect_modules(self.mock_self)
@@ -131,6 +137,262 @@ class TestBatchSubmission(unittest.TestCase):
         pools = AzureBatchSubmission.available_pools(self.mock_self)
         self.assertEqual(pools, ["pool1", "pool2"])
 
+    @mock.patch("submission.maya")
+    def test_submission_check_outputs(self, mock_maya):
+        renderable = {"perspShape.renderable": False, "cam1Shape.renderable": True, "cam2Shape.renderable": True,
+                      "defaultRenderLayer.renderable": False, "beauty.renderable": True}
+        mock_maya.get_list.side_effect = lambda type: \
+            ["perspShape", "cam1Shape", "cam2Shape"] if type == "camera" else ["defaultRenderLayer", "beauty"]
+        mock_maya.get_attr.side_effect = lambda attr: renderable[attr]
+        layers, cameras = AzureBatchSubmission._check_outputs(self.mock_self)
+        self.assertEqual(layers, ["beauty"])
+        self.assertEqual(cameras, ["cam1Shape", "cam2Shape"])
+
+        renderable["beauty.renderable"] = False
+        with self.assertRaises(ValueError):
+            AzureBatchSubmission._check_outputs(self.mock_self)
+
+    @mock.patch("submission.maya")
+    def test_submission_get_tiles(self, mock_maya):
+        self.mock_self.renderer = mock.Mock()
+        self.mock_self.renderer.get_tiles.return_value = (1, 1)
+        self.assertEqual(AzureBatchSubmission._get_tiles(self.mock_self), [])
+        self.mock_self.renderer.get_tiles.return_value = (2, 1)
+        mock_maya.get_attr.side_effect = lambda attr: {"defaultResolution.width": 640,
+                                                       "defaultResolution.height": 480}[attr]
+        tiles = AzureBatchSubmission._get_tiles(self.mock_self)
+        self.assertEqual(tiles, [(0, 319, 0, 479), (320, 639, 0, 479)])
+
+        self.mock_self.asset_manager.generate_sas_token.return_value = "https://outputs"
+        merge_task = AzureBatchSubmission._get_merge_task(
+            self.mock_self, OperatingSystem.windows, "2018", "job", {"merge_script": "https://merge", "utils_script": "https://utils"})
+        self.assertEqual(merge_task['commandLine'], 'call "%MAYA_2018%\\bin\\mayapy" merge_tiles.py')
+        self.assertEqual(merge_task['resourceFiles'], [{'blobSource': "https://merge", 'filePath': "merge_tiles.py"},
+                                                       {'blobSource': "https://utils", 'filePath': "task_utils.py"}])
+        self.assertEqual(merge_task['environmentSettings'], [{'name': 'TILES_URL', 'value': "https://outputs"}])
+        self.mock_self.asset_manager.generate_sas_token.assert_called_with("job")
+
+    @mock.patch("submission.time")
+    def test_submission_add_tasks(self, mock_time):
+        failures = {"120": 1}
+        def add_collection(job_id, value):
+            self.assertEqual(job_id, "job")
+            self.assertLessEqual(len(value), 100)
+            results = []
+            for task in value:
+                if failures.get(task.id):
+                    failures[task.id] -= 1
+                    results.append(models.TaskAddResult(status=models.TaskAddStatus.server_error, task_id=task.id,
+                                                        error=models.BatchError(code="ServerBusy")))
+                else:
+                    results.append(models.TaskAddResult(status=models.TaskAddStatus.success, task_id=task.id))
+            return models.TaskAddCollectionResult(value=results)
+
+        self.mock_self.batch.task.add_collection.side_effect = add_collection
+        self.mock_self._call = mock.Mock(side_effect=lambda func, *args: func(*args))
+        self.mock_self.batch.threads = 4
+        progress = mock.create_autospec(ProgressBar)
+        collection = [models.TaskAddParameter(id=str(i), command_line="render") for i in range(250)]
+        added = AzureBatchSubmission.add_tasks(self.mock_self, "job", collection, progress)
+        self.assertEqual(sorted(int(t.task_id) for t in added.value), list(range(250)))
+        self.assertEqual(self.mock_self.batch.task.add_collection.call_count, 4)
+        self.assertEqual(self.mock_self._call.call_count, 4)
+        self.assertEqual(progress.step.call_count, 250)
+        mock_time.sleep.assert_called_once_with(2)
+
+        failures["42"] = TASK_ADD_RETRIES + 1
+        with self.assertRaises(ValueError):
+            AzureBatchSubmission.add_tasks(self.mock_self, "job", collection, progress)
+
+    def test_submission_get_tasks_per_node(self):
+        self.mock_self.renderer = mock.create_autospec(AzureBatchRenderJob)
+        self.mock_self.renderer.get_tasks_per_node.return_value = 4
+        self.mock_self.ui.get_pool.return_value = {3: (4, 4)}
+        self.mock_self.renderer.get_distributed_nodes.return_value = 8
+        self.assertEqual(AzureBatchSubmission._get_tasks_per_node(self.mock_self, "scene.mb"), 1)
+        self.mock_self.renderer.get_distributed_nodes.return_value = 1
+        self.assertEqual(AzureBatchSubmission._get_tasks_per_node(self.mock_self, "scene.mb"), 4)
+
+        def job(job_id, vm_size, packing):
+            return mock.Mock(id=job_id), {'VmSize': vm_size, 'TasksPerNode': str(packing), 'FrameStep': '1'}
+
+        def completed(job_id):
+            seconds = {'job1': 600, 'job2': 900, 'job3': 2400, 'job4': 60}[job_id]
+            return [mock.Mock(display_name="Frame {}".format(f), execution_info=mock.Mock(
+                exit_code=0, start_time=datetime.datetime(2018, 1, 1),
+                end_time=datetime.datetime(2018, 1, 1) + datetime.timedelta(seconds=seconds)))
+                for f in range(1, 5)]
+
+        self.mock_self.renderer.get_tasks_per_node.return_value = 0
+        self.mock_self.env_manager.vm_sku = "STANDARD_D4"
+        self.mock_self._get_completed_tasks.side_effect = completed
+        self.mock_self._get_previous_jobs.return_value = [
+            job('job1', "STANDARD_D4", 1), job('job2', "STANDARD_D4", 2),
+            job('job3', "STANDARD_D4", 4), job('job4', "STANDARD_D3", 8)]
+        self.assertEqual(AzureBatchSubmission._get_tasks_per_node(self.mock_self, "scene.mb"), 2)
+        self.mock_self._get_previous_jobs.return_value = []
+        self.assertEqual(AzureBatchSubmission._get_tasks_per_node(self.mock_self, "scene.mb"), 1)
+
+        # The previous jobs aren't needed when using an existing pool
+        self.mock_self._get_previous_jobs.reset_mock()
+        self.mock_self.ui.get_pool.return_value = {2: "pool"}
+        self.assertEqual(AzureBatchSubmission._get_tasks_per_node(self.mock_self, "scene.mb"), 1)
+        self.assertFalse(self.mock_self._get_previous_jobs.called)
+
+    def test_submission_get_previous_jobs(self):
+        def job(job_id, scene_file, day):
+            return mock.Mock(id=job_id, creation_time=datetime.datetime(2018, 1, day),
+                             metadata=[models.MetadataItem(name="SceneFile", value=scene_file)])
+
+        self.mock_self._call = lambda func, *args, **kwargs: func(*args, **kwargs)
+        self.mock_self._previous_jobs = {}
+        self.mock_self.batch.job.list.return_value = [
+            job('job1', "scene.mb", 2), job('job2', "other.mb", 3), job('job3', "scene.mb", 1)]
+        previous = AzureBatchSubmission._get_previous_jobs(self.mock_self, "scene.mb")
+        self.assertEqual([j[0].id for j in previous], ['job3', 'job1'])
+        options = self.mock_self.batch.job.list.call_args[1]['job_list_options']
+        self.assertTrue(options.filter.startswith("creationTime ge datetime'"))
+        self.assertEqual(options.select, 'id,metadata,creationTime')
+
+        self.assertEqual(AzureBatchSubmission._get_previous_jobs(self.mock_self, "scene.mb"), previous)
+        self.assertEqual(self.mock_self.batch.job.list.call_count, 1)
+
+    def test_submission_check_distributed_pool(self):
+        self.mock_self._get_pool_packing.return_value = ("STANDARD_D4", 1)
+        self.mock_self._get_pool_size.return_value = 8
+        self.mock_self._call = lambda func, *args: func(*args)
+        self.mock_self.batch.pool = mock.create_autospec(operations.ExtendedPoolOperations)
+        self.mock_self.batch.pool.get.return_value = mock.Mock(enable_inter_node_communication=True)
+        AzureBatchSubmission._check_distributed_pool(self.mock_self, {'poolId': "pool"}, 8)
+        self.mock_self.batch.pool.get.assert_called_with("pool")
+
+        with self.assertRaises(PoolException):
+            AzureBatchSubmission._check_distributed_pool(self.mock_self, {'poolId': "pool"}, 10)
+        self.mock_self.batch.pool.get.return_value = mock.Mock(enable_inter_node_communication=False)
+        with self.assertRaises(PoolException):
+            AzureBatchSubmission._check_distributed_pool(self.mock_self, {'poolId': "pool"}, 4)
+        AzureBatchSubmission._check_distributed_pool(self.mock_self, {'autoPoolSpecification': {}}, 4)
+        self.mock_self._get_pool_packing.return_value = ("STANDARD_D4", 2)
+        with self.assertRaises(PoolException):
+            AzureBatchSubmission._check_distributed_pool(self.mock_self, {'autoPoolSpecification': {}}, 4)
+
+    def test_submission_get_frames(self):
+        self.mock_self.renderer = mock.create_autospec(AzureBatchRenderJob)
+        self.mock_self.renderer.get_frame_expression.return_value = ""
+        params = {'frameStart': 1, 'frameEnd': 10, 'frameStep': 1}
+        self.assertIsNone(AzureBatchSubmission._get_frames(self.mock_self, params))
+        self.assertEqual(params, {'frameStart': 1, 'frameEnd': 10, 'frameStep': 1})
+
+        self.mock_self.renderer.get_frame_expression.return_value = "20-40x10, 60"
+        self.assertEqual(AzureBatchSubmission._get_frames(self.mock_self, params), [20, 30, 40, 60])
+        self.assertEqual(params, {'frameStart': 20, 'frameEnd': 60, 'frameStep': 10})
+        self.mock_self.renderer.set_task_frames.assert_called_with(params)
+
+        self.mock_self.renderer.get_frame_expression.return_value = "1-5,!1-5"
+        with self.assertRaises(ValueError):
+            AzureBatchSubmission._get_frames(self.mock_self, params)
+
+    def test_submission_frame_queue(self):
+        self.mock_self.storage = mock.create_autospec(BlockBlobService)
+        AzureBatchSubmission._fill_frame_queue(self.mock_self, "job", [5, 1, 3])
+        self.mock_self.storage.create_container.assert_called_once_with("fgrp-job")
+        self.mock_self.storage.create_blob_from_bytes.assert_called_with("fgrp-job", "queue/000002_3", b'')
+        self.assertEqual(self.mock_self.storage.create_blob_from_bytes.call_count, 3)
+
+        self.mock_self.asset_manager.generate_sas_token.return_value = "https://outputs"
+        worker_task = AzureBatchSubmission._get_worker_task(
+            self.mock_self, OperatingSystem.linux, "2018", "job", {'worker_script': "https://worker", 'utils_script': "https://utils"})
+        self.assertIn("/usr/autodesk/maya2018/bin/mayapy render_worker.py", worker_task['commandLine'])
+        self.assertEqual(worker_task['resourceFiles'], [{'blobSource': "https://worker", 'filePath': "render_worker.py"},
+                                                        {'blobSource': "https://utils", 'filePath': "task_utils.py"}])
+        self.assertEqual(worker_task['environmentSettings'][0], {'name': 'QUEUE_URL', 'value': "https://outputs"})
+        self.assertIn({'name': 'TASKS_PER_NODE', 'value': "[parameters('tasksPerNode')]"},
+                      worker_task['environmentSettings'])
+        self.mock_self.asset_manager.generate_sas_token.assert_called_with("job", permission='rwdl')
+
+    def test_submission_get_standalone_tasks(self):
+        self.mock_self.asset_manager.generate_sas_token.return_value = "https://outputs"
+        self.mock_self.renderer = mock.Mock(render_engine='arnold')
+        export_task, render_task = AzureBatchSubmission._get_standalone_tasks(
+            self.mock_self, OperatingSystem.linux, "2018", "job", {'kick_script': "https://kick", 'utils_script': "https://utils"})
+        self.assertIn("/usr/autodesk/maya2018/bin/mayapy arnold_kick.py export", export_task['commandLine'])
+        self.assertIn("python arnold_kick.py render;err=$?;", render_task['commandLine'])
+        self.assertEqual(render_task['resourceFiles'], [{'blobSource': "https://kick", 'filePath': "arnold_kick.py"},
+                                                        {'blobSource': "https://utils", 'filePath': "task_utils.py"}])
+        self.assertIn({'name': 'EXPORT_URL', 'value': "https://outputs"}, render_task['environmentSettings'])
+        self.assertIn({'name': 'EXPORT_PREFIX', 'value': "exports/"}, render_task['environmentSettings'])
+        self.mock_self.asset_manager.generate_sas_token.assert_called_with("job", permission='rl')
+
+        self.mock_self.renderer = mock.Mock(render_engine='vray')
+        export_task, render_task = AzureBatchSubmission._get_standalone_tasks(
+            self.mock_self, OperatingSystem.windows, "2018", "job", {'vray_script': "https://vray", 'utils_script': "https://utils"})
+        self.assertIn("mayapy\" vray_standalone.py export", export_task['commandLine'])
+        self.assertIn({'name': 'VRAY_PATH', 'value': "C:\\Program Files\\Autodesk\\Maya2018\\vray"},
+                      render_task['environmentSettings'])
+        self.assertNotIn('LOG_LEVEL', [e['name'] for e in render_task['environmentSettings']])
+
+        export_task, render_task = AzureBatchSubmission._get_standalone_tasks(
+            self.mock_self, OperatingSystem.linux, "2018", "job", {'vray_script': "https://vray", 'utils_script': "https://utils"}, 8)
+        self.assertNotIn('multiInstanceSettings', export_task)
+        self.assertEqual(render_task['multiInstanceSettings']['numberOfInstances'], 8)
+        self.assertIn("/usr/autodesk/maya2018/vray/bin/vray -server -portNumber=20207",
+                      render_task['multiInstanceSettings']['coordinationCommandLine'])
+        self.assertEqual(render_task['environmentSettings'][-1], {'name': 'DR_PORT', 'value': "20207"})
+
+        self.mock_self.renderer = mock.Mock(render_engine='mayaSoftware', label="Maya Software")
+        with self.assertRaises(ValueError):
+            AzureBatchSubmission._get_standalone_tasks(
+                self.mock_self, OperatingSystem.windows, "2018", "job", {})
+
+    def test_submission_copy_cached_frames(self):
+        self.mock_self.storage = mock.create_autospec(BlockBlobService)
+        self.mock_self.storage.make_blob_url.side_effect = lambda c, b: "https://{}/{}".format(c, b)
+        render_cache = mock.Mock()
+        render_cache.find_outputs.return_value = {3: [("old-job", "images/scene.0003.exr")],
+                                                  1: [("old-job", "images/scene.0001.exr")]}
+        cached = AzureBatchSubmission._copy_cached_frames(self.mock_self, render_cache, "job", {1: "a", 2: "b", 3: "c"})
+        self.assertEqual(cached, [1, 3])
+        self.mock_self.storage.create_container.assert_called_once_with("fgrp-job")
+        self.mock_self.storage.copy_blob.assert_any_call(
+            "fgrp-job", "images/scene.0001.exr", "https://fgrp-old-job/images/scene.0001.exr")
+        self.assertEqual(self.mock_self.storage.copy_blob.call_count, 2)
+
+        render_cache.find_outputs.return_value = {}
+        self.assertEqual(AzureBatchSubmission._copy_cached_frames(self.mock_self, render_cache, "job", {1: "a"}), [])
+        self.assertEqual(self.mock_self.storage.copy_blob.call_count, 2)
+
+    def test_submission_expand_template(self):
+        registry = TemplateRegistry(os.environ['AZUREBATCH_TEMPLATES'])
+        template_file = os.path.join(os.environ['AZUREBATCH_TEMPLATES'], 'mayaSoftware-2018-windows.json')
+        template = registry.get(template_file)
+        params = {'sceneFile': "scene.ma", 'projectData': "project", 'assetScript': "https://assets",
+                  'thumbScript': "https://thumbs", 'workspace': "https://workspace", 'frameStart': 1,
+                  'frameEnd': 10, 'frameStep': 1, 'outputs': "job", 'storageURL': "https://storage"}
+        job = {'id': "job", 'metadata': [{'name': 'JobType', 'value': 'Maya'}],
+               'commonEnvironmentSettings': [{'name': 'foo', 'value': 'bar'}],
+               'applicationTemplateInfo': {'filePath': template_file, 'parameters': params}}
+        AzureBatchSubmission._expand_template(self.mock_self, job, template)
+        self.assertNotIn('applicationTemplateInfo', job)
+        self.assertEqual(job['taskFactory']['type'], 'parametricSweep')
+        self.assertEqual(job['metadata'][-1], {'name': 'az_batch:template_filepath', 'value': template_file})
+        self.assertEqual(job['commonEnvironmentSettings'], [{'name': 'foo', 'value': 'bar'}])
+
+        job['applicationTemplateInfo'] = {'filePath': template_file, 'parameters': params}
+        collection = tasks.build_task_collection(template.template, [(1, 5), (6, 10)])
+        AzureBatchSubmission._expand_template(self.mock_self, job, template, collection)
+        self.assertEqual(job['taskFactory']['type'], 'taskCollection')
+        self.assertIn("-s 6 -e", job['taskFactory']['tasks'][1]['commandLine'])
+
+        job['applicationTemplateInfo'] = {'filePath': template_file, 'parameters': dict(params, foo="bar")}
+        with self.assertRaises(ValueError):
+            AzureBatchSubmission._expand_template(self.mock_self, job, template)
+
+        mock_template = mock.Mock()
+        mock_template.expand.return_value = {'commonEnvironmentSettings': [{'name': 'foo', 'value': 'baz'}]}
+        job['applicationTemplateInfo'] = {'filePath': template_file, 'parameters': params}
+        with self.assertRaises(ValueError):
+            AzureBatchSubmission._expand_template(self.mock_self, job, mock_template)
+
     @mock.patch("submission.utils")
     @mock.patch("submission.maya")
     def test_submission_submit(self, mock_maya, mock_utils):
@@ -143,7 +405,9 @@ class TestBatchSubmission(unittest.TestCase):
         mock_utils.ProgressBar.return_value = mock_prog
         mock_utils.format_scene_path.return_value = "test_file_path"
         mock_utils.build_template_filename.side_effect = azurebatchutils.build_template_filename
-        self.mock_self._configure_pool = lambda t: AzureBatchSubmission._configure_pool(self.mock_self, t)
+        self.mock_self._configure_pool = lambda *args: AzureBatchSubmission._configure_pool(self.mock_self, *args)
+        self.mock_self._prepare_job = lambda *args, **kwargs: AzureBatchSubmission._prepare_job(
+            self.mock_self, *args, **kwargs)
         self.mock_self._submit_threads = lambda: 6
         self.mock_self._check_plugins.return_value = []
         self.mock_self._get_os_flavor.return_value = OperatingSystem.windows
@@ -151,51 +415,79 @@ class TestBatchSubmission(unittest.TestCase):
         self.mock_self.pool_manager.create_pool.return_value = {'poolId': 'new-pool'}
         self.mock_self.env_manager.get_environment_settings.return_value = [{'name':'foo', 'value':'bar'}]
         self.mock_self.renderer = mock.Mock(render_engine='arnold')
+        self.mock_self.renderer.get_distributed_nodes.return_value = 1
         self.mock_self.renderer.get_jobdata.return_value = ("a", "b")
-        self.mock_self.renderer.get_params.return_value = {"foo": "bar"}
+        self.mock_self.renderer.get_params.return_value = {"foo": "bar", "frameStart": 1, "frameEnd": 3, "frameStep": 1}
+        self.mock_self.renderer.get_use_cache.return_value = False
+        self.mock_self.renderer.get_convert_textures.return_value = False
+        self.mock_self._plan_tasks.return_value = None
+        self.mock_self._get_frames.return_value = None
+        self.mock_self._get_tasks_per_node.return_value = 2
+        self.mock_self._get_pool_packing.return_value = ("STANDARD_D4", 2)
+        self.mock_self._get_tiles.return_value = []
+        self.mock_self._check_outputs.return_value = (["defaultRenderLayer"], ["perspShape"])
         self.mock_self.renderer.get_title.return_value = "job name"
         self.mock_self._get_task_container_image.return_value = "containerImage"
         self.mock_self._call = call
         mock_job = mock.create_autospec(models.ExtendedJobParameter)
         self.mock_self.batch.job.jobparameter_from_json.return_value = mock_job
+        self.mock_self._expand_job.return_value = (["task"], "terminateJob")
         self.mock_self.asset_manager.upload.return_value = ({"project":"files", "path_map":"maps", "thumb_script":"thumbs", "workspace":"workspace"}, mock_prog)
         self.mock_self.asset_manager.generate_sas_token.return_value = "0123456789ABCDEF"
         self.mock_self.batch.threads = 6
+        self.mock_self.templates = mock.create_autospec(TemplateRegistry)
         mock_maya.about.return_value = "2017"
 
         self.mock_self.ui.get_pool.return_value = {1: (4, 4)}
         AzureBatchSubmission.submit(self.mock_self)
         self.assertEqual(mock_maya.error.call_count, 0)
         self.mock_self.renderer.disable.assert_called_with(True)
-        self.mock_self.pool_manager.create_auto_pool.assert_called_with((4, 4), "job name")
-        self.mock_self.batch.job.add.assert_called_with(mock_job)
+        self.mock_self.pool_manager.create_auto_pool.assert_called_with((4, 4), "job name", 2, False)
+        self.mock_self.asset_manager.upload.assert_called_with(
+            "b", mock.ANY, mock.ANY, [], OperatingSystem.windows, uploaded=None,
+            convert_textures=False, frames=[1, 2, 3], scripts=[])
+        self.mock_self.templates.get.assert_called_with(
+            os.path.join(os.environ['AZUREBATCH_TEMPLATES'], 'containers', 'arnold-2017-windows.json'))
+        self.mock_self._expand_template.assert_called_with(
+            mock.ANY, self.mock_self.templates.get.return_value, None)
+        self.mock_self._add_job.assert_called_with(mock_job, ["task"], "terminateJob", mock_prog)
         self.mock_self.batch.job.jobparameter_from_json.assert_called_with(
             {'commonEnvironmentSettings': [{'name': 'foo', 'value':'bar'}],
              'poolInfo': {'autoPool': 'auto-pool'},
              'displayName': 'job name',
              'id': mock.ANY,
              'applicationTemplateInfo': {
-                 'parameters': {'taskContainerImageName' : 'containerImage', 'sceneFile': 'test_file_path', 'outputs': mock.ANY, 'assetScript': 'maps', 'foo': 'bar',
-                                'projectData': 'files', 'thumbScript': 'thumbs', 'storageURL': '0123456789ABCDEF', 'workspace': 'workspace'},
+                 'parameters': {'taskContainerImageName' : 'containerImage', 'sceneFile': 'test_file_path', 'outputs': mock.ANY, 'assetScript': 'maps', 'foo': 'bar', 'frameStart': 1, 'frameEnd': 3, 'frameStep': 1,
+                                'projectData': 'files', 'thumbScript': 'thumbs', 'storageURL': '0123456789ABCDEF', 'workspace': 'workspace',
+                                'tasksPerNode': 2},
                  'filePath': os.path.join(os.environ['AZUREBATCH_TEMPLATES'], 'containers', 'arnold-2017-windows.json')},
-             'metadata': [{'name': 'JobType', 'value': 'Maya'}]})
+             'metadata': [{'name': 'JobType', 'value': 'Maya'},
+                          {'name': 'SceneFile', 'value': 'a'},
+                          {'name': 'FrameStep', 'value': '1'},
+                          {'name': 'VmSize', 'value': 'STANDARD_D4'},
+                          {'name': 'TasksPerNode', 'value': '2'}]})
 
 
         self.mock_self.ui.get_pool.return_value = {2:4}
         AzureBatchSubmission.submit(self.mock_self)
         self.assertEqual(mock_maya.error.call_count, 0)
         self.mock_self.renderer.disable.assert_called_with(True)
-        self.mock_self.batch.job.add.assert_called_with(mock_job)
+        self.mock_self._add_job.assert_called_with(mock_job, ["task"], "terminateJob", mock_prog)
         self.mock_self.batch.job.jobparameter_from_json.assert_called_with(
             {'commonEnvironmentSettings': [{'name': 'foo', 'value':'bar'}],
              'poolInfo': {'poolId': '4'},
              'displayName': 'job name',
              'id': mock.ANY,
              'applicationTemplateInfo': {
-                 'parameters': {'taskContainerImageName' : 'containerImage','sceneFile': 'test_file_path', 'outputs': mock.ANY, 'assetScript': 'maps', 'foo': 'bar',
-                                'projectData': 'files', 'thumbScript': 'thumbs', 'storageURL': '0123456789ABCDEF', 'workspace': 'workspace'},
+                 'parameters': {'taskContainerImageName' : 'containerImage','sceneFile': 'test_file_path', 'outputs': mock.ANY, 'assetScript': 'maps', 'foo': 'bar', 'frameStart': 1, 'frameEnd': 3, 'frameStep': 1,
+                                'projectData': 'files', 'thumbScript': 'thumbs', 'storageURL': '0123456789ABCDEF', 'workspace': 'workspace',
+                                'tasksPerNode': 2},
                  'filePath': os.path.join(os.environ['AZUREBATCH_TEMPLATES'], 'containers', 'arnold-2017-windows.json')},
-             'metadata': [{'name': 'JobType', 'value': 'Maya'}]})
+             'metadata': [{'name': 'JobType', 'value': 'Maya'},
+                          {'name': 'SceneFile', 'value': 'a'},
+                          {'name': 'FrameStep', 'value': '1'},
+                          {'name': 'VmSize', 'value': 'STANDARD_D4'},
+                          {'name': 'TasksPerNode', 'value': '2'}]})
 
 
         self.mock_self._check_outputs.side_effect = ValueError("No camera")
@@ -208,19 +500,138 @@ class TestBatchSubmission(unittest.TestCase):
         self.assertEqual(mock_maya.error.call_count, 1)
         self.mock_self.renderer.disable.assert_called_with(True)
 
-        self.mock_self.batch.job.add.assert_called_with(mock_job)
-        self.mock_self.batch.job.add.call_count = 0
-        self.mock_self.pool_manager.create_pool.assert_called_with((4, 4), 'job name')
+        self.mock_self._add_job.assert_called_with(mock_job, ["task"], "terminateJob", mock_prog)
+        self.mock_self._add_job.call_count = 0
+        self.mock_self.pool_manager.create_pool.assert_called_with((4, 4), 'job name', 2, False)
 
         mock_prog.is_cancelled.side_effect = CancellationException("cancelled")
         AzureBatchSubmission.submit(self.mock_self)
         self.assertEqual(mock_maya.info.call_count, 4)
         self.mock_self.renderer.disable.assert_called_with(True)
-        self.assertEqual(self.mock_self.batch.job.add.call_count, 0)
+        self.assertEqual(self.mock_self._add_job.call_count, 0)
 
         mock_prog.is_cancelled.side_effect = None
         self.mock_self.pool_manager.create_pool.side_effect = ValueError("Bad data")
         AzureBatchSubmission.submit(self.mock_self)
         self.assertEqual(mock_maya.error.call_count, 2)
         self.mock_self.renderer.disable.assert_called_with(True)
-        self.assertEqual(self.mock_self.batch.job.add.call_count, 0)
+        self.assertEqual(self.mock_self._add_job.call_count, 0)
+
+    def test_submission_expand_job(self):
+        self.mock_self.batch.file = mock.Mock()
+        storage = self.mock_self.batch.file.get_storage_client.return_value
+        storage.protocol = "https"
+        storage.primary_endpoint = "account.blob.core.windows.net"
+        storage.generate_container_shared_access_signature.return_value = "sig=token"
+        job = models.ExtendedJobParameter(
+            id="job", pool_info=models.PoolInformation(pool_id="pool"), on_all_tasks_complete="terminateJob",
+            job_preparation_task=models.JobPreparationTask(command_line="prep"),
+            task_factory=models.TaskCollectionTaskFactory(tasks=[models.ExtendedTaskParameter(
+                id="1", command_line="render", output_files=[models.OutputFile(
+                    file_pattern="images/**/*",
+                    destination=models.ExtendedOutputFileDestination(
+                        auto_storage=models.OutputFileAutoStorageDestination(file_group="job")),
+                    upload_options=models.OutputFileUploadOptions(upload_condition="taskSuccess"))])]))
+        task_collection, on_complete = AzureBatchSubmission._expand_job(self.mock_self, job, OperatingSystem.linux)
+        self.assertEqual(on_complete, "terminateJob")
+        self.assertEqual(job.on_all_tasks_complete, models.OnAllTasksComplete.no_action)
+        self.assertIsNone(job.task_factory)
+        self.assertEqual(job.job_preparation_task.command_line, "/bin/bash -c prep")
+        self.assertEqual([t.id for t in task_collection], ["1"])
+        self.assertEqual(task_collection[0].command_line, "/bin/bash -c 'set -e; set -o pipefail; render; wait'")
+        destination = task_collection[0].output_files[0].destination
+        self.assertIsNone(destination.auto_storage)
+        self.assertEqual(destination.container.container_url,
+                         "https://account.blob.core.windows.net/fgrp-job?sig=token")
+
+    def test_submission_add_job(self):
+        self.mock_self._call = mock.Mock(side_effect=lambda func, *args: func(*args))
+        job = mock.Mock(id="job")
+        AzureBatchSubmission._add_job(self.mock_self, job, ["task"], "terminateJob", "progress")
+        self.mock_self.batch.job.add.assert_called_with(job)
+        self.mock_self.add_tasks.assert_called_with("job", ["task"], "progress", None)
+        self.mock_self.batch.job.patch.assert_called_with("job", mock.ANY)
+        self.assertEqual(self.mock_self.batch.job.patch.call_args[0][1].on_all_tasks_complete, "terminateJob")
+        self.assertEqual(self.mock_self.batch.job.delete.call_count, 0)
+
+        self.mock_self.add_tasks.side_effect = ValueError("Failed to add task")
+        with self.assertRaises(ValueError):
+            AzureBatchSubmission._add_job(self.mock_self, job, ["task"], None)
+        self.mock_self.batch.job.delete.assert_called_with("job")
+
+    def test_submission_add_jobs(self):
+        mock_prog = mock.create_autospec(ProgressBar)
+        self.mock_self.batch.threads = 3
+        self.mock_self._expand_job.side_effect = lambda job, pool_os: (
+            [job.id + "_task1", job.id + "_task2"], "terminateJob")
+        def add_job(job, task_collection, on_all_tasks_complete, results):
+            for task in task_collection:
+                results.put(models.TaskAddResult(status=models.TaskAddStatus.success, task_id=task))
+        self.mock_self._add_job.side_effect = add_job
+        jobs = [mock.Mock(id="job{}".format(i)) for i in range(5)]
+        added = AzureBatchSubmission._add_jobs(self.mock_self, jobs, OperatingSystem.linux, mock_prog)
+        self.assertEqual(sorted(j.id for j in added), ["job0", "job1", "job2", "job3", "job4"])
+        self.mock_self._expand_job.assert_any_call(jobs[3], OperatingSystem.linux)
+        self.mock_self._add_job.assert_any_call(
+            jobs[3], ["job3_task1", "job3_task2"], "terminateJob", results=mock.ANY)
+        self.assertEqual(self.mock_self._add_job.call_count, 5)
+        mock_prog.max.assert_called_with(10)
+        self.assertEqual(mock_prog.step.call_count, 10)
+
+        self.mock_self._add_job.side_effect = ValueError("Job exists")
+        with self.assertRaises(ValueError):
+            AzureBatchSubmission._add_jobs(self.mock_self, jobs, OperatingSystem.linux, mock_prog)
+
+    @mock.patch("submission.shotlist")
+    @mock.patch("submission.utils")
+    @mock.patch("submission.maya")
+    def test_submission_submit_shots(self, mock_maya, mock_utils, mock_shotlist):
+        shots = [{'scene': "/shots/sh010.ma", 'frames': "1-10", 'overrides': {}},
+                 {'scene': "/shots/sh020.ma", 'frames': None, 'overrides': {'logLevel': 2}},
+                 {'scene': "/shots/sh030.ma", 'frames': None, 'overrides': {}}]
+        mock_shotlist.load_shot_list.return_value = shots
+        mock_maya.about.return_value = "2018"
+        mock_maya.file.side_effect = lambda **kwargs: "/shots/current.ma" if kwargs.get('sceneName') else False
+        mock_prog = mock.create_autospec(ProgressBar)
+        mock_prog.is_cancelled.return_value = False
+        mock_utils.ProgressBar.return_value = mock_prog
+        self.mock_self.renderer = mock.Mock()
+        self.mock_self.renderer.get_distributed_nodes.return_value = 1
+        self.mock_self.data_path = "/data"
+        self.mock_self.ui.get_pool.return_value = {3: (4, 4)}
+        self.mock_self._get_os_flavor.return_value = OperatingSystem.linux
+        self.mock_self.pool_manager.create_pool.return_value = {'poolId': 'new-pool'}
+        self.mock_self._get_tasks_per_node.return_value = 1
+        self.mock_self._configure_pool = lambda *args: AzureBatchSubmission._configure_pool(self.mock_self, *args)
+        self.mock_self.submit_batch = lambda *args: AzureBatchSubmission.submit_batch(self.mock_self, *args)
+        jobs = [mock.Mock(id="job1", display_name="sh010"), mock.Mock(id="job3", display_name="sh030")]
+        self.mock_self._prepare_job.side_effect = [(jobs[0], None, {}), ValueError("No camera"), (jobs[1], None, {})]
+        self.mock_self._add_jobs.return_value = jobs
+
+        AzureBatchSubmission.submit_shots(self.mock_self, "/shots/shots.csv", True, "/downloads")
+        self.mock_self._open_scene.assert_has_calls([mock.call(s['scene']) for s in shots])
+        self.mock_self._open_scene.assert_called_with("/shots/current.ma")
+        self.mock_self.pool_manager.create_pool.assert_called_once_with((4, 4), "shots", 1, False)
+        uploaded = self.mock_self._prepare_job.call_args[0][-1]
+        self.mock_self._prepare_job.assert_any_call(
+            mock_prog, OperatingSystem.linux, mock.ANY, "2018", shots[1], {'poolId': 'new-pool'}, uploaded)
+        self.mock_self._add_jobs.assert_called_with(jobs, OperatingSystem.linux, mock_prog)
+        mock_utils.JobWatcher.assert_called_with("job3", mock.ANY, os.path.join("/downloads", "sh030"))
+        self.assertEqual(mock_maya.error.call_count, 1)
+        self.assertIn("/shots/sh020.ma", mock_maya.error.call_args[0][0])
+
+        self.mock_self._prepare_job.side_effect = [(jobs[0], None, {})]
+        self.mock_self.renderer.render_enabled.side_effect = [True, False, False]
+        added, failed = AzureBatchSubmission.submit_batch(
+            self.mock_self, shots, "shots", mock_prog)
+        self.assertEqual(failed, [("/shots/sh020.ma", "The renderer of the scene is not supported."),
+                                  ("/shots/sh030.ma", "The renderer of the scene is not supported.")])
+        self.mock_self.renderer.render_enabled.side_effect = None
+
+        mock_maya.file.side_effect = lambda **kwargs: "" if kwargs.get('sceneName') else True
+        mock_maya.confirm.return_value = "Cancel"
+        self.mock_self._open_scene.reset_mock()
+        AzureBatchSubmission.submit_shots(self.mock_self, "/shots/shots.csv")
+        self.assertEqual(self.mock_self._open_scene.call_count, 0)
+        self.assertEqual(self.mock_self._add_jobs.call_count, 2)
+        mock_maya.info.assert_called_with("Job submission cancelled")
@@ -0,0 +1,270 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import datetime
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import tasks
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'azure_batch_maya', 'templates')
+
+
+def completed_task(display_name, seconds, exit_code=0, task_id=None, depends_on=None):
+    start = datetime.datetime(2018, 1, 1)
+    info = mock.Mock(exit_code=exit_code, start_time=start,
+                     end_time=start + datetime.timedelta(seconds=seconds))
+    dependencies = mock.Mock(task_ids=depends_on) if depends_on else None
+    return mock.Mock(id=task_id, display_name=display_name, execution_info=info, depends_on=dependencies)
+
+
+class TestTaskPlanning(unittest.TestCase):
+
+    def test_tasks_task_frames(self):
+        self.assertEqual(tasks.task_frames("Frame 5"), [5])
+        self.assertEqual(tasks.task_frames("Frames 1-4"), [1, 2, 3, 4])
+        self.assertEqual(tasks.task_frames("Frames 1-7", 3), [1, 4, 7])
+        self.assertEqual(tasks.task_frames("Frames -4--2"), [-4, -3, -2])
+        self.assertEqual(tasks.task_frames(tasks.task_name(10, 20), 5), [10, 15, 20])
+        self.assertEqual(tasks.task_frames("Frames 1-2 (beauty, cam1)"), [1, 2])
+        self.assertEqual(tasks.task_frames("merge"), [])
+        self.assertEqual(tasks.task_frames(None), [])
+
+    def test_tasks_parse_frames(self):
+        self.assertEqual(tasks.parse_frames("1-3, 7"), [1, 2, 3, 7])
+        self.assertEqual(tasks.parse_frames("1-10,25,40-60x5,!50,!2-9"), [1, 10, 25, 40, 45, 55, 60])
+        self.assertEqual(tasks.parse_frames("-2-0"), [-2, -1, 0])
+        for expression in ["1-", "5-1", "1-5x0", "!1-5", "1;2", ""]:
+            with self.assertRaises(ValueError):
+                tasks.parse_frames(expression)
+        self.assertEqual(tasks.frames_step([10, 20, 40]), 10)
+        self.assertEqual(tasks.frames_step([1, 10, 25]), 3)
+        self.assertEqual(tasks.frames_step([5]), 1)
+
+    def test_tasks_frame_times(self):
+        completed = [completed_task("Frame 1 (beauty)", 60),
+                     completed_task("Frames 2-3 (beauty)", 120),
+                     completed_task("Frame 4 (beauty)", 600, exit_code=1),
+                     completed_task("Frame 1 (shadow)", 120)]
+        self.assertEqual(tasks.frame_times(completed), {1: 180, 2: 60, 3: 60})
+        self.assertEqual(tasks.node_throughput(completed, 1, 2), 2 * 3 * 3600.0 / 300)
+        self.assertIsNone(tasks.node_throughput(completed[2:3]))
+
+    def test_tasks_split_outputs(self):
+        layers, cameras = ["beauty", "shadow"], ["cam1", "cam2"]
+        self.assertEqual(tasks.split_outputs(layers, cameras, tasks.SPLIT_FRAMES), [(None, None)])
+        self.assertEqual(tasks.split_outputs(layers, cameras, tasks.SPLIT_LAYERS),
+                         [("beauty", None), ("shadow", None)])
+        self.assertEqual(len(tasks.split_outputs(layers, cameras, tasks.SPLIT_CAMERAS)), 4)
+        self.assertEqual(tasks.split_outputs(["beauty"], ["cam1"], tasks.SPLIT_CAMERAS), [(None, None)])
+        self.assertEqual(tasks.output_flags(("beauty", "cam1")), "-rl beauty -cam cam1")
+        self.assertEqual(tasks.output_flags(("beauty", None)), "-rl beauty")
+
+    def test_tasks_tile_regions(self):
+        regions = tasks.tile_regions(100, 50, 3, 2)
+        self.assertEqual(len(regions), 6)
+        self.assertEqual(regions[0], (0, 32, 0, 24))
+        self.assertEqual(regions[-1], (66, 99, 25, 49))
+        self.assertEqual(sum((r - l + 1) * (t - b + 1) for l, r, b, t in regions), 100 * 50)
+        self.assertEqual(tasks.tile_regions(2, 2, 4, 1), [(0, 0, 0, 1), (1, 1, 0, 1)])
+        self.assertEqual(tasks.region_flags(regions[0]), "-reg 0 32 0 24")
+
+    def test_tasks_estimate_frame_times(self):
+        estimates = tasks.estimate_frame_times([1, 2, 3, 5, 6], {2: 10, 4: 30})
+        self.assertEqual(estimates, [10, 10, 20, 30, 30])
+
+    def test_tasks_fixed_chunks(self):
+        self.assertEqual(tasks.fixed_chunks([1, 3, 5, 7, 9], 2), [(1, 3), (5, 7), (9, 9)])
+
+    def test_tasks_order_chunks(self):
+        chunks = [(f, f) for f in range(1, 10)]
+        self.assertEqual(tasks.order_chunks(chunks, tasks.ORDER_SEQUENTIAL), chunks)
+        ordered = tasks.order_chunks(chunks, tasks.ORDER_PROGRESSIVE)
+        self.assertEqual([c[0] for c in ordered], [1, 9, 5, 3, 7, 2, 4, 6, 8])
+        ordered = tasks.order_chunks(chunks[:6], tasks.ORDER_PROGRESSIVE)
+        self.assertEqual(sorted(ordered), chunks[:6])
+        self.assertEqual(tasks.order_chunks(chunks[:2], tasks.ORDER_PROGRESSIVE), chunks[:2])
+
+    def test_tasks_plan_chunks(self):
+        frames = list(range(1, 101))
+        light = {f: 60 for f in frames}
+        chunks = tasks.plan_chunks(frames, light, node_count=1)
+        self.assertEqual(chunks, [(i, i + 19) for i in range(1, 101, 20)])
+
+        # Heavy frames get smaller chunks than light ones in the same job
+        mixed = dict(light)
+        mixed.update({f: 600 for f in range(51, 101)})
+        chunks = tasks.plan_chunks(frames, mixed, node_count=1)
+        self.assertEqual(chunks[0], (1, 20))
+        self.assertEqual(chunks[-2], (98, 99))
+        for first, last in chunks:
+            duration = sum(mixed[f] for f in range(first, last + 1))
+            self.assertLessEqual(duration, tasks.TARGET_TASK_DURATION * 1.5)
+
+        # There are always enough tasks to fill the pool if there are enough frames
+        chunks = tasks.plan_chunks(frames, light, node_count=20)
+        self.assertEqual(len(chunks), 20)
+        self.assertEqual([f for c in chunks for f in range(c[0], c[1] + 1)], frames)
+        chunks = tasks.plan_chunks(frames[:5], light, node_count=20)
+        self.assertEqual(chunks, [(f, f) for f in frames[:5]])
+        self.assertEqual(tasks.plan_chunks([], light, node_count=2), [])
+
+    def test_tasks_build_task_collection(self):
+        template = tasks.load_template(os.path.join(TEMPLATE_DIR, 'arnold-2018-linux.json'))
+        collection = tasks.build_task_collection(template, [(1, 10), (11, 15)])
+        self.assertEqual(template['taskFactory']['type'], 'parametricSweep')
+        factory = collection['taskFactory']
+        self.assertEqual(factory['type'], 'taskCollection')
+        self.assertEqual([t['id'] for t in factory['tasks']], ['0', '1'])
+        self.assertEqual([t['displayName'] for t in factory['tasks']], ['Frames 1-10', 'Frames 11-15'])
+        command = factory['tasks'][1]['commandLine']
+        self.assertIn("-s 11 -e $end", command)
+        self.assertIn("11+4 < [parameters('frameEnd')]", command)
+        self.assertNotIn("{0}", command)
+        self.assertEqual(collection['jobPreparationTask'], template['jobPreparationTask'])
+        self.assertIn("[parameters('taskFlags')]", command)
+
+        outputs = [("beauty", None), ("ns:shadow", None)]
+        collection = tasks.build_task_collection(template, [(1, 10), (11, 15)], outputs)
+        split_tasks = collection['taskFactory']['tasks']
+        self.assertEqual([t['id'] for t in split_tasks], ['0', '1', '2', '3'])
+        self.assertEqual(split_tasks[3]['displayName'], 'Frames 11-15 (ns:shadow)')
+        self.assertIn("-rl ns:shadow -rd", split_tasks[3]['commandLine'])
+        self.assertEqual(split_tasks[3]['environmentSettings'][-1],
+                         {'name': tasks.LOG_SUFFIX_VAR, 'value': '_ns_shadow'})
+
+    def test_tasks_build_tiled_task_collection(self):
+        template = tasks.load_template(os.path.join(TEMPLATE_DIR, 'containers', 'vray-2018-linux.json'))
+        merge = {'commandLine': "python merge_tiles.py",
+                 'resourceFiles': [{'blobSource': "https://merge", 'filePath': "merge_tiles.py"}],
+                 'environmentSettings': [{'name': "TILES_URL", 'value': "https://outputs"}]}
+        tiles = tasks.tile_regions(640, 480, 2, 1)
+        collection = tasks.build_task_collection(template, [(1, 5), (6, 10)], [("beauty", None)], tiles, merge)
+        tiled_tasks = collection['taskFactory']['tasks']
+        self.assertEqual([t['id'] for t in tiled_tasks], ['0', '1', 'merge2', '3', '4', 'merge5'])
+        self.assertTrue(collection['usesTaskDependencies'])
+        self.assertEqual(tiled_tasks[1]['displayName'], 'Frames 1-5 (beauty, tile 2)')
+        self.assertEqual(tasks.task_frames(tiled_tasks[1]['displayName']), [1, 2, 3, 4, 5])
+        self.assertIn("-rl beauty -reg 320 639 0 479 -rd", tiled_tasks[1]['commandLine'])
+        self.assertEqual(tiled_tasks[1]['environmentSettings'][-1]['value'], '_beauty_tile2')
+        images = tiled_tasks[1]['outputFiles'][0]
+        self.assertEqual(images['destination']['autoStorage']['path'], 'tiles/merge2/2')
+        self.assertFalse([o for o in tiled_tasks[1]['outputFiles'] if o['filePattern'].startswith('thumbs')])
+
+        merge_task = tiled_tasks[5]
+        self.assertEqual(merge_task['displayName'], 'Merge Frames 6-10 (beauty)')
+        self.assertEqual(tasks.task_frames(merge_task['displayName']), [])
+        self.assertEqual(merge_task['dependsOn'], {'taskIds': ['3', '4']})
+        self.assertEqual(merge_task['containerSettings'], template['taskFactory']['repeatTask']['containerSettings'])
+        self.assertEqual(merge_task['environmentSettings'][1:],
+                         [{'name': 'TILES_PREFIX', 'value': 'tiles/merge5/'}, {'name': 'TILE_COUNT', 'value': '2'}])
+        self.assertEqual(merge_task['outputFiles'][0]['destination']['autoStorage'],
+                         {'fileGroup': "[parameters('outputs')]"})
+        self.assertEqual(merge_task['outputFiles'][-1]['destination']['autoStorage']['path'], 'logs/merge5_error.log')
+        self.assertEqual(merge['environmentSettings'], [{'name': "TILES_URL", 'value': "https://outputs"}])
+
+    def test_tasks_build_worker_collection(self):
+        template = tasks.load_template(os.path.join(TEMPLATE_DIR, 'arnold-2018-windows.json'))
+        worker = {'commandLine': "mayapy render_worker.py",
+                  'resourceFiles': [{'blobSource': "https://worker", 'filePath': "render_worker.py"}],
+                  'environmentSettings': [{'name': "QUEUE_URL", 'value': "https://outputs"}]}
+        collection = tasks.build_worker_collection(template, 3, worker)
+        workers = collection['taskFactory']['tasks']
+        self.assertEqual([t['id'] for t in workers], ['worker0', 'worker1', 'worker2'])
+        self.assertEqual(tasks.task_frames(workers[0]['displayName']), [])
+        self.assertEqual(workers[2]['environmentSettings'][0]['name'], "MAYA_SCRIPT_PATH")
+        self.assertEqual(workers[2]['environmentSettings'][-1], {'name': "QUEUE_URL", 'value': "https://outputs"})
+        self.assertEqual([o['destination']['autoStorage']['path'] for o in workers[1]['outputFiles']],
+                         ['logs/worker1.log', 'logs/worker1_error.log'])
+        self.assertEqual(tasks.frame_queue([10, 1]), ['queue/000000_10', 'queue/000001_1'])
+
+    def test_tasks_build_export_collection(self):
+        template = tasks.load_template(os.path.join(TEMPLATE_DIR, 'arnold-2018-linux.json'))
+        export = {'commandLine': "mayapy arnold_kick.py export",
+                  'resourceFiles': [{'blobSource': "https://kick", 'filePath': "arnold_kick.py"}],
+                  'environmentSettings': [{'name': "SCENE_FILE", 'value': "scene.ma"}]}
+        kick = {'commandLine': "python arnold_kick.py render",
+                'resourceFiles': [{'blobSource': "https://kick", 'filePath': "arnold_kick.py"}],
+                'environmentSettings': [{'name': "EXPORT_URL", 'value': "https://outputs"}]}
+        collection = tasks.build_export_collection(template, [(1, 5), (6, 10)], export, kick)
+        kick_tasks = collection['taskFactory']['tasks']
+        self.assertEqual([t['id'] for t in kick_tasks], ['export0', '0', 'export1', '1'])
+        self.assertTrue(collection['usesTaskDependencies'])
+        self.assertEqual(kick_tasks[2]['displayName'], 'Export Frames 6-10')
+        self.assertEqual(tasks.task_frames(kick_tasks[2]['displayName']), [])
+        self.assertEqual(kick_tasks[2]['environmentSettings'][-3:],
+                         [{'name': "SCENE_FILE", 'value': "scene.ma"}, {'name': 'FRAME_START', 'value': '6'},
+                          {'name': 'FRAME_END', 'value': '10'}])
+        self.assertEqual(kick_tasks[2]['outputFiles'][0]['filePattern'], 'exports/**/*')
+        self.assertEqual(kick_tasks[2]['outputFiles'][0]['destination']['autoStorage'],
+                         {'fileGroup': "[parameters('outputs')]", 'path': 'exports'})
+        self.assertEqual(kick_tasks[2]['outputFiles'][-1]['destination']['autoStorage']['path'],
+                         'logs/export1_error.log')
+
+        render_task = kick_tasks[3]
+        self.assertEqual(render_task['displayName'], 'Frames 6-10')
+        self.assertEqual(render_task['commandLine'], "python arnold_kick.py render")
+        self.assertEqual(render_task['dependsOn'], {'taskIds': ['export1']})
+        self.assertEqual(render_task['environmentSettings'][-3]['name'], "EXPORT_URL")
+        self.assertEqual(render_task['outputFiles'], template['taskFactory']['repeatTask']['outputFiles'])
+        self.assertEqual(export['environmentSettings'], [{'name': "SCENE_FILE", 'value': "scene.ma"}])
+        self.assertNotIn('multiInstanceSettings', render_task)
+
+        kick['multiInstanceSettings'] = {'numberOfInstances': 4, 'coordinationCommandLine': "vray -server"}
+        collection = tasks.build_export_collection(template, [(1, 1)], export, kick)
+        self.assertEqual(collection['taskFactory']['tasks'][1]['multiInstanceSettings']['numberOfInstances'], 4)
+        self.assertNotIn('multiInstanceSettings', collection['taskFactory']['tasks'][0])
+
+    def test_tasks_output_frames(self):
+        outputs = ["images/beauty/scene.0001.exr", "beauty/scene.0002.exr", "shadow/scene_3.png",
+                   "thumbs/0_thumb.png", "logs/frame_4.log", "tiles/merge2/1/scene.0005.exr"]
+        self.assertEqual(tasks.output_frames(outputs), {1, 2, 3})
+        self.assertIsNone(tasks.output_frames(["scene.exr", "scene.0001.exr"]))
+        self.assertEqual(tasks.output_frames([]), set())
+
+    def test_tasks_frame_outputs(self):
+        outputs = ["images/beauty/scene.0001.exr", "images/shadow/scene.0001.exr", "images/beauty/scene.0002.exr"]
+        self.assertEqual(tasks.frame_outputs(outputs), {1: outputs[:2], 2: outputs[2:]})
+        self.assertEqual(tasks.frame_runs([1, 2, 3, 5, 7, 8]), [[1, 2, 3], [5], [7, 8]])
+        self.assertEqual(tasks.frame_runs([1, 3, 5, 9], 2), [[1, 3, 5], [9]])
+
+    def test_tasks_rerun_tasks(self):
+        job_tasks = [completed_task("Frames 1-2", 60, task_id="0"),
+                     completed_task("Frames 3-4", 60, exit_code=1, task_id="1"),
+                     completed_task("Frames 5-6", 60, task_id="2"),
+                     completed_task("Frame 7 (tile 1)", 60, task_id="3"),
+                     completed_task("Frame 7 (tile 2)", 60, exit_code=1, task_id="4"),
+                     completed_task("Merge Frame 7", 60, exit_code=1, task_id="merge5", depends_on=["3", "4"]),
+                     completed_task("Merge Frame 8", 60, task_id="merge6", depends_on=["7"]),
+                     mock.Mock(id="7", display_name="Frame 8 (tile 1)", execution_info=None, depends_on=None)]
+        rerun = tasks.rerun_tasks(job_tasks, {1, 2, 3, 5})
+        self.assertEqual([t.id for t in rerun], ["1", "2", "4", "merge5", "merge6", "7"])
+        rerun = tasks.rerun_tasks(job_tasks[:3], None)
+        self.assertEqual([t.id for t in rerun], ["1"])
+
+    def test_tasks_task_states(self):
+        def task(task_id, state, minute, exit_code=None):
+            info = mock.Mock(exit_code=exit_code) if exit_code is not None else None
+            return mock.Mock(id=task_id, state=state, execution_info=info,
+                             state_transition_time=datetime.datetime(2018, 1, 1, 0, minute))
+        states = tasks.TaskStates()
+        self.assertIsNone(states.filter)
+        states.update([task("0", "completed", 5, 0), task("1", "running", 6), task("2", "active", 2)])
+        self.assertEqual(states.counts(), (3, 1, 0))
+        self.assertEqual(states.filter, "stateTransitionTime ge datetime'2018-01-01T00:05:00Z'")
+        states.update([task("1", "completed", 8, 1), task("2", "completed", 9, 0)])
+        self.assertEqual(states.counts(), (3, 3, 1))
+        self.assertEqual(states.filter, "stateTransitionTime ge datetime'2018-01-01T00:08:00Z'")
+        self.assertEqual(tasks.job_task_counts(mock.Mock(active=2, running=3, completed=5, failed=1)), (10, 5, 1))
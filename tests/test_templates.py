@@ -0,0 +1,103 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import json
+import shutil
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import tasks
+from templates import ApplicationTemplate, TemplateRegistry
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'azure_batch_maya', 'templates')
+PARAMETERS = {'sceneFile': "scene.ma", 'projectData': "project", 'assetScript': "https://assets",
+              'thumbScript': "https://thumbs", 'workspace': "https://workspace", 'frameStart': 1,
+              'frameEnd': "10", 'frameStep': 1, 'outputs': "job", 'storageURL': "https://storage"}
+
+
+class TestTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        return super(TestTemplates, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestTemplates, self).tearDown()
+
+    def write_template(self, name, template):
+        template_file = os.path.join(self.temp_dir, name)
+        with open(template_file, 'w') as handle:
+            json.dump(template, handle)
+        return template_file
+
+    def test_templates_expand(self):
+        template = ApplicationTemplate(os.path.join(TEMPLATE_DIR, 'arnold-2018-linux.json'))
+        job = template.expand(PARAMETERS)
+        self.assertNotIn('parameters', job)
+        self.assertEqual(job['jobPreparationTask']['resourceFiles'][0]['blobSource'], "https://assets")
+        repeat_task = job['taskFactory']['repeatTask']
+        self.assertIn("-s {0} -e $end", repeat_task['commandLine'])
+        self.assertIn("{0}+0 < 10", repeat_task['commandLine'])
+        self.assertEqual(job['taskFactory']['parameterSets'][0]['end'], 10)
+        self.assertNotIn("[parameters(", json.dumps(job))
+        self.assertIn("[parameters('outputs')]", json.dumps(template.template))
+
+        collection = tasks.build_task_collection(template.template, [(1, 5), (6, 10)])
+        job = template.expand(PARAMETERS, collection)
+        self.assertEqual(job['taskFactory']['tasks'][1]['displayName'], "Frames 6-10")
+        self.assertIn("-s 6 -e $end", job['taskFactory']['tasks'][1]['commandLine'])
+        self.assertNotIn("[parameters(", json.dumps(job))
+
+        with self.assertRaises(ValueError):
+            template.expand(dict(PARAMETERS, frameEnd="last"))
+        with self.assertRaises(ValueError):
+            template.expand(dict(PARAMETERS, renderer="vray"))
+        with self.assertRaises(ValueError):
+            template.expand(dict(PARAMETERS, unknown=1))
+        with self.assertRaises(ValueError):
+            template.expand({k: v for k, v in PARAMETERS.items() if k != 'sceneFile'})
+
+    def test_templates_validate(self):
+        template = {'parameters': {'name': {'type': 'string'}},
+                    'jobPreparationTask': {'commandLine': "echo [parameters('name')] [[1]"}}
+        loaded = ApplicationTemplate(self.write_template('valid.json', template))
+        self.assertEqual(loaded.expand({'name': "x"})['jobPreparationTask']['commandLine'], "echo x [1]")
+        with self.assertRaises(ValueError):
+            ApplicationTemplate(self.write_template('undefined.json', dict(
+                template, parameters={})))
+        with self.assertRaises(ValueError):
+            ApplicationTemplate(self.write_template('type.json', dict(
+                template, parameters={'name': {'type': 'object'}})))
+        with self.assertRaises(ValueError):
+            ApplicationTemplate(self.write_template('reserved.json', dict(template, poolInfo={})))
+
+    def test_templates_registry(self):
+        registry = TemplateRegistry(TEMPLATE_DIR)
+        registry.load_all()
+        self.assertEqual(len(registry.templates), 24)
+
+        template_file = self.write_template('template.json', {
+            'parameters': {'name': {'type': 'string'}},
+            'jobPreparationTask': {'commandLine': "echo [parameters('name')]"}})
+        registry = TemplateRegistry(self.temp_dir)
+        template = registry.get(template_file)
+        self.assertIs(registry.get(template_file), template)
+
+        self.write_template('template.json', {
+            'parameters': {'name': {'type': 'string'}},
+            'jobPreparationTask': {'commandLine': "echo edited [parameters('name')]"}})
+        os.utime(template_file, (template.mtime + 10, template.mtime + 10))
+        edited = registry.get(template_file)
+        self.assertIsNot(edited, template)
+        self.assertEqual(edited.expand({'name': "x"})['jobPreparationTask']['commandLine'], "echo edited x")
+        with self.assertRaises(ValueError):
+            registry.get(os.path.join(self.temp_dir, 'missing.json'))
@@ -0,0 +1,99 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import txcache
+from txcache import TxCache
+
+
+def maketx(commands, **kwargs):
+    source, output = commands[-3], commands[-1]
+    with open(output, 'w') as handle:
+        handle.write("tx:" + os.path.basename(source))
+    return 0
+
+
+class TestTxCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, 'tx_cache')
+        self.textures = []
+        for name, data in [('wood.jpg', "wood"), ('stone.png', "stone"), ('copy.tif', "wood")]:
+            path = os.path.join(self.temp_dir, name)
+            with open(path, 'w') as handle:
+                handle.write(data)
+            self.textures.append(path)
+        return super(TestTxCache, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestTxCache, self).tearDown()
+
+    def test_txcache_can_convert(self):
+        self.assertTrue(txcache.can_convert("/textures/wood.JPG"))
+        self.assertTrue(txcache.can_convert("/textures/wood.1001.exr"))
+        self.assertFalse(txcache.can_convert("/textures/wood.tx"))
+        self.assertFalse(txcache.can_convert("/scenes/standin.ass"))
+        self.assertEqual(txcache.tx_name("/textures/wood.1001.exr"), "wood.1001.tx")
+
+    @mock.patch("txcache.subprocess.call")
+    def test_txcache_convert(self, mock_call):
+        mock_call.side_effect = maketx
+        cache = TxCache(self.cache_dir)
+        converted = cache.convert(self.textures + [os.path.join(self.temp_dir, 'scene.ma')], "maketx", 2)
+        self.assertEqual(sorted(converted), sorted(self.textures))
+        self.assertEqual(mock_call.call_count, 3)
+        self.assertEqual(mock_call.call_args[0][0][:2], ["maketx", "-u"])
+        wood_tx = converted[self.textures[0]]
+        self.assertEqual(os.path.basename(wood_tx), "wood.tx")
+        self.assertEqual(os.path.dirname(wood_tx), os.path.dirname(converted[self.textures[2]]))
+        with open(wood_tx, 'r') as handle:
+            self.assertEqual(handle.read(), "tx:wood.jpg")
+
+        mock_call.reset_mock()
+        cache = TxCache(self.cache_dir)
+        with mock.patch("txcache._file_hash") as mock_hash:
+            self.assertEqual(cache.convert(self.textures, "maketx"), converted)
+            self.assertFalse(mock_hash.called)
+        self.assertFalse(mock_call.called)
+
+        with open(self.textures[1], 'w') as handle:
+            handle.write("new stone")
+        os.utime(self.textures[1], (0, 0))
+        self.assertNotEqual(cache.convert(self.textures, "maketx")[self.textures[1]], converted[self.textures[1]])
+        self.assertEqual(mock_call.call_count, 1)
+
+    @mock.patch("txcache.subprocess.call")
+    def test_txcache_convert_clashing_names(self, mock_call):
+        mock_call.side_effect = maketx
+        wood_png = os.path.join(self.temp_dir, 'wood.png')
+        with open(wood_png, 'w') as handle:
+            handle.write("painted wood")
+        cache = TxCache(self.cache_dir)
+        converted = cache.convert(self.textures + [wood_png], "maketx")
+        self.assertEqual(sorted(converted), sorted(self.textures[1:]))
+        self.assertEqual(mock_call.call_count, 2)
+
+    @mock.patch("txcache.subprocess.call")
+    def test_txcache_convert_failed(self, mock_call):
+        mock_call.return_value = 1
+        cache = TxCache(self.cache_dir)
+        self.assertEqual(cache.convert(self.textures[:1], "maketx"), {})
+        for root, _, files in os.walk(self.cache_dir):
+            self.assertEqual([f for f in files if f != txcache.INDEX_FILE], [])
@@ -0,0 +1,107 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import sys
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+top_dir = os.path.dirname(CWD)
+tools_dir = os.path.join(top_dir, 'azure_batch_maya', 'scripts', 'tools')
+sys.path.append(tools_dir)
+
+import vray_standalone
+
+
+PATH_MAP = r"""global proc renderPrep()
+{
+loadPlugin "vrayformaya";
+dirmap -en true;
+dirmap -m "C:\\project\\sourceimages" "X:\\C\\project\\sourceimages";
+dirmap -m "/mnt/textures" "/X/mnt/textures";
+}
+global proc renderPrepFrame()
+{
+print("[AzureBatch] Starting frame " + `currentTime -q` + "\n");
+}"""
+
+
+class TestVrayStandalone(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path_map = os.path.join(self.temp_dir, 'renderPrep.mel')
+        with open(self.path_map, 'w') as handle:
+            handle.write(PATH_MAP)
+        return super(TestVrayStandalone, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        return super(TestVrayStandalone, self).tearDown()
+
+    def test_vraystandalone_write_remap_file(self):
+        remap_file = os.path.join(self.temp_dir, 'remap.xml')
+        self.assertEqual(vray_standalone.write_remap_file(self.path_map, remap_file), 2)
+        items = ET.parse(remap_file).getroot().findall('RemapItem')
+        self.assertEqual([(i.findtext('From'), i.findtext('To')) for i in items],
+                         [("C:\\project\\sourceimages", "X:\\C\\project\\sourceimages"),
+                          ("/mnt/textures", "/X/mnt/textures")])
+
+    def test_vraystandalone_frame_range(self):
+        self.assertEqual(vray_standalone.frame_range([1, 3, 5]), (1, 5, 2))
+        self.assertEqual(vray_standalone.frame_range([7]), (7, 7, 1))
+        with self.assertRaises(ValueError):
+            vray_standalone.frame_range([1, 2, 4])
+
+    def test_vraystandalone_vray_command(self):
+        commands = vray_standalone.vray_command("vray", "beauty.vrscene", [1, 3, 5], "/task/images", 4, "remap.xml")
+        self.assertEqual(commands, ["vray", "-sceneFile=beauty.vrscene", "-frames=1,3,5", "-display=0",
+                                    "-autoClose=1", "-verboseLevel=3", "-numThreads=4",
+                                    "-parameterOverride=SettingsOutput::img_dir=/task/images" + os.sep,
+                                    "-remapPathFile=remap.xml"])
+        self.assertNotIn("-remapPathFile", " ".join(
+            vray_standalone.vray_command("vray", "beauty.vrscene", [1], "/task/images", 1)))
+
+    def test_vraystandalone_distributed(self):
+        hosts = {'AZ_BATCH_HOST_LIST': "10.0.0.4,10.0.0.5,10.0.0.6", 'AZ_BATCH_MASTER_NODE': "10.0.0.5:6000"}
+        with mock.patch.dict(os.environ, hosts):
+            self.assertEqual(vray_standalone.render_hosts(), ["10.0.0.4", "10.0.0.6"])
+        commands = vray_standalone.vray_command("vray", "beauty.vrscene", [1], "/task/images", 8,
+                                                hosts=["10.0.0.4", "10.0.0.6"], port="20207")
+        self.assertEqual(commands[-4:], ["-distributed=1", "-renderhost=10.0.0.4;10.0.0.6",
+                                         "-portNumber=20207", "-transferAssets=1"])
+
+    @mock.patch("vray_standalone.run")
+    @mock.patch("vray_standalone.download_blob")
+    @mock.patch("vray_standalone.list_blobs")
+    def test_vraystandalone_render_scenes(self, mock_list, mock_download, mock_run):
+        mock_list.return_value = ["exports/10/beauty_cam.vrscene", "exports/10/shadow_cam.vrscene"]
+        mock_run.side_effect = [0, 1]
+        with mock.patch.dict(os.environ, {'VRAY': "vray", 'TASKS_PER_NODE': "1"}):
+            failures = vray_standalone.render_scenes(
+                "https://outputs?sas", "exports/", [10, 11], self.temp_dir, self.path_map)
+        self.assertEqual(failures, 1)
+        mock_list.assert_called_once_with("https://outputs?sas", "exports/10/")
+        mock_download.assert_called_with("https://outputs?sas", "exports/10/shadow_cam.vrscene",
+                                         os.path.join(self.temp_dir, 'exports', '10', 'shadow_cam.vrscene'))
+        commands = mock_run.call_args[0][0]
+        self.assertIn("-frames=10,11", commands)
+        self.assertEqual(commands[-1], "-remapPathFile=" + os.path.join(self.temp_dir, 'remap.xml'))
+
+        mock_list.return_value = []
+        with self.assertRaises(Exception):
+            vray_standalone.render_scenes("https://outputs?sas", "exports/", [10], self.temp_dir, self.path_map)